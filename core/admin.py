@@ -1,9 +1,18 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 from .models import (
     CustomUser, SleepRecord, SportRecord, FoodItem, Meal, MealItem,
     UserHealthGoal, Friendship, Comment,
-    SystemLog, BodyMetric, ArticleCategory, HealthArticle, UserReadHistory
+    SystemLog, BodyMetric, ArticleCategory, HealthArticle, UserReadHistory,
+    FoodSearchKey, FoodCatalogVersion, MealTemplate, MealTemplateItem, WorkoutTrack,
+    BiometricSeries, ArticleSimilarity
 )
+from .full_text_search import filter_food_items, filter_articles
+from .food_search import rebuild_pinyin_keys
+from .food_sync import propagate_food_calories
+from .middleware import SystemLoggingMiddleware
 
 # 1. 用户相关
 @admin.register(CustomUser)
@@ -22,11 +31,59 @@ class SportRecordAdmin(admin.ModelAdmin):
     list_display = ('user', 'sport_type', 'duration_minutes', 'calories_burned', 'record_date')
     list_filter = ('sport_type', 'record_date')
 
+@admin.register(WorkoutTrack)
+class WorkoutTrackAdmin(admin.ModelAdmin):
+    list_display = ('sport_record', 'source_format', 'start_time', 'distance_km', 'duration_seconds', 'avg_speed_kmh')
+    list_filter = ('source_format',)
+    list_select_related = ('sport_record__user',)
+
+@admin.register(BiometricSeries)
+class BiometricSeriesAdmin(admin.ModelAdmin):
+    list_display = ('user', 'metric', 'date', 'interval_seconds', 'sample_count', 'updated_at')
+    list_filter = ('metric', 'date')
+    exclude = ('samples',)
+
 @admin.register(FoodItem)
 class FoodItemAdmin(admin.ModelAdmin):
     list_display = ('name', 'calories_per_100g', 'protein', 'fat', 'carbohydrates')
     search_fields = ('name',)
 
+    def get_search_results(self, request, queryset, search_term):
+        # 使用 FTS5 全文索引代替 LIKE 全表扫描
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return filter_food_items(queryset, search_term), False
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        FoodCatalogVersion.bump()
+        # 名称可能已修改，重新生成拼音检索键
+        rebuild_pinyin_keys([obj])
+        # 热量被修改时，同步更新历史餐品的热量
+        if change and 'calories_per_100g' in form.changed_data:
+            propagate_food_calories([obj.id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        FoodCatalogVersion.bump()
+
+    def delete_queryset(self, request, queryset):
+        # 整批删除完成后递增一次食物库版本
+        super().delete_queryset(request, queryset)
+        FoodCatalogVersion.bump()
+
+@admin.register(FoodCatalogVersion)
+class FoodCatalogVersionAdmin(admin.ModelAdmin):
+    list_display = ('version', 'updated_at')
+    readonly_fields = ('version', 'updated_at')
+
+@admin.register(FoodSearchKey)
+class FoodSearchKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'kind', 'is_alias', 'food_item')
+    list_filter = ('kind', 'is_alias')
+    search_fields = ('key',)
+    raw_id_fields = ('food_item',)
+
 @admin.register(Meal)
 class MealAdmin(admin.ModelAdmin):
     list_display = ('user', 'meal_type', 'record_date')
@@ -36,6 +93,17 @@ class MealAdmin(admin.ModelAdmin):
 class MealItemAdmin(admin.ModelAdmin):
     list_display = ('meal', 'food_item', 'portion', 'calories_calculated')
 
+class MealTemplateItemInline(admin.TabularInline):
+    model = MealTemplateItem
+    raw_id_fields = ('food_item',)
+    extra = 0
+
+@admin.register(MealTemplate)
+class MealTemplateAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'meal_type', 'created_at')
+    list_filter = ('meal_type',)
+    inlines = [MealTemplateItemInline]
+
 # 3. 健康目标与社交
 @admin.register(UserHealthGoal)
 class UserHealthGoalAdmin(admin.ModelAdmin):
@@ -51,12 +119,45 @@ class CommentAdmin(admin.ModelAdmin):
     list_display = ('user', 'content_type', 'object_id', 'created_at')
 
 # 4. 新增模型 (Member A)
+class CappedCountPaginator(Paginator):
+    """
+    日志表可能有上百万行，COUNT(*) 要扫描整个索引。
+    最多数到 COUNT_LIMIT 条 (对带 LIMIT 的子查询计数)，超过时只显示前 COUNT_LIMIT 条的分页。
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        return self.object_list[:self.COUNT_LIMIT].count()
+
+
+class SystemLogPathFilter(admin.SimpleListFilter):
+    """按接口路径筛选 (敏感路径列表)，用操作前缀的范围查询命中 systemlog_action_time_idx"""
+    title = '接口'
+    parameter_name = 'path'
+
+    def lookups(self, request, model_admin):
+        return [(path, path) for path in SystemLoggingMiddleware.SENSITIVE_PATHS]
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        condition = Q()
+        for method in SystemLoggingMiddleware.LOGGED_METHODS:
+            condition |= SystemLog.action_prefix_q(f'{method} {self.value()}')
+        return queryset.filter(condition)
+
+
 @admin.register(SystemLog)
 class SystemLogAdmin(admin.ModelAdmin):
     list_display = ('timestamp', 'user', 'action', 'ip_address')
-    list_filter = ('action', 'timestamp')
-    search_fields = ('action', 'details')
+    # 不再对 action 做 SELECT DISTINCT，也不在 details 中模糊搜索 (两者都要扫描全表)
+    list_filter = (SystemLogPathFilter, 'timestamp')
+    search_fields = ('=user__username',)
     readonly_fields = ('timestamp', 'user', 'action', 'ip_address', 'details')
+    list_select_related = ('user',)
+    paginator = CappedCountPaginator
+    show_full_result_count = False
 
 @admin.register(BodyMetric)
 class BodyMetricAdmin(admin.ModelAdmin):
@@ -73,8 +174,19 @@ class HealthArticleAdmin(admin.ModelAdmin):
     list_filter = ('category', 'publish_date')
     search_fields = ('title', 'content')
 
+    def get_search_results(self, request, queryset, search_term):
+        # 使用 FTS5 全文索引代替 LIKE 全表扫描
+        if not search_term:
+            return super().get_search_results(request, queryset, search_term)
+        return filter_articles(queryset, search_term), False
+
 @admin.register(UserReadHistory)
 class UserReadHistoryAdmin(admin.ModelAdmin):
     list_display = ('user', 'article', 'read_time')
     list_filter = ('read_time',)
 
+
+@admin.register(ArticleSimilarity)
+class ArticleSimilarityAdmin(admin.ModelAdmin):
+    list_display = ('article', 'similar_article', 'co_reads')
+    list_select_related = ('article', 'similar_article')
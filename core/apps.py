@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def ensure_fts_triggers(sender, using, **kwargs):
+    """
+    migrate 结束后检查全文检索同步触发器：以后的迁移重建了 core_fooditem / core_healtharticle 表却忘记恢复触发器时，
+    在这里补上，避免全文检索静默地不再同步
+    """
+    from django.db import connections
+    from .sql_procedures import ensure_fts_triggers as create_missing_triggers
+    create_missing_triggers(connections[using])
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        post_migrate.connect(ensure_fts_triggers, sender=self)
@@ -0,0 +1,78 @@
+"""
+article_render.py - 健康文章正文 (类 Markdown 文本) 渲染为 HTML
+功能:
+1. 文章保存时渲染一次并存入 HealthArticle.content_html，客户端直接展示，不必每次解析正文
+2. 支持爬虫/生成器产出的格式：# 标题、**粗体**、*斜体*、`代码`、有序列表 (1.)、无序列表 (- * +)、
+   [文字](http://...) 链接；其余每个非空行作为一个段落
+3. 安全：先对全部文本做 HTML 转义，再把上述语法替换为固定的白名单标签，正文中的原始 HTML 不会原样输出；
+   链接只允许 http/https 地址
+4. content_hash(): 正文的 SHA-256，文章详情接口据此生成 ETag
+"""
+import re
+import html
+import hashlib
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*$')
+ORDERED_RE = re.compile(r'^\d+[.)]\s+(.*)$')
+UNORDERED_RE = re.compile(r'^[-*+]\s+(.*)$')
+
+# 行内语法，作用于已经转义过的文本
+INLINE_RULES = [
+    (re.compile(r'`([^`]+)`'), r'<code>\1</code>'),
+    (re.compile(r'\*\*(.+?)\*\*'), r'<strong>\1</strong>'),
+    (re.compile(r'(?<!\*)\*(?!\s)([^*]+?)\*(?!\*)'), r'<em>\1</em>'),
+    (re.compile(r'\[([^\]]+)\]\((https?://[^\s()]+)\)'), r'<a href="\2" rel="nofollow noopener" target="_blank">\1</a>'),
+]
+
+
+def content_hash(content):
+    return hashlib.sha256((content or '').encode('utf-8')).hexdigest()
+
+
+def render_inline(text):
+    text = html.escape(text.strip())
+    for pattern, replacement in INLINE_RULES:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def render_content(content):
+    """
+    正文 -> HTML 片段。
+
+    返回:
+        str: 只包含 h1~h6、p、ol、ul、li、strong、em、code、a 标签的 HTML
+    """
+    blocks = []
+    list_tag, items = None, []
+
+    def close_list():
+        nonlocal list_tag, items
+        if list_tag:
+            blocks.append(f'<{list_tag}>' + ''.join(f'<li>{item}</li>' for item in items) + f'</{list_tag}>')
+        list_tag, items = None, []
+
+    for line in (content or '').splitlines():
+        line = line.strip()
+        if not line:
+            close_list()
+            continue
+
+        heading = HEADING_RE.match(line)
+        ordered = ORDERED_RE.match(line)
+        unordered = None if ordered else UNORDERED_RE.match(line)
+        if heading:
+            close_list()
+            level = len(heading.group(1))
+            blocks.append(f'<h{level}>{render_inline(heading.group(2))}</h{level}>')
+        elif ordered or unordered:
+            tag = 'ol' if ordered else 'ul'
+            if list_tag != tag:
+                close_list()
+                list_tag = tag
+            items.append(render_inline((ordered or unordered).group(1)))
+        else:
+            close_list()
+            blocks.append(f'<p>{render_inline(line)}</p>')
+    close_list()
+    return '\n'.join(blocks)
@@ -0,0 +1,465 @@
+"""
+audit_log.py - 系统日志 (SystemLog) 的异步批量写入
+功能:
+1. 中间件只把日志放入进程内的有界队列，请求线程不再为每次写操作多开一个写事务、多抢一次 SQLite 写锁
+2. 后台线程每攒够 BATCH_SIZE 条、或距第一条日志超过 FLUSH_INTERVAL 秒，批量写入各个输出 (sink)
+3. 队列满时按溢出策略丢弃日志 (丢弃新日志 / 丢弃最旧的日志)，并累计丢弃数 dropped
+4. 进程退出时 (atexit) 写完队列中剩余的日志
+5. 请求线程处于数据库事务中时 (如 ATOMIC_REQUESTS、测试用例) 同步写入：
+   后台线程看不到未提交的数据，异步写入引用新建用户的日志会违反外键约束
+
+日志输出由 settings.SYSTEM_LOG_SINK 配置:
+- 'db'   (默认) 写入 SystemLog 表 (DatabaseSink)
+- 'file' 写入 SYSTEM_LOG_DIR 下按天、按大小轮转的 gzip 压缩 JSON Lines 文件 (FileSink)，不占用数据库
+- 'both' 两者都写
+文件中的日志可以用 python manage.py load_system_logs 按日期区间导回 SystemLog 表。
+
+保留策略: python manage.py archive_system_logs 把超过 SYSTEM_LOG_RETENTION_DAYS 天的日志按月追加到
+systemlog-archive-<年月>.jsonl.gz 后分批删除 (每批一个短事务，不长时间占用写锁)；归档文件同样可以导回。
+"""
+import os
+import re
+import gzip
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .models import SystemLog
+
+# 每批最多写入的日志数
+BATCH_SIZE = 100
+# 一批日志最多等待的时间 (秒)
+FLUSH_INTERVAL = 0.5
+# 队列容量，写入跟不上时最多缓冲的日志数
+MAX_QUEUE_SIZE = 10000
+
+# 单个日志文件 (未压缩) 的大小上限，超过后切换到新文件
+SEGMENT_MAX_BYTES = 16 * 1024 * 1024
+# 归档时每批读取、删除的日志数
+ARCHIVE_CHUNK_SIZE = 1000
+DEFAULT_RETENTION_DAYS = 90
+
+OVERFLOW_DROP_NEWEST = 'drop_newest'
+OVERFLOW_DROP_OLDEST = 'drop_oldest'
+
+SINK_DB = 'db'
+SINK_FILE = 'file'
+SINK_BOTH = 'both'
+
+# 日志文件名: systemlog-<本地日期>-<序号>.jsonl.gz
+SEGMENT_NAME_RE = re.compile(r'^systemlog-(\d{8})-(\d{4})\.jsonl\.gz$')
+# 归档文件名: systemlog-archive-<本地年月>.jsonl.gz
+ARCHIVE_NAME_RE = re.compile(r'^systemlog-archive-(\d{6})\.jsonl\.gz$')
+
+_STOP = object()
+
+
+def log_dir():
+    return getattr(settings, 'SYSTEM_LOG_DIR', os.path.join(settings.BASE_DIR, 'audit_logs'))
+
+
+def entry_to_dict(entry):
+    return {
+        'timestamp': entry.timestamp.isoformat(),
+        'user_id': entry.user_id,
+        'action': entry.action,
+        'ip_address': entry.ip_address,
+        'details': entry.details,
+    }
+
+
+def entry_from_dict(data):
+    return SystemLog(
+        timestamp=datetime.fromisoformat(data['timestamp']),
+        user_id=data.get('user_id'),
+        action=data['action'],
+        ip_address=data.get('ip_address'),
+        details=data.get('details'),
+    )
+
+
+class DatabaseSink:
+    """
+    写入 SystemLog 表。
+    整批写入失败时 (如刷新前用户已被删除，违反外键约束) 改为逐条写入，一条坏记录不会连累同批的其他日志。
+    write() 返回未能写入的条数
+    """
+
+    def write(self, batch):
+        try:
+            with transaction.atomic():
+                SystemLog.objects.bulk_create(batch)
+            return 0
+        except DatabaseError as e:
+            print(f"SystemLog Warning: 批量写入失败，改为逐条写入: {e}")
+        failed = 0
+        for entry in batch:
+            # 回滚的批量插入可能已经给对象设置了主键，逐条写入前还原为新对象
+            entry.pk = None
+            entry._state.adding = True
+            try:
+                with transaction.atomic():
+                    entry.save(force_insert=True)
+            except DatabaseError as e:
+                print(f"SystemLog Error: 丢弃日志 {entry.action}: {e}")
+                entry.pk = None
+                failed += 1
+        return failed
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """
+    追加写入 gzip 压缩的 JSON Lines 文件，每行一条日志。
+    每个文件只包含同一天 (本地日期) 的日志，未压缩内容超过 max_bytes 时切换到当天的下一个序号。
+    每批写完后执行 gzip 的同步刷新，进程意外退出时最多丢失最后一批；读取时容忍不完整的文件尾。
+    """
+
+    def __init__(self, directory=None, max_bytes=SEGMENT_MAX_BYTES):
+        self.directory = directory or log_dir()
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.file = None
+        self.day = None
+        self.size = 0
+
+    def _open(self, day):
+        os.makedirs(self.directory, exist_ok=True)
+        prefix = f"systemlog-{day.strftime('%Y%m%d')}-"
+        numbers = [
+            int(match.group(2)) for match in map(SEGMENT_NAME_RE.match, os.listdir(self.directory))
+            if match and match.group(0).startswith(prefix)
+        ]
+        # 每次打开都使用新的序号，不在已有文件 (可能尾部不完整) 后继续追加。
+        # 以独占模式 ('xb') 创建：多个进程同时打开或轮转时，序号被别的进程抢先占用就换下一个，不会互相覆盖
+        number = max(numbers, default=0) + 1
+        while True:
+            path = os.path.join(self.directory, f'{prefix}{number:04d}.jsonl.gz')
+            try:
+                self.file = gzip.open(path, 'xb')
+                break
+            except FileExistsError:
+                number += 1
+        self.day = day
+        self.size = 0
+
+    def write(self, batch):
+        """返回未能写入的条数 (写入失败时直接抛出异常)"""
+        with self.lock:
+            for entry in batch:
+                day = timezone.localtime(entry.timestamp).date()
+                if self.file is None or day != self.day or self.size >= self.max_bytes:
+                    self.close_file()
+                    self._open(day)
+                line = (json.dumps(entry_to_dict(entry), ensure_ascii=False) + '\n').encode('utf-8')
+                self.file.write(line)
+                self.size += len(line)
+            if self.file is not None:
+                self.file.flush()
+        return 0
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        with self.lock:
+            self.close_file()
+
+
+def build_sinks(kind=None):
+    """按 settings.SYSTEM_LOG_SINK 创建日志输出"""
+    kind = kind or getattr(settings, 'SYSTEM_LOG_SINK', SINK_DB)
+    if kind == SINK_DB:
+        return [DatabaseSink()]
+    if kind == SINK_FILE:
+        return [FileSink()]
+    if kind == SINK_BOTH:
+        return [DatabaseSink(), FileSink()]
+    raise ValueError(f'不支持的 SYSTEM_LOG_SINK: {kind}，可用: {SINK_DB}, {SINK_FILE}, {SINK_BOTH}')
+
+
+def segment_paths(directory, start_date, end_date):
+    """[start_date, end_date] 区间内各天的日志文件及涉及月份的归档文件，按日期和序号排序"""
+    if not os.path.isdir(directory):
+        return []
+    segments = []
+    for name in os.listdir(directory):
+        match = SEGMENT_NAME_RE.match(name)
+        if match:
+            day = datetime.strptime(match.group(1), '%Y%m%d').date()
+            if start_date <= day <= end_date:
+                segments.append((day, int(match.group(2)), os.path.join(directory, name)))
+            continue
+        match = ARCHIVE_NAME_RE.match(name)
+        if match:
+            month = datetime.strptime(match.group(1), '%Y%m').date()
+            if start_date.replace(day=1) <= month <= end_date:
+                segments.append((month, 0, os.path.join(directory, name)))
+    return [path for _, _, path in sorted(segments)]
+
+
+def archive_old_logs(days=None, directory=None, chunk_size=ARCHIVE_CHUNK_SIZE):
+    """
+    把早于 days 天前的日志追加到按月划分的归档文件，再从数据库中删除。
+    按时间顺序每次处理 chunk_size 条：写入并同步到磁盘后才删除这一批，每次删除是一个短事务。
+    中途失败时已删除的日志都已归档；最后一批可能在归档文件中重复出现 (导回时会去重)。
+
+    返回:
+        dict: {'archived': 归档条数, 'files': 写入的归档文件名列表}
+    """
+    if days is None:
+        days = getattr(settings, 'SYSTEM_LOG_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    directory = directory or log_dir()
+    os.makedirs(directory, exist_ok=True)
+    cutoff = timezone.now() - timedelta(days=days)
+    archived, files = 0, set()
+
+    while True:
+        chunk = list(SystemLog.objects.filter(timestamp__lt=cutoff).order_by('timestamp', 'id')[:chunk_size])
+        if not chunk:
+            break
+        months = {}
+        for entry in chunk:
+            months.setdefault(timezone.localtime(entry.timestamp).strftime('%Y%m'), []).append(entry)
+        for month, entries in months.items():
+            name = f'systemlog-archive-{month}.jsonl.gz'
+            # 每批追加为一个新的 gzip 成员，多成员的 gzip 文件可以连续读出
+            with open(os.path.join(directory, name), 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='ab') as f:
+                    for entry in entries:
+                        f.write((json.dumps(entry_to_dict(entry), ensure_ascii=False) + '\n').encode('utf-8'))
+                raw.flush()
+                os.fsync(raw.fileno())
+            files.add(name)
+        SystemLog.objects.filter(id__in=[entry.id for entry in chunk]).delete()
+        archived += len(chunk)
+    return {'archived': archived, 'files': sorted(files)}
+
+
+def read_segment(path):
+    """逐条读取日志文件中的记录；文件尾部不完整 (进程异常退出) 时读到最后一条完整的记录为止"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                if line.endswith('\n'):
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile, OSError) as e:
+            print(f"SystemLog 文件不完整 {path}: {e}")
+
+
+def load_segments(start_date, end_date, directory=None, batch_size=2000):
+    """
+    把 [start_date, end_date] (本地日期) 区间内日志文件中的记录导回 SystemLog 表。
+    数据库中已有的相同记录 (时间、用户、操作、IP 都相同) 会被跳过，重复导入不会产生重复行；
+    用户已被删除的记录导入后 user 为空。
+
+    返回:
+        dict: {'files': 读取的文件数, 'loaded': 导入条数, 'duplicates': 跳过的重复条数}
+    """
+    from .models import CustomUser
+
+    start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(end_date, datetime.max.time()))
+    existing = set(
+        SystemLog.objects.filter(timestamp__gte=start, timestamp__lte=end)
+        .values_list('timestamp', 'user_id', 'action', 'ip_address')
+    )
+    user_ids = set(CustomUser.objects.values_list('id', flat=True))
+    paths = segment_paths(directory or log_dir(), start_date, end_date)
+    result = {'files': len(paths), 'loaded': 0, 'duplicates': 0}
+
+    batch = []
+    for path in paths:
+        for data in read_segment(path):
+            entry = entry_from_dict(data)
+            if not start <= entry.timestamp <= end:
+                continue
+            # 先把已删除用户置空再比较，与数据库中导入过的 (user 为空的) 记录对得上
+            if entry.user_id not in user_ids:
+                entry.user_id = None
+            key = (entry.timestamp, entry.user_id, entry.action, entry.ip_address)
+            if key in existing:
+                result['duplicates'] += 1
+                continue
+            existing.add(key)
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                SystemLog.objects.bulk_create(batch)
+                result['loaded'] += len(batch)
+                batch = []
+    if batch:
+        SystemLog.objects.bulk_create(batch)
+        result['loaded'] += len(batch)
+    return result
+
+
+class SystemLogWriter:
+    """
+    在后台线程中批量写入 SystemLog。
+
+    使用方式:
+        writer = SystemLogWriter()
+        writer.submit(SystemLog(user=user, action='POST /api/sleep/', ...))
+        writer.flush()      # 等待已提交的日志写入
+
+    sinks 为空时按 settings.SYSTEM_LOG_SINK 创建。
+    """
+
+    def __init__(self, sinks=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, max_queue_size=MAX_QUEUE_SIZE,
+                 overflow=OVERFLOW_DROP_NEWEST, autostart=True):
+        if overflow not in (OVERFLOW_DROP_NEWEST, OVERFLOW_DROP_OLDEST):
+            raise ValueError(f'不支持的溢出策略: {overflow}')
+        self.sinks = sinks if sinks is not None else build_sinks()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.autostart = autostart
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.dropped = 0
+        self.written = 0
+
+    def submit(self, entry):
+        """提交一条未保存的 SystemLog，不等待写入"""
+        if connection.in_atomic_block:
+            self._write([entry])
+            return
+        if self.autostart:
+            self.start()
+        try:
+            self.queue.put_nowait(entry)
+            return
+        except queue.Full:
+            pass
+        # 分别统计丢掉的旧日志和没能放入队列的新日志
+        lost = 1
+        if self.overflow == OVERFLOW_DROP_OLDEST:
+            try:
+                oldest = self.queue.get_nowait()
+            except queue.Empty:
+                oldest = None
+            if oldest is _STOP:
+                # 停止标记不能丢 (否则后台线程不会退出)，放回队列，改为丢弃新日志
+                self.queue.put(_STOP)
+            else:
+                if isinstance(oldest, threading.Event):
+                    oldest.set()
+                elif oldest is not None:
+                    lost += 1
+                try:
+                    self.queue.put_nowait(entry)
+                    lost -= 1
+                except queue.Full:
+                    pass
+        with self.lock:
+            self.dropped += lost
+
+    def start(self):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name='system-log-writer', daemon=True)
+                self.thread.start()
+
+    def flush(self, timeout=5):
+        """
+        等待当前已提交的日志写入数据库。
+
+        返回:
+            bool: 是否在 timeout 秒内写完
+        """
+        if self.thread is None or not self.thread.is_alive():
+            self._write(self._drain())
+            return True
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def shutdown(self, timeout=5):
+        """写完剩余的日志并停止后台线程 (进程退出时调用)"""
+        thread = self.thread
+        if thread is None or not thread.is_alive():
+            self._write(self._drain())
+            for sink in self.sinks:
+                sink.close()
+            return
+        self.queue.put(_STOP)
+        thread.join(timeout)
+        for sink in self.sinks:
+            sink.close()
+
+    def _drain(self):
+        entries = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return entries
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is not _STOP:
+                entries.append(item)
+
+    def _run(self):
+        try:
+            while True:
+                batch, events, stop = [], [], False
+                item = self.queue.get()
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is _STOP:
+                        stop = True
+                    elif isinstance(item, threading.Event):
+                        # flush() 的标记：写完它之前提交的日志后立即通知
+                        events.append(item)
+                    else:
+                        batch.append(item)
+                    if stop or events or len(batch) >= self.batch_size:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self.queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                self._write(batch)
+                for event in events:
+                    event.set()
+                if stop:
+                    self._write(self._drain())
+                    return
+        finally:
+            connection.close()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        # 各输出未能写入的条数；至少有一个输出写入了的日志不算丢弃
+        lost = len(batch)
+        for sink in self.sinks:
+            try:
+                failed = sink.write(batch) or 0
+            except Exception as e:
+                # 日志写入失败不影响业务
+                print(f"SystemLog Error ({type(sink).__name__}): {e}")
+                failed = len(batch)
+            lost = min(lost, failed)
+        with self.lock:
+            self.dropped += lost
+            self.written += len(batch) - lost
+
+
+system_log_writer = SystemLogWriter()
+atexit.register(system_log_writer.shutdown)
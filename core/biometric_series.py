@@ -0,0 +1,221 @@
+"""
+biometric_series.py - 高频生理数据 (心率、步数) 的紧凑存储
+功能:
+1. 每个 "用户 + 指标 + 日期" 只占一行 (BiometricSeries)，采样打包为小端序 uint16 数组，每个采样 2 字节；
+   一天按分钟采样共 1440 个值，约 2.8KB，读一行即可取回一整天
+2. 追加采样：按本地日期分组，合并到当天的数组中 (同一时刻的新值覆盖旧值)
+3. 按时间区间读取：用 memoryview.cast('H') 零拷贝解码，各天的数据直接拷贝到结果数组的对应位置
+4. 降采样：按分钟 -> 5分钟/小时等粒度聚合 (均值/求和/最大/最小)，用 NumPy 向量化计算
+
+每天的采样网格从本地零点开始，采样间隔必须能整除 86400 秒，这样相邻日期的数据可以无缝拼接。
+"""
+import sys
+import math
+from array import array
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import BiometricSeries
+
+MISSING = BiometricSeries.MISSING
+MAX_VALUE = MISSING - 1
+SECONDS_PER_DAY = 24 * 3600
+DEFAULT_INTERVAL = 60
+METRICS = [metric for metric, _ in BiometricSeries.METRIC_CHOICES]
+# 各指标降采样时的默认聚合方式
+DEFAULT_AGGREGATES = {'heart_rate': 'mean', 'steps': 'sum'}
+AGGREGATES = ['mean', 'sum', 'max', 'min']
+
+LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+def day_start(day):
+    """某个本地日期的零点 (带时区)"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def decode(blob):
+    """
+    把存储的字节解码为 uint16 序列。
+    小端序机器上返回 memoryview (零拷贝)，否则返回字节序转换后的 array。
+    """
+    if LITTLE_ENDIAN:
+        return memoryview(blob).cast('B').cast('H')
+    return to_array(blob)
+
+
+def to_array(blob):
+    """把存储的字节复制为可修改的 uint16 array"""
+    values = array('H')
+    values.frombytes(bytes(blob))
+    if not LITTLE_ENDIAN:
+        values.byteswap()
+    return values
+
+
+def encode(values):
+    """uint16 array -> 小端序字节"""
+    if LITTLE_ENDIAN:
+        return values.tobytes()
+    values = array('H', values)
+    values.byteswap()
+    return values.tobytes()
+
+
+def validate_interval(interval_seconds):
+    if interval_seconds <= 0 or SECONDS_PER_DAY % interval_seconds:
+        raise ValueError('采样间隔必须是能整除 86400 的正整数秒')
+
+
+def _slot_value(value):
+    if value is None:
+        return MISSING
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value):
+        raise ValueError(f'采样值必须是整数: {value}')
+    value = int(value)
+    if not 0 <= value <= MAX_VALUE:
+        raise ValueError(f'采样值超出范围 (0 ~ {MAX_VALUE}): {value}')
+    return value
+
+
+def append_samples(user, metric, samples, interval_seconds=DEFAULT_INTERVAL):
+    """
+    追加采样。
+
+    参数:
+        samples: 可迭代的 (datetime, value) 元组，value 为 None 表示缺失
+        interval_seconds: 采样间隔，同一天的数据必须使用相同的间隔
+    返回:
+        dict: {'written': 写入的采样数, 'days': 涉及的天数}
+    异常:
+        ValueError: 指标、采样间隔或采样值不合法
+    """
+    if metric not in METRICS:
+        raise ValueError(f"不支持的指标: {metric}，可用: {', '.join(METRICS)}")
+    validate_interval(interval_seconds)
+
+    # 按本地日期分组: date -> {slot: value}
+    days = {}
+    written = 0
+    for moment, value in samples:
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        local = timezone.localtime(moment)
+        seconds = local.hour * 3600 + local.minute * 60 + local.second
+        days.setdefault(local.date(), {})[seconds // interval_seconds] = _slot_value(value)
+        written += 1
+    if not days:
+        return {'written': 0, 'days': 0}
+
+    with transaction.atomic():
+        existing = {
+            series.date: series
+            for series in BiometricSeries.objects.select_for_update().filter(user=user, metric=metric, date__in=list(days))
+        }
+        to_create, to_update = [], []
+        for day, slots in days.items():
+            series = existing.get(day)
+            if series is None:
+                values = array('H')
+                series = BiometricSeries(user=user, metric=metric, date=day, start_time=day_start(day),
+                                         interval_seconds=interval_seconds)
+                to_create.append(series)
+            else:
+                if series.interval_seconds != interval_seconds:
+                    raise ValueError(f'{day} 已有数据的采样间隔为 {series.interval_seconds} 秒，不能混用')
+                values = to_array(series.samples)
+                to_update.append(series)
+
+            last_slot = max(slots)
+            if last_slot >= len(values):
+                values.extend(array('H', [MISSING]) * (last_slot + 1 - len(values)))
+            for slot, value in slots.items():
+                values[slot] = value
+            series.samples = encode(values)
+            series.updated_at = timezone.now()
+
+        BiometricSeries.objects.bulk_create(to_create)
+        BiometricSeries.objects.bulk_update(to_update, ['samples', 'updated_at'])
+    return {'written': written, 'days': len(days)}
+
+
+def append_values(user, metric, start, values, interval_seconds=DEFAULT_INTERVAL):
+    """追加一段等间隔的采样：第 i 个值对应 start + i * interval_seconds"""
+    step = timedelta(seconds=interval_seconds)
+    return append_samples(user, metric, ((start + step * i, value) for i, value in enumerate(values)), interval_seconds)
+
+
+def read_range(user, metric, start, end):
+    """
+    读取 [start, end) 区间内的采样。
+
+    返回:
+        (grid_start, interval_seconds, array('H'))：grid_start 是第一个采样格的时间，
+        缺失的采样为 MISSING。区间内没有任何数据时使用默认采样间隔。
+    异常:
+        ValueError: 区间内各天的采样间隔不一致
+    """
+    start_local, end_local = timezone.localtime(start), timezone.localtime(end)
+    rows = list(
+        BiometricSeries.objects
+        .filter(user=user, metric=metric, date__gte=start_local.date(), date__lte=end_local.date())
+        .order_by('date')
+        .values_list('start_time', 'interval_seconds', 'samples')
+    )
+    intervals = {interval for _, interval, _ in rows}
+    if len(intervals) > 1:
+        raise ValueError('区间内各天的采样间隔不一致，无法拼接')
+    interval = intervals.pop() if intervals else DEFAULT_INTERVAL
+
+    midnight = day_start(start_local.date())
+    first_slot = int((start - midnight).total_seconds()) // interval
+    grid_start = midnight + timedelta(seconds=first_slot * interval)
+    total = max(0, math.ceil((end - grid_start).total_seconds() / interval))
+
+    result = array('H', [MISSING]) * total
+    target = memoryview(result)
+    for row_start, _, blob in rows:
+        source = decode(blob)
+        offset = int((row_start - grid_start).total_seconds()) // interval
+        src_from, src_to = max(0, -offset), min(len(source), total - offset)
+        if src_from < src_to:
+            target[offset + src_from:offset + src_to] = source[src_from:src_to]
+    return grid_start, interval, result
+
+
+def downsample(values, factor, how='mean'):
+    """
+    每 factor 个采样聚合为一个值，忽略缺失采样；整组缺失时为 None。
+
+    返回:
+        list[int | float | None]
+    """
+    if how not in AGGREGATES:
+        raise ValueError(f"不支持的聚合方式: {how}，可用: {', '.join(AGGREGATES)}")
+    if factor <= 1:
+        return [None if value == MISSING else value for value in values]
+
+    if not len(values):
+        return []
+
+    data = np.frombuffer(values, dtype=np.uint16)
+    padding = (-len(data)) % factor
+    if padding:
+        data = np.concatenate([data, np.full(padding, MISSING, dtype=np.uint16)])
+    data = data.reshape(-1, factor)
+    mask = data != MISSING
+    counts = mask.sum(axis=1)
+    if how in ('mean', 'sum'):
+        totals = np.where(mask, data, 0).sum(axis=1, dtype=np.int64)
+        result = totals / np.maximum(counts, 1) if how == 'mean' else totals
+    elif how == 'max':
+        result = np.where(mask, data, 0).max(axis=1)
+    else:
+        result = np.where(mask, data, MISSING).min(axis=1)
+    return [
+        None if count == 0 else (round(float(value), 1) if how == 'mean' else int(value))
+        for value, count in zip(result.tolist(), counts.tolist())
+    ]
@@ -120,11 +120,11 @@ class ExcelExporter:
         # 数据
         records = SleepRecord.objects.filter(
             user=user,
-            wakeup_time__date__range=[start_date, end_date]
+            wakeup_date__range=[start_date, end_date]
         ).order_by('wakeup_time')
         
         for row, record in enumerate(records, 2):
-            ws.cell(row=row, column=1, value=record.wakeup_time.date().isoformat())
+            ws.cell(row=row, column=1, value=record.wakeup_date.isoformat())
             ws.cell(row=row, column=2, value=record.sleep_time.strftime("%H:%M"))
             ws.cell(row=row, column=3, value=record.wakeup_time.strftime("%H:%M"))
             duration_hours = round(record.duration.total_seconds() / 3600, 2) if record.duration else 0
@@ -250,7 +250,9 @@ class ExcelImporter:
         wb = openpyxl.load_workbook(file)
         ws = wb.active
         
-        result = {'created': 0, 'updated': 0, 'errors': []}
+        result = {'created': 0, 'updated': 0, 'errors': [], 'meal_items_recalculated': 0}
+        touched_foods = []
+        calorie_changed_ids = []
         
         for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), 2):
             try:
@@ -275,17 +277,34 @@ class ExcelImporter:
                 
                 if created:
                     result['created'] += 1
+                    touched_foods.append(food)
                 elif update_existing:
+                    if food.calories_per_100g != calories:
+                        calorie_changed_ids.append(food.id)
                     food.calories_per_100g = calories
                     food.protein = protein
                     food.fat = fat
                     food.carbohydrates = carbs
                     food.save()
                     result['updated'] += 1
+                    touched_foods.append(food)
                     
             except Exception as e:
                 result['errors'].append(f"第 {row_num} 行: {str(e)}")
         
+        # 整个文件导入完成后递增一次食物库版本号
+        if touched_foods:
+            from .models import FoodCatalogVersion
+            FoodCatalogVersion.bump()
+
+        # 预计算拼音检索键
+        from .food_search import rebuild_pinyin_keys
+        rebuild_pinyin_keys(touched_foods)
+
+        # 热量有变化的食物，同步更新历史餐品的热量
+        from .food_sync import propagate_food_calories
+        result['meal_items_recalculated'] = propagate_food_calories(calorie_changed_ids)['meal_items']
+        
         return result
 
 
@@ -305,13 +324,13 @@ class CSVExporter:
         
         records = SleepRecord.objects.filter(
             user=user,
-            wakeup_time__date__range=[start_date, end_date]
+            wakeup_date__range=[start_date, end_date]
         ).order_by('wakeup_time')
         
         for record in records:
             duration_hours = round(record.duration.total_seconds() / 3600, 2) if record.duration else 0
             writer.writerow([
-                record.wakeup_time.date().isoformat(),
+                record.wakeup_date.isoformat(),
                 record.sleep_time.strftime("%H:%M"),
                 record.wakeup_time.strftime("%H:%M"),
                 duration_hours
@@ -0,0 +1,122 @@
+"""
+food_catalog.py - 食物库快照
+功能:
+1. 按食物库版本号 (FoodCatalogVersion) 生成紧凑的食物库快照：
+   id、名称、热量与三大营养素按列存放为平行数组，省去每条记录重复的字段名
+2. 快照预先 gzip 压缩后写入磁盘 (FOOD_CATALOG_SNAPSHOT_DIR)，每个版本只生成一次
+3. 为 /api/foods/ 提供 ETag，客户端凭 If-None-Match 重复访问时只需 304
+
+快照格式:
+    {
+        "version": 1723000000000,
+        "count": 2,
+        "id": [1, 2],
+        "name": ["米饭", "花生油"],
+        "calories_per_100g": [116.0, 899.0],
+        "protein": [2.6, null],
+        "fat": [0.3, 99.9],
+        "carbohydrates": [25.9, 0.0]
+    }
+"""
+import os
+import gzip
+import json
+import threading
+
+from django.conf import settings
+
+from .models import FoodItem, FoodCatalogVersion
+
+SNAPSHOT_FIELDS = ['id', 'name', 'calories_per_100g', 'protein', 'fat', 'carbohydrates']
+# 磁盘上保留的历史快照数量
+SNAPSHOT_KEEP = 2
+
+_snapshot_lock = threading.Lock()
+# 进程内缓存最近一次的快照: (version, gzip 字节)
+_snapshot_cache = (None, None)
+
+
+def get_catalog_version():
+    """当前食物库版本号"""
+    return FoodCatalogVersion.current()
+
+
+def catalog_etag(version):
+    """快照的 ETag；同一版本的 gzip 与未压缩表示内容相同，使用弱校验"""
+    return f'W/"foods-{version}"'
+
+
+def snapshot_dir():
+    return getattr(settings, 'FOOD_CATALOG_SNAPSHOT_DIR', os.path.join(settings.BASE_DIR, 'catalog_snapshots'))
+
+
+def snapshot_path(version):
+    return os.path.join(snapshot_dir(), f'foods-{version}.json.gz')
+
+
+def build_snapshot(version):
+    """从数据库读取食物库，生成列式快照并 gzip 压缩"""
+    columns = {field: [] for field in SNAPSHOT_FIELDS}
+    rows = FoodItem.objects.order_by('id').values_list(*SNAPSHOT_FIELDS).iterator(chunk_size=2000)
+    for row in rows:
+        for field, value in zip(SNAPSHOT_FIELDS, row):
+            columns[field].append(value)
+
+    payload = {'version': version, 'count': len(columns['id']), **columns}
+    raw = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # mtime=0 使同一内容的压缩结果稳定
+    return gzip.compress(raw, compresslevel=9, mtime=0)
+
+
+def _write_snapshot(version, data):
+    """原子写入快照文件，并清理过旧的版本"""
+    directory = snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(version)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+    snapshots = sorted(
+        (name for name in os.listdir(directory) if name.startswith('foods-') and name.endswith('.json.gz')),
+        key=lambda name: int(name[len('foods-'):-len('.json.gz')]),
+    )
+    for name in snapshots[:-SNAPSHOT_KEEP]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def get_snapshot(version):
+    """
+    获取指定版本的 gzip 快照：内存缓存 -> 磁盘文件 -> 重新生成。
+
+    返回:
+        bytes: gzip 压缩后的 JSON
+    """
+    global _snapshot_cache
+    cached_version, cached_data = _snapshot_cache
+    if cached_version == version:
+        return cached_data
+
+    with _snapshot_lock:
+        cached_version, cached_data = _snapshot_cache
+        if cached_version == version:
+            return cached_data
+
+        path = snapshot_path(version)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = build_snapshot(version)
+            try:
+                _write_snapshot(version, data)
+            except OSError as e:
+                # 磁盘不可写时仍可从内存提供快照
+                print(f"写入食物库快照失败: {e}")
+
+        _snapshot_cache = (version, data)
+        return data
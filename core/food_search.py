@@ -0,0 +1,324 @@
+"""
+food_search.py - 食物名称检索索引
+功能:
+1. 将食物名称拆分为主名称、方括号别名、括号限定词 (如 "黑豆（干）[黑大豆]")
+2. 在内存中构建字符 n-gram 倒排索引，支持中文子串与前缀匹配
+3. 按匹配质量 (完全匹配 > 前缀 > 子串 > 模糊) 返回 Top-K 结果
+4. 导入食物时预计算拼音/首字母检索键 (FoodSearchKey)，支持 "mifan" / "mf" 检索 (依赖 pypinyin)
+
+索引按进程缓存，食物库版本号 (FoodCatalogVersion) 变化时自动重建。
+"""
+import re
+import heapq
+import threading
+import unicodedata
+from collections import defaultdict
+
+from pypinyin import lazy_pinyin
+
+# 方括号中的内容是别名，例如 "菜籽油 [青油]"
+ALIAS_PATTERN = re.compile(r'\[(.*?)\]')
+# 圆括号中的内容是限定词，例如 "豆腐（北豆腐）"
+QUALIFIER_PATTERN = re.compile(r'\((.*?)\)')
+# 去掉括号后剩余的部分即主名称
+BRACKET_PATTERN = re.compile(r'\[.*?\]|\(.*?\)')
+
+NGRAM_SIZE = 2
+
+# 不同类型词条的权重：主名称 > 别名 > 限定词
+TERM_WEIGHTS = {'name': 1.0, 'alias': 0.9, 'qualifier': 0.5}
+
+# 匹配类型的基础得分
+SCORE_EXACT = 100
+SCORE_PREFIX = 80
+SCORE_SUBSTRING = 60
+SCORE_FUZZY = 30
+
+# 拼音检索：全拼匹配优先于首字母匹配
+PINYIN_KIND_WEIGHTS = {'pinyin': 1.0, 'initials': 0.9}
+# 一次拼音前缀查询最多读取的检索键数量
+PINYIN_SCAN_LIMIT = 500
+PINYIN_KEY_MAX_LENGTH = 200
+PINYIN_QUERY_PATTERN = re.compile(r'^[a-z0-9\s]+$')
+NON_ALNUM_PATTERN = re.compile(r'[^a-z0-9]')
+
+
+def normalize(text):
+    """统一全角/半角、大小写与空白，"（干）" 与 "(干)" 视为相同"""
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKC', text).lower()
+    return re.sub(r'\s+', '', text)
+
+
+def extract_terms(name):
+    """
+    把食物名称拆分为可检索的词条。
+
+    返回:
+        list[(term, kind)]，例如 "黑豆（干）[黑大豆]" ->
+        [('黑豆', 'name'), ('黑大豆', 'alias'), ('干', 'qualifier')]
+    """
+    text = unicodedata.normalize('NFKC', name or '')
+    terms = []
+    main_name = normalize(BRACKET_PATTERN.sub('', text))
+    if main_name:
+        terms.append((main_name, 'name'))
+    for alias in ALIAS_PATTERN.findall(text):
+        alias = normalize(alias)
+        if alias:
+            terms.append((alias, 'alias'))
+    for qualifier in QUALIFIER_PATTERN.findall(text):
+        qualifier = normalize(qualifier)
+        if qualifier:
+            terms.append((qualifier, 'qualifier'))
+    return terms
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    """生成字符 n-gram；长度不足 n 时返回文本本身"""
+    if len(text) <= n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class FoodSearchIndex:
+    """
+    食物名称的内存倒排索引。
+
+    - grams: n-gram -> 食物ID集合，用于快速求候选集
+    - chars: 单字 -> 食物ID集合，用于单字查询
+    - terms: 食物ID -> [(词条, 类型)]，用于候选校验和打分
+    """
+
+    def __init__(self):
+        self.version = None
+        self.grams = defaultdict(set)
+        self.chars = defaultdict(set)
+        self.terms = {}
+        self.foods = {}
+
+    def build(self, foods, version=None):
+        """
+        根据食物行构建索引。
+
+        参数:
+            foods: 可迭代的 (id, name, calories_per_100g) 元组
+            version: 食物库版本号，用于判断索引是否过期
+        """
+        grams = defaultdict(set)
+        chars = defaultdict(set)
+        terms = {}
+        records = {}
+        for food_id, name, calories in foods:
+            food_terms = extract_terms(name)
+            full_name = normalize(name)
+            if full_name and all(term != full_name for term, _ in food_terms):
+                food_terms.append((full_name, 'name'))
+            terms[food_id] = food_terms
+            records[food_id] = {'id': food_id, 'name': name, 'calories_per_100g': calories}
+            for term, _ in food_terms:
+                for gram in ngrams(term):
+                    grams[gram].add(food_id)
+                for char in term:
+                    chars[char].add(food_id)
+
+        self.grams, self.chars, self.terms, self.foods = grams, chars, terms, records
+        self.version = version
+        return self
+
+    def _score(self, food_id, query):
+        """计算某个食物与查询词的最佳匹配得分，未命中返回 0"""
+        best = 0
+        for term, kind in self.terms[food_id]:
+            if term == query:
+                score = SCORE_EXACT
+            elif term.startswith(query):
+                score = SCORE_PREFIX
+            else:
+                position = term.find(query)
+                if position < 0:
+                    continue
+                # 越靠前的子串匹配越相关
+                score = SCORE_SUBSTRING - min(position, 10)
+            # 查询词覆盖词条的比例越高，得分越高
+            coverage = len(query) / len(term)
+            best = max(best, score * TERM_WEIGHTS[kind] + coverage * 10)
+        return best
+
+    def search(self, query, limit=10):
+        """
+        检索食物。
+
+        返回:
+            list[dict]，每项包含 id, name, calories_per_100g, score，按得分降序
+        """
+        query = normalize(query)
+        if not query or limit <= 0:
+            return []
+
+        if len(query) < NGRAM_SIZE:
+            candidates = self.chars.get(query, set())
+            query_grams = {query}
+        else:
+            query_grams = ngrams(query)
+            postings = [self.grams.get(gram, set()) for gram in query_grams]
+            # 从最短的倒排表开始求交集
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting
+                if not candidates:
+                    break
+
+        scored = []
+        for food_id in candidates:
+            score = self._score(food_id, query)
+            if score > 0:
+                scored.append((score, food_id))
+
+        # 没有精确子串命中时，退化为 n-gram 重叠度的模糊匹配
+        if not scored and len(query_grams) > 1:
+            overlap = defaultdict(int)
+            for gram in query_grams:
+                for food_id in self.grams.get(gram, ()):
+                    overlap[food_id] += 1
+            threshold = (len(query_grams) + 1) // 2
+            for food_id, hits in overlap.items():
+                if hits >= threshold:
+                    scored.append((SCORE_FUZZY * hits / len(query_grams), food_id))
+
+        # 得分相同时，名称更短、ID 更小的排在前面
+        top = heapq.nsmallest(
+            limit, scored,
+            key=lambda item: (-item[0], len(self.foods[item[1]]['name']), item[1])
+        )
+        return [dict(self.foods[food_id], score=round(score, 2)) for score, food_id in top]
+
+
+_index = FoodSearchIndex()
+_index_lock = threading.Lock()
+
+
+def get_food_index():
+    """获取当前进程的食物索引，食物库版本变化时自动重建"""
+    global _index
+    from .models import FoodItem, FoodCatalogVersion
+
+    version = FoodCatalogVersion.current()
+    if _index.version == version:
+        return _index
+    with _index_lock:
+        if _index.version != version:
+            rows = FoodItem.objects.values_list('id', 'name', 'calories_per_100g').iterator()
+            _index = FoodSearchIndex().build(rows, version)
+    return _index
+
+
+def pinyin_keys(name):
+    """
+    计算食物名称的拼音检索键 (不含括号限定词)。
+
+    返回:
+        set[(key, kind, is_alias)]，例如 "菜籽油 [青油]" ->
+        {('caiziyou', 'pinyin', False), ('czy', 'initials', False),
+         ('qingyou', 'pinyin', True), ('qy', 'initials', True)}
+    """
+    keys = set()
+    for term, kind in extract_terms(name):
+        if kind == 'qualifier':
+            continue
+        syllables = [NON_ALNUM_PATTERN.sub('', s.lower()) for s in lazy_pinyin(term)]
+        syllables = [s for s in syllables if s]
+        if not syllables:
+            continue
+        is_alias = kind == 'alias'
+        keys.add((''.join(syllables)[:PINYIN_KEY_MAX_LENGTH], 'pinyin', is_alias))
+        keys.add((''.join(s[0] for s in syllables)[:PINYIN_KEY_MAX_LENGTH], 'initials', is_alias))
+    return keys
+
+
+def rebuild_pinyin_keys(foods, batch_size=500):
+    """
+    为给定食物重建拼音检索键 (批量删除旧键 + bulk_create 新键)。
+    由各个食物导入入口在导入完成后调用。
+
+    参数:
+        foods: FoodItem 实例的可迭代对象 (只需 id 和 name)
+    返回:
+        int: 写入的检索键数量
+    """
+    from django.db import transaction
+    from .models import FoodSearchKey
+
+    foods = list(foods)
+    created = 0
+    for start in range(0, len(foods), batch_size):
+        batch = foods[start:start + batch_size]
+        keys = [
+            FoodSearchKey(food_item_id=food.id, key=key, kind=kind, is_alias=is_alias)
+            for food in batch
+            for key, kind, is_alias in pinyin_keys(food.name)
+        ]
+        with transaction.atomic():
+            FoodSearchKey.objects.filter(food_item_id__in=[food.id for food in batch]).delete()
+            FoodSearchKey.objects.bulk_create(keys)
+        created += len(keys)
+    return created
+
+
+def is_pinyin_query(query):
+    """只包含字母、数字和空白的查询按拼音检索处理"""
+    return bool(query) and bool(PINYIN_QUERY_PATTERN.match(query.lower()))
+
+
+def search_pinyin(query, limit=10, index=None):
+    """
+    在拼音检索键上做前缀范围查询 (key >= q AND key < q的后继)，走 key 列索引。
+
+    返回:
+        list[dict]，格式与 FoodSearchIndex.search 相同
+    """
+    from .models import FoodSearchKey
+
+    query = NON_ALNUM_PATTERN.sub('', query.lower())
+    if not query:
+        return []
+    index = index or get_food_index()
+    upper = query[:-1] + chr(ord(query[-1]) + 1)
+    rows = (
+        FoodSearchKey.objects
+        .filter(key__gte=query, key__lt=upper)
+        .order_by('key')
+        .values_list('food_item_id', 'key', 'kind', 'is_alias')[:PINYIN_SCAN_LIMIT]
+    )
+
+    best = {}
+    for food_id, key, kind, is_alias in rows:
+        if food_id not in index.foods:
+            continue
+        score = SCORE_EXACT if key == query else SCORE_PREFIX
+        score *= PINYIN_KIND_WEIGHTS[kind] * (TERM_WEIGHTS['alias'] if is_alias else 1.0)
+        score += len(query) / len(key) * 10
+        best[food_id] = max(best.get(food_id, 0), score)
+
+    top = heapq.nsmallest(
+        limit, best.items(),
+        key=lambda item: (-item[1], len(index.foods[item[0]]['name']), item[0])
+    )
+    return [dict(index.foods[food_id], score=round(score, 2)) for food_id, score in top]
+
+
+def search_foods(query, limit=10):
+    """便捷函数：在当前食物库中检索，字母查询同时匹配拼音检索键"""
+    index = get_food_index()
+    results = index.search(query, limit)
+    if not is_pinyin_query(query):
+        return results
+
+    merged = {item['id']: item for item in results}
+    for item in search_pinyin(query, limit, index):
+        if item['id'] not in merged or item['score'] > merged[item['id']]['score']:
+            merged[item['id']] = item
+    ranked = sorted(merged.values(), key=lambda item: (-item['score'], len(item['name']), item['id']))
+    return ranked[:limit]
@@ -0,0 +1,53 @@
+"""
+food_sync.py - 食物营养数据变更同步
+功能:
+1. 食物的每100g热量被修改后，重新计算引用这些食物的历史餐品 (MealItem) 热量
+2. 同步更新饮食模板条目 (MealTemplateItem) 中保存的热量
+
+使用一条集合式 UPDATE (关联子查询按主键取食物热量) 完成，不逐条加载和保存餐品；
+食物ID较多时按批拆分，避免超出 SQLite 的参数个数限制。
+餐次总热量 (Meal.total_calories) 与视图 v_user_daily_summary 均由餐品实时汇总，无需单独刷新。
+"""
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+
+from .models import FoodItem, MealItem, MealTemplateItem, calculate_item_calories
+
+# 每条 UPDATE 语句中最多包含的食物ID数量
+FOOD_ID_BATCH_SIZE = 500
+
+
+def _recalculate(model, food_ids):
+    """对指定模型执行 calories_calculated = 食物每100g热量 / 100 * portion"""
+    calories_per_100g = Subquery(
+        FoodItem.objects.filter(pk=OuterRef('food_item_id')).values('calories_per_100g')[:1]
+    )
+    queryset = model.objects.all()
+    if food_ids is not None:
+        queryset = queryset.filter(food_item_id__in=food_ids)
+    return queryset.update(calories_calculated=calculate_item_calories(calories_per_100g, F('portion')))
+
+
+def propagate_food_calories(food_ids=None):
+    """
+    把食物热量的变更同步到已有的餐品和饮食模板条目。
+
+    参数:
+        food_ids: 发生变化的食物ID；为 None 时重新计算全部记录
+    返回:
+        dict: {'meal_items': 更新的餐品数, 'template_items': 更新的模板条目数}
+    """
+    result = {'meal_items': 0, 'template_items': 0}
+    if food_ids is not None:
+        food_ids = sorted(set(food_ids))
+        if not food_ids:
+            return result
+        batches = [food_ids[i:i + FOOD_ID_BATCH_SIZE] for i in range(0, len(food_ids), FOOD_ID_BATCH_SIZE)]
+    else:
+        batches = [None]
+
+    with transaction.atomic():
+        for batch in batches:
+            result['meal_items'] += _recalculate(MealItem, batch)
+            result['template_items'] += _recalculate(MealTemplateItem, batch)
+    return result
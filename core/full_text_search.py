@@ -0,0 +1,205 @@
+"""
+full_text_search.py - 基于 SQLite FTS5 的全文检索
+功能:
+1. 食物名称 (core_fooditem_fts) 与健康文章标题/正文 (core_healtharticle_fts) 的全文检索
+2. 按 bm25 相关度排序，并返回高亮后的摘要片段 (snippet)
+3. 按全文检索结果过滤查询集 (管理后台搜索)，命中的 rowid 以子查询的形式留在数据库中
+
+FTS5 表与同步触发器由迁移 0009 创建 (SQL 定义见 sql_procedures.py)。
+表使用 trigram 分词器，以支持不分词的中文子串检索：
+- 3 个字符及以上的查询词直接作为短语匹配；
+- 1~2 个字符的查询词无法构成 trigram，先在 fts5vocab 词表中按前缀范围
+  查出所有以它开头的 trigram，再以 OR 组合匹配。为了让每个字符都能作为
+  trigram 的开头，写入索引的文本末尾补了两个空格 (见 FTS_PADDING)。
+非 SQLite 数据库或 FTS 表缺失时，自动退化为 icontains 查询。
+"""
+import html
+
+from django.db import connection, DatabaseError
+
+FOOD_FTS_TABLE = 'core_fooditem_fts'
+FOOD_FTS_VOCAB = 'core_fooditem_fts_vocab'
+ARTICLE_FTS_TABLE = 'core_healtharticle_fts'
+ARTICLE_FTS_VOCAB = 'core_healtharticle_fts_vocab'
+
+# 写入 FTS 表时在文本末尾追加的填充，保证末尾字符也能作为 trigram 的开头
+FTS_PADDING = '  '
+TRIGRAM_SIZE = 3
+# 短查询词在词表中最多展开的 trigram 数量
+MAX_EXPANDED_TERMS = 500
+# 文章检索中标题相对正文的 bm25 权重
+ARTICLE_TITLE_WEIGHT = 10.0
+
+# 高亮使用不可见的控制字符作为占位，转义 HTML 后再替换成 <mark> 标签
+_MARK_OPEN, _MARK_CLOSE = '\x02', '\x03'
+
+
+def fts_enabled():
+    """只有 SQLite 后端才有 FTS5 虚拟表"""
+    return connection.vendor == 'sqlite'
+
+
+def render_highlight(text):
+    """把 FTS5 返回的带占位符文本转成安全的 HTML 片段"""
+    text = html.escape((text or '').rstrip())
+    return text.replace(_MARK_OPEN, '<mark>').replace(_MARK_CLOSE, '</mark>')
+
+
+def _quote(term):
+    """FTS5 短语需要用双引号包裹，内部双引号写两次转义"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match_expression(cursor, query, vocab_table):
+    """
+    将用户输入转换为 FTS5 MATCH 表达式。
+
+    多个空格分隔的词之间为 AND 关系；任何一个短词在词表中找不到时返回 None。
+    """
+    parts = []
+    for word in query.lower().split():
+        if len(word) >= TRIGRAM_SIZE:
+            parts.append(_quote(word))
+            continue
+        cursor.execute(
+            f'SELECT term FROM {vocab_table} WHERE term >= %s AND term < %s LIMIT %s',
+            [word, word + '\U0010ffff', MAX_EXPANDED_TERMS]
+        )
+        terms = [row[0] for row in cursor.fetchall()]
+        if not terms:
+            return None
+        parts.append('(' + ' OR '.join(_quote(term) for term in terms) + ')')
+    return ' AND '.join(parts) or None
+
+
+def search_food_items(query, limit=20):
+    """
+    全文检索食物名称。
+
+    返回:
+        list[dict]: [{'id', 'rank', 'snippet'}]，按相关度降序；limit 为 None 时不限数量
+    """
+    if fts_enabled():
+        try:
+            with connection.cursor() as cursor:
+                match = build_match_expression(cursor, query, FOOD_FTS_VOCAB)
+                if match is None:
+                    return []
+                cursor.execute(
+                    f"""
+                    SELECT rowid, highlight({FOOD_FTS_TABLE}, 0, %s, %s), bm25({FOOD_FTS_TABLE})
+                    FROM {FOOD_FTS_TABLE}
+                    WHERE {FOOD_FTS_TABLE} MATCH %s
+                    ORDER BY bm25({FOOD_FTS_TABLE})
+                    LIMIT %s
+                    """,
+                    [_MARK_OPEN, _MARK_CLOSE, match, -1 if limit is None else limit]
+                )
+                return [
+                    {'id': food_id, 'rank': round(-score, 4), 'snippet': render_highlight(snippet)}
+                    for food_id, snippet, score in cursor.fetchall()
+                ]
+        except DatabaseError as e:
+            print(f"食物全文检索失败，退化为模糊查询: {e}")
+
+    from .models import FoodItem
+    foods = FoodItem.objects.filter(name__icontains=query).order_by('name').values_list('id', 'name')
+    if limit is not None:
+        foods = foods[:limit]
+    return [{'id': food_id, 'rank': 0, 'snippet': html.escape(name)} for food_id, name in foods]
+
+
+def _filter_by_match(queryset, query, fts_table, vocab_table):
+    """
+    queryset.filter(id IN (全文检索命中的 rowid))，用子查询实现，不把命中的ID取回 Python，
+    宽泛的查询命中大量记录时也不会产生超长的 IN 列表 (SQLite 对参数个数有上限)。
+
+    返回:
+        QuerySet；全文检索不可用时返回 None，由调用方退化为 icontains 查询
+    """
+    if not fts_enabled():
+        return None
+    try:
+        with connection.cursor() as cursor:
+            match = build_match_expression(cursor, query, vocab_table)
+    except DatabaseError as e:
+        print(f"全文检索失败，退化为模糊查询: {e}")
+        return None
+    if match is None:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    return queryset.extra(where=[f'{table}.id IN (SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s)'], params=[match])
+
+
+def filter_food_items(queryset, query):
+    """按食物名称全文检索过滤食物查询集"""
+    filtered = _filter_by_match(queryset, query, FOOD_FTS_TABLE, FOOD_FTS_VOCAB)
+    return queryset.filter(name__icontains=query) if filtered is None else filtered
+
+
+def filter_articles(queryset, query):
+    """按标题与正文全文检索过滤文章查询集"""
+    from django.db.models import Q
+    filtered = _filter_by_match(queryset, query, ARTICLE_FTS_TABLE, ARTICLE_FTS_VOCAB)
+    if filtered is None:
+        return queryset.filter(Q(title__icontains=query) | Q(content__icontains=query))
+    return filtered
+
+
+def search_articles(query, limit=20, category_id=None):
+    """
+    全文检索健康文章的标题与正文。
+
+    返回:
+        list[dict]: [{'id', 'rank', 'title_highlight', 'snippet'}]，按相关度降序
+    """
+    if fts_enabled():
+        try:
+            with connection.cursor() as cursor:
+                match = build_match_expression(cursor, query, ARTICLE_FTS_VOCAB)
+                if match is None:
+                    return []
+                params = [_MARK_OPEN, _MARK_CLOSE, _MARK_OPEN, _MARK_CLOSE, ARTICLE_TITLE_WEIGHT, match]
+                category_clause = ''
+                if category_id:
+                    category_clause = 'AND a.category_id = %s'
+                    params.append(category_id)
+                params.append(-1 if limit is None else limit)
+                cursor.execute(
+                    f"""
+                    SELECT f.rowid,
+                           highlight({ARTICLE_FTS_TABLE}, 0, %s, %s),
+                           snippet({ARTICLE_FTS_TABLE}, 1, %s, %s, '…', 24),
+                           bm25({ARTICLE_FTS_TABLE}, %s, 1.0) AS score
+                    FROM {ARTICLE_FTS_TABLE} f
+                    JOIN core_healtharticle a ON a.id = f.rowid
+                    WHERE {ARTICLE_FTS_TABLE} MATCH %s {category_clause}
+                    ORDER BY score
+                    LIMIT %s
+                    """,
+                    params
+                )
+                return [
+                    {
+                        'id': article_id,
+                        'rank': round(-score, 4),
+                        'title_highlight': render_highlight(title),
+                        'snippet': render_highlight(snippet),
+                    }
+                    for article_id, title, snippet, score in cursor.fetchall()
+                ]
+        except DatabaseError as e:
+            print(f"文章全文检索失败，退化为模糊查询: {e}")
+
+    from django.db.models import Q
+    from .models import HealthArticle
+    articles = HealthArticle.objects.filter(Q(title__icontains=query) | Q(content__icontains=query))
+    if category_id:
+        articles = articles.filter(category_id=category_id)
+    articles = articles.values_list('id', 'title', 'content')
+    if limit is not None:
+        articles = articles[:limit]
+    return [
+        {'id': article_id, 'rank': 0, 'title_highlight': html.escape(title), 'snippet': html.escape(content[:64])}
+        for article_id, title, content in articles
+    ]
@@ -0,0 +1,30 @@
+"""
+Django Management Command: archive_system_logs
+把超过保留期的系统日志按月归档为 gzip 压缩的 JSON Lines 文件，并从数据库中分批删除
+
+使用方法: python manage.py archive_system_logs [--days 90] [--dir audit_logs]
+建议每天定时执行一次；归档的日志可用 load_system_logs 按日期导回
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.audit_log import ARCHIVE_CHUNK_SIZE, archive_old_logs
+
+
+class Command(BaseCommand):
+    help = '归档并删除超过保留天数的系统日志'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='保留最近多少天的日志，默认 settings.SYSTEM_LOG_RETENTION_DAYS')
+        parser.add_argument('--dir', help='归档目录，默认 settings.SYSTEM_LOG_DIR')
+        parser.add_argument('--chunk-size', type=int, default=ARCHIVE_CHUNK_SIZE, help='每批归档、删除的日志数')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days 不能为负数')
+        result = archive_old_logs(options['days'], options['dir'], options['chunk_size'])
+        if not result['archived']:
+            self.stdout.write('没有需要归档的日志')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'已归档并删除 {result["archived"]} 条日志: {", ".join(result["files"])}'
+        ))
@@ -3,7 +3,9 @@
 import json
 from pathlib import Path
 from django.core.management.base import BaseCommand, CommandError
-from core.models import FoodItem
+from core.models import FoodItem, FoodCatalogVersion
+from core.food_search import rebuild_pinyin_keys
+from core.food_sync import propagate_food_calories
 
 class Command(BaseCommand):
     help = '从指定目录下的所有JSON文件导入食物数据到FoodItem数据库中'
@@ -49,6 +51,7 @@ class Command(BaseCommand):
         created_count = 0
         updated_count = 0
         skipped_count = 0
+        imported_foods = []
 
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
@@ -61,6 +64,13 @@ class Command(BaseCommand):
             self.stderr.write(self.style.ERROR(f'文件 "{file_path.name}" 的JSON顶层结构不是一个列表。'))
             return 0, 0, 1
 
+        # 一次查出本文件中已存在食物的原热量，用于判断哪些食物的热量被修改
+        codes = [item.get('foodCode') for item in data if isinstance(item, dict) and item.get('foodCode')]
+        old_calories = dict(
+            FoodItem.objects.filter(product_code__in=codes).values_list('product_code', 'calories_per_100g')
+        )
+        calorie_changed_ids = []
+
         for item in data:
             food_name = item.get('foodName')
             calories_str = item.get('energyKCal')
@@ -97,7 +107,7 @@ class Command(BaseCommand):
                 continue
 
             try:
-                _, created = FoodItem.objects.update_or_create(
+                food, created = FoodItem.objects.update_or_create(
                     product_code=product_code,
                     defaults={
                         'name': food_name,
@@ -107,12 +117,29 @@ class Command(BaseCommand):
                         'carbohydrates': carbs_float, # 注意模型的字段名是 carbohydrates
                     }
                 )
+                imported_foods.append(food)
                 if created:
                     created_count += 1
                 else:
                     updated_count += 1
+                    if old_calories.get(product_code) != calories_float:
+                        calorie_changed_ids.append(food.id)
             except Exception as e:
                 self.stderr.write(self.style.ERROR(f'导入 "{food_name}" 时数据库出错: {e}'))
                 skipped_count += 1
+
+        # 整个文件导入完成后递增一次食物库版本号
+        if imported_foods:
+            FoodCatalogVersion.bump()
+
+        # 为本文件导入的食物预计算拼音检索键
+        key_count = rebuild_pinyin_keys(imported_foods)
+        if key_count:
+            self.stdout.write(f'已生成拼音检索键 {key_count} 条')
+
+        # 热量有变化的食物，同步更新历史餐品的热量
+        synced = propagate_food_calories(calorie_changed_ids)
+        if synced['meal_items']:
+            self.stdout.write(f'已重新计算 {synced["meal_items"]} 条历史餐品的热量')
         
         return created_count, updated_count, skipped_count
\ No newline at end of file
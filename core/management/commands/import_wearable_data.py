@@ -0,0 +1,46 @@
+"""
+Django Management Command: import_wearable_data
+从手环/手机健康数据导出文件 (CSV、JSON、Apple Health export.xml / export.zip) 导入睡眠和运动记录
+
+使用方法: python manage.py import_wearable_data <文件路径> --user <用户名> [--format xml]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.models import CustomUser
+from core.wearable_import import SUPPORTED_FORMATS, detect_format, import_wearable_file
+
+
+class Command(BaseCommand):
+    help = '流式导入可穿戴设备导出的睡眠和运动数据'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_path', type=str, help='导出文件路径')
+        parser.add_argument('--user', required=True, help='记录所属的用户名')
+        parser.add_argument('--format', choices=SUPPORTED_FORMATS, help='文件格式，默认根据扩展名判断')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批写入的记录数')
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(username=options['user'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f'用户 "{options["user"]}" 不存在。')
+
+        file_path = options['file_path']
+        fmt = detect_format(file_path, options['format'])
+        if fmt is None:
+            raise CommandError(f'无法识别文件格式，请使用 --format 指定 ({", ".join(SUPPORTED_FORMATS)})')
+
+        try:
+            with open(file_path, 'rb') as f:
+                result = import_wearable_file(user, f, fmt, options['batch_size'])
+        except OSError as e:
+            raise CommandError(f'无法读取文件: {e}')
+        except Exception as e:
+            raise CommandError(f'导入失败: {e}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'导入完成: 睡眠记录 {result["sleep_created"]} 条, 运动记录 {result["sport_created"]} 条, '
+            f'重复 {result["duplicates"]} 条, 跳过 {result["skipped"]} 条'
+        ))
+        for message in result['errors']:
+            self.stdout.write(self.style.WARNING(f'  - {message}'))
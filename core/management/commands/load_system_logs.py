@@ -0,0 +1,38 @@
+"""
+Django Management Command: load_system_logs
+把写入文件的系统日志 (SYSTEM_LOG_SINK = 'file' / 'both') 按日期区间导回 SystemLog 表，便于用 SQL 排查
+
+使用方法: python manage.py load_system_logs --start 2025-08-01 --end 2025-08-07 [--dir audit_logs]
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.audit_log import load_segments, log_dir
+
+
+class Command(BaseCommand):
+    help = '将日志文件中指定日期区间的系统日志导回数据库'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', required=True, help='开始日期 (YYYY-MM-DD)')
+        parser.add_argument('--end', help='结束日期 (YYYY-MM-DD)，默认与开始日期相同')
+        parser.add_argument('--dir', help='日志文件目录，默认 settings.SYSTEM_LOG_DIR')
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end']) if options['end'] else start
+        except ValueError:
+            raise CommandError('日期格式应为 YYYY-MM-DD')
+        if start > end:
+            raise CommandError('开始日期不能晚于结束日期')
+
+        directory = options['dir'] or log_dir()
+        result = load_segments(start, end, directory)
+        if not result['files']:
+            self.stdout.write(self.style.WARNING(f'{directory} 中没有 {start} ~ {end} 的日志文件'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'读取日志文件 {result["files"]} 个, 导入 {result["loaded"]} 条, 跳过已存在的 {result["duplicates"]} 条'
+        ))
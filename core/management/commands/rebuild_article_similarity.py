@@ -0,0 +1,18 @@
+"""
+Django Management Command: rebuild_article_similarity
+根据全部阅读历史重新计算文章共读矩阵 (文章推荐使用)
+
+使用方法: python manage.py rebuild_article_similarity
+建议定期执行 (如每天一次)，修正增量更新期间因删除阅读记录、文章等造成的偏差
+"""
+from django.core.management.base import BaseCommand
+
+from core.recommendations import rebuild_similarity
+
+
+class Command(BaseCommand):
+    help = '根据阅读历史重新计算文章共读矩阵'
+
+    def handle(self, *args, **options):
+        pair_count = rebuild_similarity()
+        self.stdout.write(self.style.SUCCESS(f'已生成文章共读关系 {pair_count} 条'))
@@ -0,0 +1,19 @@
+"""
+Django Management Command: rebuild_food_pinyin
+为食物库中的所有食物重新生成拼音/首字母检索键
+
+使用方法: python manage.py rebuild_food_pinyin
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import FoodItem
+from core.food_search import rebuild_pinyin_keys
+
+
+class Command(BaseCommand):
+    help = '为所有食物重新生成拼音检索键'
+
+    def handle(self, *args, **options):
+        foods = FoodItem.objects.only('id', 'name').order_by('id')
+        key_count = rebuild_pinyin_keys(foods.iterator(chunk_size=2000))
+        self.stdout.write(self.style.SUCCESS(f'已为 {foods.count()} 个食物生成拼音检索键 {key_count} 条'))
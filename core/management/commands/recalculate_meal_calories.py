@@ -0,0 +1,19 @@
+"""
+Django Management Command: recalculate_meal_calories
+按食物库当前的热量数据，重新计算所有历史餐品和饮食模板条目的热量
+
+使用方法: python manage.py recalculate_meal_calories
+"""
+from django.core.management.base import BaseCommand
+
+from core.food_sync import propagate_food_calories
+
+
+class Command(BaseCommand):
+    help = '按食物库当前数据重新计算所有餐品的热量'
+
+    def handle(self, *args, **options):
+        result = propagate_food_calories()
+        self.stdout.write(self.style.SUCCESS(
+            f'已重新计算 {result["meal_items"]} 条餐品、{result["template_items"]} 条饮食模板条目的热量'
+        ))
@@ -0,0 +1,161 @@
+"""
+metrics.py - 接口耗时与数据库查询的进程内统计
+功能:
+1. 按 "HTTP 方法 + 路由 (URL 名称)" 统计请求数、各状态码类别 (2xx/4xx/5xx) 的响应数
+2. 三个直方图：请求总耗时、每个请求的数据库查询数、每个请求的数据库耗时
+   直方图只累加各桶计数与总和，记录一次请求只需几次比较和加法
+3. 输出为 Prometheus 文本格式 (render_prometheus) 或 JSON (snapshot)，由 /api/metrics/ 提供 (仅管理员)
+
+采集由 core.middleware.MetricsMiddleware 完成，settings.METRICS_ENABLED = False 时中间件不加载，没有任何开销。
+统计只在当前进程内，多进程部署时每个进程各自统计。
+"""
+import time
+import threading
+from bisect import bisect_left
+
+# 直方图的桶上界 (le)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+DB_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+# 直方图名称 -> (说明, 桶上界)
+HISTOGRAMS = {
+    'http_request_duration_seconds': ('接口总耗时 (秒)', LATENCY_BUCKETS),
+    'http_request_db_queries': ('每个请求执行的数据库查询数', QUERY_COUNT_BUCKETS),
+    'http_request_db_duration_seconds': ('每个请求的数据库耗时 (秒)', DB_TIME_BUCKETS),
+}
+
+
+class Histogram:
+    """固定桶的直方图：counts[i] 是落在 (buckets[i-1], buckets[i]] 的次数，最后一格为 +Inf"""
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(le, 累计次数)]，与 Prometheus 的 _bucket 一致"""
+        result, running = [], 0
+        for le, n in zip(list(self.buckets) + ['+Inf'], self.counts):
+            running += n
+            result.append((le, running))
+        return result
+
+    def quantile(self, q):
+        """按桶估算分位数 (返回所在桶的上界)，超过最大桶时返回 None"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for le, running in self.cumulative():
+            if running >= rank:
+                return None if le == '+Inf' else le
+        return None
+
+
+class RouteStats:
+    __slots__ = ('responses', 'histograms')
+
+    def __init__(self):
+        self.responses = {}
+        self.histograms = {name: Histogram(buckets) for name, (_, buckets) in HISTOGRAMS.items()}
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.started = time.time()
+
+    def record(self, method, route, status_code, duration, queries, db_duration):
+        key = (method, route)
+        status = f'{status_code // 100}xx'
+        with self.lock:
+            stats = self.routes.get(key)
+            if stats is None:
+                stats = self.routes[key] = RouteStats()
+            stats.responses[status] = stats.responses.get(status, 0) + 1
+            histograms = stats.histograms
+            histograms['http_request_duration_seconds'].observe(duration)
+            histograms['http_request_db_queries'].observe(queries)
+            histograms['http_request_db_duration_seconds'].observe(db_duration)
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+            self.started = time.time()
+
+    def snapshot(self):
+        """
+        JSON 格式的统计。
+
+        返回:
+            dict: {'uptime_seconds', 'routes': [{'method', 'route', 'count', 'responses', 'latency', 'db_queries', 'db_time'}]}，
+            按总耗时降序
+        """
+        with self.lock:
+            routes = []
+            for (method, route), stats in self.routes.items():
+                latency, queries, db_time = (stats.histograms[name] for name in HISTOGRAMS)
+                routes.append({
+                    'method': method,
+                    'route': route,
+                    'count': latency.count,
+                    'responses': dict(stats.responses),
+                    'latency': _summary(latency, 6),
+                    'db_queries': _summary(queries, 2),
+                    'db_time': _summary(db_time, 6),
+                })
+            uptime = time.time() - self.started
+        routes.sort(key=lambda item: -item['latency']['sum'])
+        return {'uptime_seconds': round(uptime, 1), 'routes': routes}
+
+    def render_prometheus(self):
+        """Prometheus 文本格式 (text/plain; version=0.0.4)"""
+        lines = []
+        with self.lock:
+            items = sorted(self.routes.items())
+            lines.append('# HELP http_responses_total 按状态码类别统计的响应数')
+            lines.append('# TYPE http_responses_total counter')
+            for (method, route), stats in items:
+                for status, n in sorted(stats.responses.items()):
+                    lines.append(f'http_responses_total{{{_labels(method, route)},status="{status}"}} {n}')
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (method, route), stats in items:
+                    histogram = stats.histograms[name]
+                    labels = _labels(method, route)
+                    for le, running in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {running}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.total:.6f}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _summary(histogram, digits):
+    return {
+        'sum': round(histogram.total, digits),
+        'avg': round(histogram.total / histogram.count, digits) if histogram.count else None,
+        'p50': histogram.quantile(0.5),
+        'p95': histogram.quantile(0.95),
+        'p99': histogram.quantile(0.99),
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(method, route):
+    return f'method="{_escape(method)}",route="{_escape(route)}"'
+
+
+registry = MetricsRegistry()
@@ -1,8 +1,19 @@
 """
 System Logging Middleware (Member A)
 记录用户的关键操作到 SystemLog 表，用于安全审计。
+日志交给后台线程批量写入 (core/audit_log.py)，不再给每次写请求增加一次数据库写入。
+
+MetricsMiddleware: 统计每个接口的耗时、数据库查询数和数据库耗时 (core/metrics.py)。
 """
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
 from .models import SystemLog
+from .audit_log import system_log_writer
+from .metrics import registry
 
 
 def get_client_ip(request):
@@ -52,7 +63,7 @@ class SystemLoggingMiddleware:
         return response
 
     def _log_action(self, request, response):
-        """记录操作到数据库"""
+        """把操作日志提交给后台写入线程"""
         try:
             user = request.user if request.user.is_authenticated else None
             action = f"{request.method} {request.path}"
@@ -68,12 +79,65 @@ class SystemLoggingMiddleware:
                 if body:
                     details += f" | Data: {body}"
             
-            SystemLog.objects.create(
+            system_log_writer.submit(SystemLog(
                 user=user,
                 action=action,
                 ip_address=ip_address,
                 details=details
-            )
+            ))
         except Exception as e:
             # 日志记录失败不应影响主业务
             print(f"SystemLog Error: {e}")
+
+
+class QueryTimer:
+    """connection.execute_wrapper 的包装函数：统计一次请求内的查询数与数据库耗时"""
+    __slots__ = ('queries', 'duration')
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.queries += 1
+
+
+class MetricsMiddleware:
+    """
+    中间件：按路由记录请求耗时、数据库查询数和数据库耗时，结果由 /api/metrics/ 查看。
+    放在 MIDDLEWARE 的第一位，耗时包含其余中间件。
+    settings.METRICS_ENABLED = False 时不加载 (MiddlewareNotUsed)。
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with connection.execute_wrapper(timer):
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        try:
+            registry.record(request.method, self._route(request), response.status_code,
+                            duration, timer.queries, timer.duration)
+        except Exception as e:
+            # 统计失败不应影响主业务
+            print(f"Metrics Error: {e}")
+        return response
+
+    @staticmethod
+    def _route(request):
+        """路由标签使用 URL 名称 (如 healtharticle-detail)，不用原始路径，避免主键等参数造成标签爆炸"""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return '<unmatched>'
+        return match.view_name or match.route or '<unnamed>'
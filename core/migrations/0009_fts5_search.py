@@ -0,0 +1,101 @@
+# 全文检索：为食物名称和健康文章创建 FTS5 虚拟表及同步触发器 (仅 SQLite)
+
+from django.db import migrations
+
+
+FTS_SQL = [
+    # 食物名称
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_fooditem_fts USING fts5(name, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_fooditem_fts_vocab USING fts5vocab(core_fooditem_fts, row)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_fooditem_fts_insert
+    AFTER INSERT ON core_fooditem
+    BEGIN
+        INSERT INTO core_fooditem_fts(rowid, name) VALUES (NEW.id, NEW.name || '  ');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_fooditem_fts_update
+    AFTER UPDATE OF name ON core_fooditem
+    BEGIN
+        UPDATE core_fooditem_fts SET name = NEW.name || '  ' WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_fooditem_fts_delete
+    AFTER DELETE ON core_fooditem
+    BEGIN
+        DELETE FROM core_fooditem_fts WHERE rowid = OLD.id;
+    END
+    """,
+    "INSERT INTO core_fooditem_fts(rowid, name) SELECT id, name || '  ' FROM core_fooditem",
+
+    # 健康文章
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_healtharticle_fts USING fts5(title, content, tokenize='trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS core_healtharticle_fts_vocab USING fts5vocab(core_healtharticle_fts, row)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_insert
+    AFTER INSERT ON core_healtharticle
+    BEGIN
+        INSERT INTO core_healtharticle_fts(rowid, title, content)
+        VALUES (NEW.id, NEW.title || '  ', NEW.content || '  ');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_update
+    AFTER UPDATE OF title, content ON core_healtharticle
+    BEGIN
+        UPDATE core_healtharticle_fts
+        SET title = NEW.title || '  ', content = NEW.content || '  '
+        WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_delete
+    AFTER DELETE ON core_healtharticle
+    BEGIN
+        DELETE FROM core_healtharticle_fts WHERE rowid = OLD.id;
+    END
+    """,
+    "INSERT INTO core_healtharticle_fts(rowid, title, content) "
+    "SELECT id, title || '  ', content || '  ' FROM core_healtharticle",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS trg_fooditem_fts_insert",
+    "DROP TRIGGER IF EXISTS trg_fooditem_fts_update",
+    "DROP TRIGGER IF EXISTS trg_fooditem_fts_delete",
+    "DROP TABLE IF EXISTS core_fooditem_fts_vocab",
+    "DROP TABLE IF EXISTS core_fooditem_fts",
+    "DROP TRIGGER IF EXISTS trg_healtharticle_fts_insert",
+    "DROP TRIGGER IF EXISTS trg_healtharticle_fts_update",
+    "DROP TRIGGER IF EXISTS trg_healtharticle_fts_delete",
+    "DROP TABLE IF EXISTS core_healtharticle_fts_vocab",
+    "DROP TABLE IF EXISTS core_healtharticle_fts",
+]
+
+
+def create_fts_tables(apps, schema_editor):
+    # FTS5 是 SQLite 特有功能，其他数据库由应用层退化为 icontains 查询
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in FTS_SQL:
+        schema_editor.execute(sql)
+
+
+def drop_fts_tables(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_articlecategory_bodymetric_healtharticle_systemlog_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_tables, drop_fts_tables),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_fts5_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FoodSearchKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(db_index=True, max_length=200, verbose_name='检索键')),
+                ('kind', models.CharField(choices=[('pinyin', '全拼'), ('initials', '首字母')], max_length=10, verbose_name='检索键类型')),
+                ('is_alias', models.BooleanField(default=False, verbose_name='是否来自别名')),
+                ('food_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_keys', to='core.fooditem', verbose_name='食物条目')),
+            ],
+        ),
+    ]
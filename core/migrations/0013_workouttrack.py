@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_mealtemplate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_format', models.CharField(choices=[('gpx', 'GPX'), ('tcx', 'TCX')], max_length=10, verbose_name='文件格式')),
+                ('start_time', models.DateTimeField(verbose_name='开始时间')),
+                ('distance_km', models.FloatField(verbose_name='距离(公里)')),
+                ('duration_seconds', models.PositiveIntegerField(verbose_name='时长(秒)')),
+                ('avg_speed_kmh', models.FloatField(verbose_name='平均速度(公里/小时)')),
+                ('elevation_gain_m', models.FloatField(default=0, verbose_name='累计爬升(米)')),
+                ('met', models.FloatField(verbose_name='MET值')),
+                ('point_count', models.PositiveIntegerField(verbose_name='轨迹点数')),
+                ('polyline', models.TextField(blank=True, verbose_name='抽稀轨迹')),
+                ('sport_record', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='track', to='core.sportrecord', verbose_name='运动记录')),
+            ],
+        ),
+    ]
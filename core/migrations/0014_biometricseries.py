@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_workouttrack'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BiometricSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(choices=[('heart_rate', '心率'), ('steps', '步数')], max_length=20, verbose_name='指标')),
+                ('date', models.DateField(verbose_name='日期')),
+                ('start_time', models.DateTimeField(verbose_name='第一个采样的时间')),
+                ('interval_seconds', models.PositiveIntegerField(default=60, verbose_name='采样间隔(秒)')),
+                ('samples', models.BinaryField(default=b'', verbose_name='采样数据')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='biometric_series', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'metric', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_wakeup_date(apps, schema_editor):
+    """按 TIME_ZONE 计算已有睡眠记录的起床日期"""
+    SleepRecord = apps.get_model('core', 'SleepRecord')
+    batch = []
+    for record in SleepRecord.objects.only('id', 'wakeup_time').iterator(chunk_size=2000):
+        wakeup_time = record.wakeup_time
+        if timezone.is_aware(wakeup_time):
+            wakeup_time = timezone.localtime(wakeup_time)
+        record.wakeup_date = wakeup_time.date()
+        batch.append(record)
+        if len(batch) >= 2000:
+            SleepRecord.objects.bulk_update(batch, ['wakeup_date'])
+            batch = []
+    if batch:
+        SleepRecord.objects.bulk_update(batch, ['wakeup_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_biometricseries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sleeprecord',
+            name='wakeup_date',
+            field=models.DateField(editable=False, null=True, verbose_name='起床日期'),
+        ),
+        migrations.RunPython(backfill_wakeup_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='sleeprecord',
+            name='wakeup_date',
+            field=models.DateField(editable=False, verbose_name='起床日期'),
+        ),
+        migrations.AddIndex(
+            model_name='sleeprecord',
+            index=models.Index(fields=['user', 'wakeup_date'], name='sleep_user_wakeup_date_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 00:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_sleeprecord_wakeup_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bodymetric',
+            index=models.Index(fields=['user', 'record_date'], name='bodymetric_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meal',
+            index=models.Index(fields=['user', 'record_date', 'meal_type'], name='meal_user_date_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sleeprecord',
+            index=models.Index(fields=['user', 'wakeup_time'], name='sleep_user_wakeup_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sportrecord',
+            index=models.Index(fields=['user', 'record_date'], name='sport_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['timestamp'], name='systemlog_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userreadhistory',
+            index=models.Index(fields=['user', 'read_time'], name='readhistory_user_time_idx'),
+        ),
+    ]
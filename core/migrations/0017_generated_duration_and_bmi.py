@@ -0,0 +1,83 @@
+import core.models
+import django.db.models.expressions
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+# 旧版 apply_triggers 创建的 AFTER INSERT 触发器会对每条新记录再执行一次 UPDATE，
+# 改为生成列 / 模型计算后不再需要 (旧的睡眠时长触发器写入的还是秒数，与 DurationField 的微秒不一致)。
+# 引用 duration 列的视图会阻止删除该列，先删除，生成列添加完成后按新的列定义 (微秒) 重新创建
+DROP_DERIVED_VALUE_TRIGGERS = """
+DROP TRIGGER IF EXISTS trg_calculate_sleep_duration;
+DROP TRIGGER IF EXISTS trg_calculate_bmi;
+DROP TRIGGER IF EXISTS trg_calculate_meal_item_calories;
+DROP VIEW IF EXISTS v_user_daily_summary;
+DROP VIEW IF EXISTS v_my_health_data;
+"""
+DROP_VIEWS = """
+DROP VIEW IF EXISTS v_user_daily_summary;
+DROP VIEW IF EXISTS v_my_health_data;
+"""
+
+# 视图定义写在迁移内，不引用 core.sql_procedures，以后修改该模块不会改变本迁移的行为
+CREATE_DERIVED_VALUE_VIEWS = """
+CREATE VIEW IF NOT EXISTS v_user_daily_summary AS
+SELECT
+    u.id AS user_id,
+    u.username,
+    sr.wakeup_date AS record_date,
+    ROUND(sr.duration / 3600000000.0, 2) AS sleep_hours,
+    (
+        SELECT SUM(spr.duration_minutes)
+        FROM core_sportrecord spr
+        WHERE spr.user_id = u.id AND spr.record_date = sr.wakeup_date
+    ) AS total_sport_minutes,
+    (
+        SELECT SUM(spr.calories_burned)
+        FROM core_sportrecord spr
+        WHERE spr.user_id = u.id AND spr.record_date = sr.wakeup_date
+    ) AS total_calories_burned,
+    (
+        SELECT SUM(mi.calories_calculated)
+        FROM core_meal m
+        JOIN core_mealitem mi ON mi.meal_id = m.id
+        WHERE m.user_id = u.id AND m.record_date = sr.wakeup_date
+    ) AS total_calories_eaten
+FROM core_customuser u
+LEFT JOIN core_sleeprecord sr ON sr.user_id = u.id;
+CREATE VIEW IF NOT EXISTS v_my_health_data AS
+SELECT
+    sr.id, sr.user_id, sr.sleep_time, sr.wakeup_time, sr.duration
+FROM core_sleeprecord sr;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_DERIVED_VALUE_TRIGGERS, migrations.RunSQL.noop),
+        # 普通字段不能直接修改为生成列，需要删除后重新添加；已有记录的值由数据库重新计算
+        migrations.RemoveField(
+            model_name='sleeprecord',
+            name='duration',
+        ),
+        migrations.AddField(
+            model_name='sleeprecord',
+            name='duration',
+            field=models.GeneratedField(db_persist=True, expression=core.models.TimestampDiff('wakeup_time', 'sleep_time'), output_field=models.DurationField(), verbose_name='睡眠时长'),
+        ),
+        migrations.RemoveField(
+            model_name='bodymetric',
+            name='bmi',
+        ),
+        migrations.AddField(
+            model_name='bodymetric',
+            name='bmi',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(height__gt=0, then=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(models.F('weight'), '/', django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('height'), '/', models.Value(100.0)), '*', django.db.models.expressions.CombinedExpression(models.F('height'), '/', models.Value(100.0)))), 2), weight__gt=0), default=None), output_field=models.FloatField(), verbose_name='BMI指数'),
+        ),
+        migrations.RunSQL(CREATE_DERIVED_VALUE_VIEWS, DROP_VIEWS),
+    ]
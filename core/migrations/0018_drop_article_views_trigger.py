@@ -0,0 +1,14 @@
+# 文章阅读量改由 core/view_counter.py 缓冲后批量写回，删除插入阅读历史时再加一次阅读量的旧触发器
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_generated_duration_and_bmi'),
+    ]
+
+    operations = [
+        migrations.RunSQL('DROP TRIGGER IF EXISTS trg_increment_article_views;', migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,84 @@
+# 健康文章：预先计算的摘要列 + 按发布时间分页所需的索引
+
+from django.db import migrations, models
+
+# SQLite 添加带默认值的列时会重建 core_healtharticle 表，表上的全文检索同步触发器 (迁移 0009) 随之被删除，需要重新创建。
+# 触发器定义写在迁移内 (与迁移 0009 相同)，不引用 core.sql_procedures，以后修改该模块不会改变本迁移的行为
+HEALTH_ARTICLE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_insert
+    AFTER INSERT ON core_healtharticle
+    BEGIN
+        INSERT INTO core_healtharticle_fts(rowid, title, content)
+        VALUES (NEW.id, NEW.title || '  ', NEW.content || '  ');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_update
+    AFTER UPDATE OF title, content ON core_healtharticle
+    BEGIN
+        UPDATE core_healtharticle_fts
+        SET title = NEW.title || '  ', content = NEW.content || '  '
+        WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_delete
+    AFTER DELETE ON core_healtharticle
+    BEGIN
+        DELETE FROM core_healtharticle_fts WHERE rowid = OLD.id;
+    END
+    """,
+]
+
+
+def restore_fts_triggers(apps, schema_editor):
+    """重建表之后恢复全文检索同步触发器 (FTS5 仅 SQLite，全文索引表不存在时跳过)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'core_healtharticle_fts'")
+        if cursor.fetchone() is None:
+            return
+    for sql in HEALTH_ARTICLE_FTS_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def backfill_excerpt(apps, schema_editor):
+    """为已有文章生成摘要 (与 HealthArticle.make_excerpt 相同：合并空白字符，超过 100 个字截断)"""
+    HealthArticle = apps.get_model('core', 'HealthArticle')
+    batch = []
+    for article in HealthArticle.objects.only('id', 'content').iterator(chunk_size=500):
+        text = ' '.join((article.content or '').split())
+        article.excerpt = text[:100] + '...' if len(text) > 100 else text
+        batch.append(article)
+        if len(batch) >= 500:
+            HealthArticle.objects.bulk_update(batch, ['excerpt'])
+            batch = []
+    if batch:
+        HealthArticle.objects.bulk_update(batch, ['excerpt'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_drop_article_views_trigger'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healtharticle',
+            name='excerpt',
+            field=models.CharField(blank=True, default='', editable=False, max_length=120, verbose_name='摘要'),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_excerpt, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='healtharticle',
+            index=models.Index(fields=['publish_date'], name='article_publish_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healtharticle',
+            index=models.Index(fields=['category', 'publish_date'], name='article_category_date_idx'),
+        ),
+    ]
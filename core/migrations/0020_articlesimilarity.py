@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_healtharticle_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleSimilarity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('co_reads', models.PositiveIntegerField(default=0, verbose_name='共读人数')),
+                ('article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similarities', to='core.healtharticle')),
+                ('similar_article', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.healtharticle')),
+            ],
+            options={
+                'unique_together': {('article', 'similar_article')},
+            },
+        ),
+    ]
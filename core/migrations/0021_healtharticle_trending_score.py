@@ -0,0 +1,87 @@
+# 健康文章：按时间衰减的热度，以及热门排序使用的索引
+
+import math
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+# SQLite 添加带默认值的列时会重建 core_healtharticle 表，表上的全文检索同步触发器 (迁移 0009) 随之被删除，需要重新创建。
+# 触发器定义写在迁移内 (与迁移 0009 相同)，不引用 core.sql_procedures，以后修改该模块不会改变本迁移的行为
+HEALTH_ARTICLE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_insert
+    AFTER INSERT ON core_healtharticle
+    BEGIN
+        INSERT INTO core_healtharticle_fts(rowid, title, content)
+        VALUES (NEW.id, NEW.title || '  ', NEW.content || '  ');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_update
+    AFTER UPDATE OF title, content ON core_healtharticle
+    BEGIN
+        UPDATE core_healtharticle_fts
+        SET title = NEW.title || '  ', content = NEW.content || '  '
+        WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_delete
+    AFTER DELETE ON core_healtharticle
+    BEGIN
+        DELETE FROM core_healtharticle_fts WHERE rowid = OLD.id;
+    END
+    """,
+]
+
+
+def restore_fts_triggers(apps, schema_editor):
+    """重建表之后恢复全文检索同步触发器 (FTS5 仅 SQLite，全文索引表不存在时跳过)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'core_healtharticle_fts'")
+        if cursor.fetchone() is None:
+            return
+    for sql in HEALTH_ARTICLE_FTS_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def backfill_trending_score(apps, schema_editor):
+    """
+    已有文章的热度：发布时记一次阅读，已有的阅读量也按发布时间计，
+    即 ln((1 + views) * 2^((publish_date - 2025-01-01) / 24小时)) (与 HealthArticle.trending_points 一致)
+    """
+    HealthArticle = apps.get_model('core', 'HealthArticle')
+    epoch = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    batch = []
+    for article in HealthArticle.objects.only('id', 'publish_date', 'views').iterator(chunk_size=500):
+        half_lives = (article.publish_date - epoch).total_seconds() / (24 * 3600)
+        article.trending_score = math.log(1 + article.views) + half_lives * math.log(2)
+        batch.append(article)
+        if len(batch) >= 500:
+            HealthArticle.objects.bulk_update(batch, ['trending_score'])
+            batch = []
+    if batch:
+        HealthArticle.objects.bulk_update(batch, ['trending_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_articlesimilarity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healtharticle',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='热度'),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_trending_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='healtharticle',
+            index=models.Index(fields=['trending_score'], name='article_trending_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# 健康文章：保存时预先渲染的正文 HTML 与正文哈希
+
+from django.db import migrations, models
+
+from core.article_render import render_content, content_hash
+
+# SQLite 添加带默认值的列时会重建 core_healtharticle 表，表上的全文检索同步触发器 (迁移 0009) 随之被删除，需要重新创建。
+# 触发器定义写在迁移内 (与迁移 0009 相同)，不引用 core.sql_procedures，以后修改该模块不会改变本迁移的行为
+HEALTH_ARTICLE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_insert
+    AFTER INSERT ON core_healtharticle
+    BEGIN
+        INSERT INTO core_healtharticle_fts(rowid, title, content)
+        VALUES (NEW.id, NEW.title || '  ', NEW.content || '  ');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_update
+    AFTER UPDATE OF title, content ON core_healtharticle
+    BEGIN
+        UPDATE core_healtharticle_fts
+        SET title = NEW.title || '  ', content = NEW.content || '  '
+        WHERE rowid = NEW.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_delete
+    AFTER DELETE ON core_healtharticle
+    BEGIN
+        DELETE FROM core_healtharticle_fts WHERE rowid = OLD.id;
+    END
+    """,
+]
+
+
+def restore_fts_triggers(apps, schema_editor):
+    """重建表之后恢复全文检索同步触发器 (FTS5 仅 SQLite，全文索引表不存在时跳过)"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'core_healtharticle_fts'")
+        if cursor.fetchone() is None:
+            return
+    for sql in HEALTH_ARTICLE_FTS_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def backfill_content_html(apps, schema_editor):
+    """为已有文章渲染正文 HTML 并计算正文哈希"""
+    HealthArticle = apps.get_model('core', 'HealthArticle')
+    batch = []
+    for article in HealthArticle.objects.only('id', 'content').iterator(chunk_size=500):
+        article.content_html = render_content(article.content)
+        article.content_hash = content_hash(article.content)
+        batch.append(article)
+        if len(batch) >= 500:
+            HealthArticle.objects.bulk_update(batch, ['content_html', 'content_hash'])
+            batch = []
+    if batch:
+        HealthArticle.objects.bulk_update(batch, ['content_html', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_healtharticle_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='healtharticle',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64, verbose_name='正文哈希'),
+        ),
+        migrations.AddField(
+            model_name='healtharticle',
+            name='content_html',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='正文HTML'),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+        migrations.RunPython(backfill_content_html, migrations.RunPython.noop),
+    ]
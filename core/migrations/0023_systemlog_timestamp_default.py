@@ -0,0 +1,24 @@
+# 系统日志改为后台批量写入，操作时间在提交日志时确定 (auto_now_add -> default=timezone.now)。
+# 默认值只在 Python 端生效，数据库结构不变，因此只修改迁移状态，避免 SQLite 重建日志表
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_healtharticle_content_html'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='systemlog',
+                    name='timestamp',
+                    field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='操作时间'),
+                ),
+            ],
+        ),
+    ]
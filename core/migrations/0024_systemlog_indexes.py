@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_systemlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['user', 'timestamp'], name='systemlog_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemlog',
+            index=models.Index(fields=['action', 'timestamp'], name='systemlog_action_time_idx'),
+        ),
+    ]
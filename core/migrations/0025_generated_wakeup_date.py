@@ -0,0 +1,95 @@
+import core.models
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# 引用 wakeup_date 列的视图会阻止删除该列，先删除，生成列添加完成后重新创建 (定义与迁移 0017 相同)
+DROP_VIEWS = """
+DROP VIEW IF EXISTS v_user_daily_summary;
+DROP VIEW IF EXISTS v_my_health_data;
+"""
+
+CREATE_VIEWS = """
+CREATE VIEW IF NOT EXISTS v_user_daily_summary AS
+SELECT
+    u.id AS user_id,
+    u.username,
+    sr.wakeup_date AS record_date,
+    ROUND(sr.duration / 3600000000.0, 2) AS sleep_hours,
+    (
+        SELECT SUM(spr.duration_minutes)
+        FROM core_sportrecord spr
+        WHERE spr.user_id = u.id AND spr.record_date = sr.wakeup_date
+    ) AS total_sport_minutes,
+    (
+        SELECT SUM(spr.calories_burned)
+        FROM core_sportrecord spr
+        WHERE spr.user_id = u.id AND spr.record_date = sr.wakeup_date
+    ) AS total_calories_burned,
+    (
+        SELECT SUM(mi.calories_calculated)
+        FROM core_meal m
+        JOIN core_mealitem mi ON mi.meal_id = m.id
+        WHERE m.user_id = u.id AND m.record_date = sr.wakeup_date
+    ) AS total_calories_eaten
+FROM core_customuser u
+LEFT JOIN core_sleeprecord sr ON sr.user_id = u.id;
+CREATE VIEW IF NOT EXISTS v_my_health_data AS
+SELECT
+    sr.id, sr.user_id, sr.sleep_time, sr.wakeup_time, sr.duration
+FROM core_sleeprecord sr;
+"""
+
+
+def backfill_wakeup_date(apps, schema_editor):
+    """回滚用：生成列删除后，按 TIME_ZONE 重新计算普通列的起床日期"""
+    SleepRecord = apps.get_model('core', 'SleepRecord')
+    batch = []
+    for record in SleepRecord.objects.only('id', 'wakeup_time').iterator(chunk_size=2000):
+        wakeup_time = record.wakeup_time
+        if timezone.is_aware(wakeup_time):
+            wakeup_time = timezone.localtime(wakeup_time)
+        record.wakeup_date = wakeup_time.date()
+        batch.append(record)
+        if len(batch) >= 2000:
+            SleepRecord.objects.bulk_update(batch, ['wakeup_date'])
+            batch = []
+    if batch:
+        SleepRecord.objects.bulk_update(batch, ['wakeup_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_systemlog_indexes'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DROP_VIEWS, CREATE_VIEWS),
+        # 普通字段不能直接修改为生成列，需要删除后重新添加；已有记录的起床日期由数据库重新计算
+        migrations.RemoveIndex(
+            model_name='sleeprecord',
+            name='sleep_user_wakeup_date_idx',
+        ),
+        # 先改为可空，回滚时重新添加的普通列可以先插入空值、再由 backfill_wakeup_date 补齐
+        migrations.AlterField(
+            model_name='sleeprecord',
+            name='wakeup_date',
+            field=models.DateField(editable=False, null=True, verbose_name='起床日期'),
+        ),
+        migrations.RunPython(migrations.RunPython.noop, backfill_wakeup_date),
+        migrations.RemoveField(
+            model_name='sleeprecord',
+            name='wakeup_date',
+        ),
+        migrations.AddField(
+            model_name='sleeprecord',
+            name='wakeup_date',
+            field=models.GeneratedField(db_persist=True, expression=core.models.LocalDate('wakeup_time', 480), output_field=models.DateField(), verbose_name='起床日期'),
+        ),
+        migrations.AddIndex(
+            model_name='sleeprecord',
+            index=models.Index(fields=['user', 'wakeup_date'], name='sleep_user_wakeup_date_idx'),
+        ),
+        migrations.RunSQL(CREATE_VIEWS, DROP_VIEWS),
+    ]
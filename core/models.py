@@ -1,9 +1,20 @@
-from django.db import models
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import models, connections
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.db.models.expressions import TemporalSubtraction
+from django.db.models.functions import Abs, Cast, Exp, Greatest, Ln, Round
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
+from .article_render import render_content, content_hash
+
 # 1. 扩展默认用户模型，方便未来添加个人信息
 class CustomUser(AbstractUser):
     # 在这里可以为用户添加额外的个人健康档案字段
@@ -18,16 +29,106 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
+# 派生字段 (睡眠时长、起床日期、BMI) 使用数据库生成列 (GENERATED ALWAYS AS ... STORED)，由数据库在写入时计算，
+# save()、bulk_create()、QuerySet.update() 以及原生 SQL 写入得到的结果完全一致，每次插入只写一次
+class TimestampDiff(models.Func):
+    """
+    两个时间字段之差 (DurationField)，用作生成列的表达式。
+    SQLite 下 Django 默认把时间相减编译为自定义函数 django_timestamp_diff，脱离 Django 的连接
+    (sqlite3 命令行等) 就无法写入该表；这里改用内置的 strftime/substr 计算微秒差，与 DurationField 的存储格式一致。
+    """
+    arity = 2
+    output_field = models.DurationField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        end, start = self.get_source_expressions()
+        return compiler.compile(TemporalSubtraction(end, start))
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        (end, end_params), (start, start_params) = [compiler.compile(arg) for arg in self.get_source_expressions()]
+        # Django 在 SQLite 中把时间存为 "YYYY-MM-DD HH:MM:SS[.ffffff]" (UTC)，第 21~26 位是微秒
+        sql = (
+            f"((CAST(strftime('%%s', {end}) AS INTEGER) - CAST(strftime('%%s', {start}) AS INTEGER)) * 1000000"
+            f" + CAST(substr({end} || '.000000', 21, 6) AS INTEGER)"
+            f" - CAST(substr({start} || '.000000', 21, 6) AS INTEGER))"
+        )
+        return sql, (*end_params, *start_params, *end_params, *start_params)
+
+
+class LocalDate(models.Func):
+    """
+    时间字段在 TIME_ZONE 下的本地日期 (DateField)，用作生成列的表达式。
+    生成列只能使用确定性的表达式，这里按固定的 UTC 偏移换算：TIME_ZONE (Asia/Shanghai) 没有夏令时，
+    偏移在建表时写入列定义；修改 TIME_ZONE 后 makemigrations 会检测到表达式变化
+    """
+    arity = 1
+    output_field = models.DateField()
+
+    def __init__(self, expression, offset_minutes, **extra):
+        self.offset_minutes = offset_minutes
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        expression, = self.get_source_expressions()
+        shifted = models.ExpressionWrapper(
+            expression + Value(timedelta(minutes=self.offset_minutes)), output_field=models.DateTimeField(),
+        )
+        return compiler.compile(Cast(shifted, models.DateField()))
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        # 只用内置的 date()，不依赖 Django 注册的自定义函数，sqlite3 命令行写入时同样可以计算
+        sql, params = compiler.compile(self.get_source_expressions()[0])
+        return f"date({sql}, '{int(self.offset_minutes):+d} minutes')", params
+
+
+def local_utc_offset_minutes():
+    """TIME_ZONE 相对 UTC 的偏移 (分钟)，用于 LocalDate"""
+    offset = timezone.get_default_timezone().utcoffset(datetime(2000, 1, 1))
+    return int(offset.total_seconds() // 60)
+
+
+class GeneratedFieldsMixin:
+    """
+    Django 在 UPDATE 后不会读回生成列，在不支持 INSERT ... RETURNING 的数据库上插入后也不会；
+    保存后把这些字段标记为延迟加载，下次访问时从数据库读取最新值
+    """
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if not adding or not connections[self._state.db].features.can_return_columns_from_insert:
+            for field in self._meta.concrete_fields:
+                if field.generated:
+                    self.__dict__.pop(field.attname, None)
+
+
 # 2. 睡眠记录模型
-class SleepRecord(models.Model):
+class SleepRecord(GeneratedFieldsMixin, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='sleep_records')
     sleep_time = models.DateTimeField(verbose_name="入睡时间")
     wakeup_time = models.DateTimeField(verbose_name="起床时间")
-    duration = models.DurationField(verbose_name="睡眠时长", blank=True, null=True) # 自动计算
+    # 睡眠时长 = 起床时间 - 入睡时间，数据库生成列
+    duration = models.GeneratedField(
+        expression=TimestampDiff('wakeup_time', 'sleep_time'),
+        output_field=models.DurationField(),
+        db_persist=True,
+        verbose_name="睡眠时长",
+    )
+    # 起床时间在 TIME_ZONE 下的本地日期，数据库生成列。睡眠记录按起床日期归属，
+    # 按日期筛选时直接比较该列，可以走 (user, wakeup_date) 索引，而 wakeup_time__date 需要逐行转换时区
+    wakeup_date = models.GeneratedField(
+        expression=LocalDate('wakeup_time', local_utc_offset_minutes()),
+        output_field=models.DateField(),
+        db_persist=True,
+        verbose_name="起床日期",
+    )
 
-    def save(self, *args, **kwargs):
-        self.duration = self.wakeup_time - self.sleep_time
-        super().save(*args, **kwargs)
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'wakeup_date'], name='sleep_user_wakeup_date_idx'),
+            # 列表按起床时间倒序、好友动态按起床时间范围查询
+            models.Index(fields=['user', 'wakeup_time'], name='sleep_user_wakeup_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} 的睡眠记录 ({self.sleep_time.date()})"
@@ -40,6 +141,11 @@ class SportRecord(models.Model):
     calories_burned = models.FloatField(verbose_name="消耗卡路里(大卡)")
     record_date = models.DateField(default=timezone.now, verbose_name="记录日期")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'record_date'], name='sport_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} 的运动记录 ({self.sport_type})"
 
@@ -53,7 +159,10 @@ class FoodItem(models.Model):
     protein = models.FloatField(verbose_name="蛋白质(克)", null=True, blank=True)
     fat = models.FloatField(verbose_name="脂肪(克)", null=True, blank=True)
     carbohydrates = models.FloatField(verbose_name="碳水化合物(克)", null=True, blank=True)
-    
+
+    # 食物库版本号 (FoodCatalogVersion) 不在 save()/delete() 中逐行递增，
+    # 由各个写入入口 (导入命令、Excel 导入、后台等) 在一次操作完成后递增一次
+
     def __str__(self):
         return self.name
 
@@ -64,6 +173,12 @@ class Meal(models.Model):
     meal_type = models.CharField(max_length=20, choices=[('breakfast', '早餐'), ('lunch', '午餐'), ('dinner', '晚餐'), ('snack', '加餐')], verbose_name="餐次类型")
     record_date = models.DateField(default=timezone.now, verbose_name="记录日期")
 
+    class Meta:
+        indexes = [
+            # 同时覆盖 (用户, 日期) 与 (用户, 日期, 餐次) 两种查询
+            models.Index(fields=['user', 'record_date', 'meal_type'], name='meal_user_date_type_idx'),
+        ]
+
     # 使用 @property 装饰器，可以像访问字段一样方便地计算一餐的总热量
     @property
     def total_calories(self):
@@ -76,6 +191,44 @@ class Meal(models.Model):
         # get_meal_type_display() 可以将 'lunch' 这样的标识符显示为 '午餐'
         return f"{self.user.username} 的 {self.get_meal_type_display()} ({self.record_date})"
 
+def calculate_item_calories(calories_per_100g, portion):
+    """
+    餐品热量的唯一计算公式：热量 = (每100克热量 / 100) * 实际克数。
+    参数既可以是数值，也可以是 F()/Subquery 等查询表达式 (用于集合式 UPDATE)
+    """
+    return calories_per_100g / 100 * portion
+
+
+class CalculatedCaloriesQuerySet(models.QuerySet):
+    """
+    餐品 / 饮食模板条目的查询集。
+    热量依赖食物表，不能使用生成列；这里让 bulk_create() 和 update() 也保持 calories_calculated 正确，
+    批量写入时无需逐条调用 save()
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """未填写热量的对象按食物热量补齐 (一次查询取回所有用到的食物)"""
+        objs = list(objs)
+        missing = [obj for obj in objs if obj.calories_calculated is None]
+        if missing:
+            foods = FoodItem.objects.only('id', 'calories_per_100g').in_bulk({obj.food_item_id for obj in missing})
+            for obj in missing:
+                food = foods.get(obj.food_item_id)
+                if food is not None:
+                    obj.calories_calculated = calculate_item_calories(food.calories_per_100g, obj.portion)
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def update(self, **kwargs):
+        """修改份量或食物时，在同一条 UPDATE 中按新值重新计算热量"""
+        food = kwargs.get('food_item_id', kwargs.get('food_item'))
+        if 'calories_calculated' not in kwargs and ('portion' in kwargs or food is not None):
+            # SET 子句中引用的列是更新前的值，所以新的份量和食物要直接代入表达式
+            food_ref = OuterRef('food_item_id') if food is None else getattr(food, 'pk', food)
+            calories_per_100g = Subquery(FoodItem.objects.filter(pk=food_ref).values('calories_per_100g')[:1])
+            kwargs['calories_calculated'] = calculate_item_calories(calories_per_100g, kwargs.get('portion', F('portion')))
+        return super().update(**kwargs)
+
+
 # 6. 餐品模型
 # 这个模型代表一餐中的具体食物，比如午餐中的“米饭”
 class MealItem(models.Model):
@@ -88,10 +241,12 @@ class MealItem(models.Model):
     # 卡路里由系统自动计算，不允许用户填写，因此 blank=True
     calories_calculated = models.FloatField(verbose_name="计算卡路里(大卡)", blank=True, null=True)
 
+    objects = CalculatedCaloriesQuerySet.as_manager()
+
     def save(self, *args, **kwargs):
         # 在保存之前，自动计算热量
         # 热量 = (每100克热量 / 100) * 实际克数
-        self.calories_calculated = (self.food_item.calories_per_100g / 100) * self.portion
+        self.calories_calculated = calculate_item_calories(self.food_item.calories_per_100g, self.portion)
         super().save(*args, **kwargs) # 调用父类的save方法，将数据存入数据库
 
     def __str__(self):
@@ -208,33 +363,57 @@ class SystemLog(models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='system_logs', verbose_name="操作用户", null=True, blank=True)
     action = models.CharField(max_length=255, verbose_name="操作行为")
     ip_address = models.GenericIPAddressField(verbose_name="IP地址", null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True, verbose_name="操作时间")
+    # 日志由后台线程批量写入 (core/audit_log.py)，操作时间在提交日志时确定，不能用写入时间 (auto_now_add)
+    timestamp = models.DateTimeField(default=timezone.now, verbose_name="操作时间")
     details = models.TextField(verbose_name="详细信息", blank=True, null=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['timestamp'], name='systemlog_timestamp_idx'),
+            # 按用户、按操作前缀筛选后再按时间倒序
+            models.Index(fields=['user', 'timestamp'], name='systemlog_user_time_idx'),
+            models.Index(fields=['action', 'timestamp'], name='systemlog_action_time_idx'),
+        ]
+
+    @staticmethod
+    def action_prefix_q(prefix):
+        """
+        操作以 prefix 开头的筛选条件。
+        写成范围比较而不是 startswith：SQLite 的 LIKE 不区分大小写，用不上 action 上的索引
+        """
+        return models.Q(action__gte=prefix, action__lt=prefix + '\U0010ffff')
 
     def __str__(self):
         return f"[{self.timestamp}] {self.user} - {self.action}"
 
 # 11. 身体指标模型 (Member C -> Member A implemented)
-class BodyMetric(models.Model):
+class BodyMetric(GeneratedFieldsMixin, models.Model):
     """
     记录用户的体重、身高、BMI。
     """
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='body_metrics')
     weight = models.FloatField(verbose_name="体重(kg)")
     height = models.FloatField(verbose_name="身高(cm)")
-    bmi = models.FloatField(verbose_name="BMI指数", blank=True, null=True)
+    # BMI = 体重(kg) / 身高(m)^2，保留两位小数，数据库生成列；体重或身高不大于0时为空
+    bmi = models.GeneratedField(
+        expression=models.Case(
+            models.When(
+                weight__gt=0, height__gt=0,
+                then=Round(F('weight') / ((F('height') / 100.0) * (F('height') / 100.0)), 2),
+            ),
+            default=None,
+        ),
+        output_field=models.FloatField(),
+        db_persist=True,
+        verbose_name="BMI指数",
+    )
     record_date = models.DateField(default=timezone.now, verbose_name="记录日期")
 
-    def save(self, *args, **kwargs):
-        # 自动计算 BMI
-        if self.weight and self.height:
-            # height 转为米
-            height_m = self.height / 100
-            self.bmi = round(self.weight / (height_m ** 2), 2)
-        super().save(*args, **kwargs)
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'record_date'], name='bodymetric_user_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.record_date} (BMI: {self.bmi})"
@@ -247,6 +426,16 @@ class ArticleCategory(models.Model):
     name = models.CharField(max_length=100, verbose_name="分类名称", unique=True)
     description = models.TextField(verbose_name="分类描述", blank=True, null=True)
 
+    # 分类列表 (含每个分类的文章数) 整体缓存在 Django 缓存中；
+    # 分类或文章的新增、删除、改分类时失效 (见下方 post_save / post_delete 信号处理)。默认的本地内存缓存只在当前进程内失效，
+    # 多进程部署时依靠过期时间兜底，配置共享缓存 (Redis/Memcached) 后可立即全局失效
+    LISTING_CACHE_KEY = 'article_categories:listing'
+    LISTING_CACHE_TIMEOUT = 300
+
+    @classmethod
+    def invalidate_listing(cls):
+        cache.delete(cls.LISTING_CACHE_KEY)
+
     def __str__(self):
         return self.name
 
@@ -261,13 +450,92 @@ class HealthArticle(models.Model):
     author = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='authored_articles', verbose_name="作者")
     publish_date = models.DateTimeField(default=timezone.now, verbose_name="发布时间")
     views = models.PositiveIntegerField(default=0, verbose_name="阅读量")
+    # 正文摘要 (自动生成)，文章列表只返回摘要，不再传输完整正文
+    excerpt = models.CharField(max_length=120, blank=True, default='', editable=False, verbose_name="摘要")
+    # 保存时把正文渲染为 HTML (core/article_render.py)，content_hash 是正文的 SHA-256，用于详情接口的 ETag
+    content_html = models.TextField(blank=True, default='', editable=False, verbose_name="正文HTML")
+    content_hash = models.CharField(max_length=64, blank=True, default='', editable=False, verbose_name="正文哈希")
+    # 热度 (按时间衰减)：每次阅读的贡献为 2^((阅读时间 - TRENDING_EPOCH) / TRENDING_HALF_LIFE)，
+    # 越新的阅读权重越大，所有文章同比例衰减，因此只需累加、不必定期重算；为避免溢出，字段存的是总和的自然对数
+    trending_score = models.FloatField(default=0, editable=False, verbose_name="热度")
+
+    EXCERPT_LENGTH = 100
+    TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+    TRENDING_HALF_LIFE = timedelta(hours=24)
 
     class Meta:
         ordering = ['-publish_date']
+        indexes = [
+            # 文章列表按发布时间游标分页，可以按分类筛选
+            models.Index(fields=['publish_date'], name='article_publish_date_idx'),
+            models.Index(fields=['category', 'publish_date'], name='article_category_date_idx'),
+            # 热门文章 (?ordering=trending) 按热度倒序取前 N 篇
+            models.Index(fields=['trending_score'], name='article_trending_idx'),
+        ]
+
+    @classmethod
+    def make_excerpt(cls, content):
+        """正文 -> 摘要：合并空白字符，超过 EXCERPT_LENGTH 个字时截断并加省略号"""
+        text = ' '.join((content or '').split())
+        if len(text) > cls.EXCERPT_LENGTH:
+            text = text[:cls.EXCERPT_LENGTH] + '...'
+        return text
+
+    @classmethod
+    def trending_points(cls, moment, count=1):
+        """count 次发生在 moment 的阅读对应的对数热度"""
+        return math.log(count) + (moment - cls.TRENDING_EPOCH) / cls.TRENDING_HALF_LIFE * math.log(2)
+
+    @classmethod
+    def trending_updates(cls, count, moment):
+        """
+        累加 count 次阅读的 update() 参数：
+        trending_score = ln(e^trending_score + e^points) = max(a, b) + ln(1 + e^-|a - b|)，在数据库中原子地计算
+        """
+        score, points = F('trending_score'), Value(cls.trending_points(moment, count))
+        return {'trending_score': Greatest(score, points) + Ln(Value(1.0) + Exp(-Abs(score - points)))}
+
+    @property
+    def etag(self):
+        """文章详情的 ETag：正文哈希 + 标题、分类、作者等元数据 (阅读量不计入，否则每次阅读都会失效)"""
+        meta = '|'.join(str(value) for value in (
+            self.content_hash, self.title, self.category_id, self.category.name if self.category else '',
+            self.author_id, self.author.username if self.author else '', self.publish_date.isoformat(),
+        ))
+        return f'W/"article-{self.id}-{content_hash(meta)[:32]}"'
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.trending_score:
+            # 发布本身计为一次阅读，新文章不会因为还没有人读而排在最后
+            self.trending_score = self.trending_points(self.publish_date or timezone.now())
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.excerpt = self.make_excerpt(self.content)
+            self.content_html = render_content(self.content)
+            self.content_hash = content_hash(self.content)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'excerpt', 'content_html', 'content_hash'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
 
+
+# 分类列表缓存的失效放在信号中而不是 save()/delete()：QuerySet.delete() (包括后台的批量删除) 不调用模型的 delete()，
+# 但会为每个对象发送 post_delete。QuerySet.update() 不发送任何信号，修改分类时请使用 save()
+@receiver(post_save, sender=ArticleCategory)
+@receiver(post_delete, sender=ArticleCategory)
+@receiver(post_delete, sender=HealthArticle)
+def invalidate_category_listing(sender, **kwargs):
+    ArticleCategory.invalidate_listing()
+
+
+@receiver(post_save, sender=HealthArticle)
+def invalidate_category_listing_on_article_save(sender, instance, created, update_fields=None, **kwargs):
+    # 新增文章或可能修改了分类时，分类列表中的文章数随之变化；只更新阅读量等字段时不失效
+    if created or update_fields is None or {'category', 'category_id'} & set(update_fields):
+        ArticleCategory.invalidate_listing()
+
 # 14. 阅读历史模型 (Member C -> Member A implemented)
 class UserReadHistory(models.Model):
     """
@@ -279,6 +547,166 @@ class UserReadHistory(models.Model):
 
     class Meta:
         ordering = ['-read_time']
+        indexes = [
+            models.Index(fields=['user', 'read_time'], name='readhistory_user_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} viewed {self.article.title}"
+
+# 15. 食物检索键模型
+class FoodSearchKey(models.Model):
+    """
+    食物名称的拼音检索键，在导入食物时预先计算，支持 "mifan" / "mf" 检索 "米饭"。
+    主名称和方括号别名各自生成全拼与首字母两种检索键。
+    """
+    KIND_PINYIN = 'pinyin'
+    KIND_INITIALS = 'initials'
+
+    KIND_CHOICES = [
+        (KIND_PINYIN, '全拼'),
+        (KIND_INITIALS, '首字母'),
+    ]
+
+    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, related_name='search_keys', verbose_name="食物条目")
+    key = models.CharField(max_length=200, db_index=True, verbose_name="检索键")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name="检索键类型")
+    is_alias = models.BooleanField(default=False, verbose_name="是否来自别名")
+
+    def __str__(self):
+        return f"{self.key} -> {self.food_item_id}"
+
+# 16. 食物库版本模型
+class FoodCatalogVersion(models.Model):
+    """
+    食物库版本号 (单行表)。食物的新增、修改、删除完成后递增版本号，
+    客户端据此判断缓存的食物库快照是否过期 (ETag)，进程内的检索索引和营养素表据此重建。
+    每个写入入口在整批操作完成后调用一次 bump()，批量导入不会为每一行多写一次这一行。
+
+    版本号取 "上一版本 + 1" 与当前毫秒时间戳中的较大者，
+    这样即使数据库被重建，新版本号也不会与旧缓存重复。
+    """
+    SINGLETON_ID = 1
+
+    version = models.BigIntegerField(default=0, verbose_name="版本号")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    @classmethod
+    def current(cls):
+        """当前版本号，从未导入过食物时为 0"""
+        version = cls.objects.filter(pk=cls.SINGLETON_ID).values_list('version', flat=True).first()
+        return version or 0
+
+    @classmethod
+    def bump(cls):
+        """递增版本号并返回新版本"""
+        now_ms = int(timezone.now().timestamp() * 1000)
+        updated = cls.objects.filter(pk=cls.SINGLETON_ID).update(
+            version=Greatest(F('version') + 1, now_ms), updated_at=timezone.now()
+        )
+        if not updated:
+            cls.objects.get_or_create(pk=cls.SINGLETON_ID, defaults={'version': now_ms})
+        return cls.current()
+
+    def __str__(self):
+        return f"食物库版本 {self.version}"
+
+# 17. 饮食模板模型
+# 保存一组常吃的餐品 (如 "食堂早餐")，之后可以一键添加到任意一天
+class MealTemplate(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='meal_templates')
+    name = models.CharField(max_length=100, verbose_name="模板名称")
+    meal_type = models.CharField(max_length=20, choices=Meal._meta.get_field('meal_type').choices, verbose_name="默认餐次类型")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.user.username} 的饮食模板: {self.name}"
+
+# 18. 饮食模板条目模型
+class MealTemplateItem(models.Model):
+    template = models.ForeignKey(MealTemplate, on_delete=models.CASCADE, related_name='items')
+    food_item = models.ForeignKey(FoodItem, on_delete=models.CASCADE, verbose_name="食物条目")
+    portion = models.FloatField(verbose_name="份量(克)")
+    # 创建模板时计算好的热量，套用模板时直接复用，不再逐条查询食物重新计算
+    calories_calculated = models.FloatField(verbose_name="计算卡路里(大卡)", blank=True, null=True)
+
+    objects = CalculatedCaloriesQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        # 与 MealItem 相同：热量 = (每100克热量 / 100) * 实际克数
+        self.calories_calculated = calculate_item_calories(self.food_item.calories_per_100g, self.portion)
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.portion}克 {self.food_item.name}"
+
+
+# 19. 运动轨迹摘要模型
+# 上传 GPX/TCX 文件生成运动记录时保存的紧凑轨迹摘要；原始轨迹点不入库，
+# 只保留抽稀后的折线 (Google Encoded Polyline 格式) 供前端绘制路线
+class WorkoutTrack(models.Model):
+    FORMAT_CHOICES = [
+        ('gpx', 'GPX'),
+        ('tcx', 'TCX'),
+    ]
+
+    sport_record = models.OneToOneField(SportRecord, on_delete=models.CASCADE, related_name='track', verbose_name="运动记录")
+    source_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, verbose_name="文件格式")
+    start_time = models.DateTimeField(verbose_name="开始时间")
+    distance_km = models.FloatField(verbose_name="距离(公里)")
+    duration_seconds = models.PositiveIntegerField(verbose_name="时长(秒)")
+    avg_speed_kmh = models.FloatField(verbose_name="平均速度(公里/小时)")
+    elevation_gain_m = models.FloatField(verbose_name="累计爬升(米)", default=0)
+    met = models.FloatField(verbose_name="MET值")
+    point_count = models.PositiveIntegerField(verbose_name="轨迹点数")
+    polyline = models.TextField(verbose_name="抽稀轨迹", blank=True)
+
+    def __str__(self):
+        return f"{self.sport_record} 的轨迹 ({self.distance_km} km)"
+
+# 20. 高频生理数据模型
+# 每分钟心率、步数等高频采样按 "用户 + 指标 + 日期" 打包成一行：
+# samples 是小端序 uint16 数组 (每个采样 2 字节)，第 i 个值对应 start_time + i * interval_seconds，
+# 缺失的采样记为 MISSING。读写逻辑见 core/biometric_series.py
+class BiometricSeries(models.Model):
+    METRIC_CHOICES = [
+        ('heart_rate', '心率'),
+        ('steps', '步数'),
+    ]
+    MISSING = 0xFFFF
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='biometric_series')
+    metric = models.CharField(max_length=20, choices=METRIC_CHOICES, verbose_name="指标")
+    date = models.DateField(verbose_name="日期")
+    start_time = models.DateTimeField(verbose_name="第一个采样的时间")
+    interval_seconds = models.PositiveIntegerField(default=60, verbose_name="采样间隔(秒)")
+    samples = models.BinaryField(default=b'', verbose_name="采样数据")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    class Meta:
+        unique_together = ('user', 'metric', 'date')
+
+    @property
+    def sample_count(self):
+        return len(self.samples) // 2
+
+    def __str__(self):
+        return f"{self.user.username} 的{self.get_metric_display()} ({self.date})"
+
+# 21. 文章共读模型
+# 稀疏的物品-物品相似度矩阵：co_reads 是同时读过 article 与 similar_article 的用户数，
+# 只保存共读过的文章对，每对正反各存一行，按 article 即可查到它的全部相似文章。
+# 由 rebuild_article_similarity 命令全量重算，新的阅读记录增量累加，推荐逻辑见 core/recommendations.py
+class ArticleSimilarity(models.Model):
+    article = models.ForeignKey(HealthArticle, on_delete=models.CASCADE, related_name='similarities')
+    similar_article = models.ForeignKey(HealthArticle, on_delete=models.CASCADE, related_name='+')
+    co_reads = models.PositiveIntegerField(default=0, verbose_name="共读人数")
+
+    class Meta:
+        unique_together = ('article', 'similar_article')
+
+    def __str__(self):
+        return f"{self.article_id} -> {self.similar_article_id} ({self.co_reads})"
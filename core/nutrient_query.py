@@ -0,0 +1,159 @@
+"""
+nutrient_query.py - 食物营养素列式查询引擎
+功能:
+1. 将食物库按列加载到内存 (热量、蛋白质、脂肪、碳水各一列)，食物库版本变化时自动重建
+2. 支持营养素区间过滤、排序与 Top-K，例如 "蛋白质 > 20g 且脂肪 < 5g，按热量升序"
+3. 使用 NumPy 的向量化布尔掩码计算，Top-K 先用 partition 筛出候选再排序
+
+营养素缺失 (NULL) 的值在列中存为 NaN：任何区间条件都不会命中 NaN，排序时 NaN 排在最后。
+"""
+import math
+import threading
+from array import array
+
+import numpy as np
+
+NUTRIENT_FIELDS = ['calories_per_100g', 'protein', 'fat', 'carbohydrates']
+FILTER_OPERATORS = {
+    'gt': lambda a, b: a > b,
+    'gte': lambda a, b: a >= b,
+    'lt': lambda a, b: a < b,
+    'lte': lambda a, b: a <= b,
+}
+
+NAN = float('nan')
+
+
+def parse_filters(params):
+    """
+    从查询参数中解析营养素条件，形如 protein__gt=20、fat__lte=5。
+
+    返回:
+        list[(field, op, value)]
+    异常:
+        ValueError: 参数格式错误
+    """
+    filters = []
+    for key, value in params.items():
+        field, sep, op = key.partition('__')
+        if not sep or field not in NUTRIENT_FIELDS:
+            continue
+        if op not in FILTER_OPERATORS:
+            raise ValueError(f"不支持的比较方式: {key}，可用: {', '.join(FILTER_OPERATORS)}")
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{key} 必须是数字")
+        if math.isnan(number):
+            raise ValueError(f"{key} 必须是数字")
+        filters.append((field, op, number))
+    return filters
+
+
+def parse_ordering(ordering):
+    """解析排序参数，'-protein' 表示按蛋白质降序；返回 (field, descending)"""
+    if not ordering:
+        return None, False
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+    if field not in NUTRIENT_FIELDS:
+        raise ValueError(f"不支持的排序字段: {field}，可用: {', '.join(NUTRIENT_FIELDS)}")
+    return field, descending
+
+
+class NutrientTable:
+    """
+    食物库的列式内存表。
+
+    - ids / names: 按食物ID升序排列的食物ID与名称
+    - columns: 营养素字段 -> 数值列 (numpy.ndarray)
+    """
+
+    def __init__(self):
+        self.version = None
+        self.ids = []
+        self.names = []
+        self.columns = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def build(self, rows, version=None):
+        """
+        参数:
+            rows: 可迭代的 (id, name, calories_per_100g, protein, fat, carbohydrates) 元组，按 id 升序
+            version: 食物库版本号
+        """
+        ids, names = [], []
+        columns = {field: array('d') for field in NUTRIENT_FIELDS}
+        for food_id, name, *values in rows:
+            ids.append(food_id)
+            names.append(name)
+            for field, value in zip(NUTRIENT_FIELDS, values):
+                columns[field].append(NAN if value is None else value)
+
+        columns = {field: np.frombuffer(column, dtype=np.float64) if column else np.empty(0)
+                   for field, column in columns.items()}
+        self.ids, self.names, self.columns = ids, names, columns
+        self.version = version
+        return self
+
+    def _row(self, index):
+        row = {'id': self.ids[index], 'name': self.names[index]}
+        for field in NUTRIENT_FIELDS:
+            value = float(self.columns[field][index])
+            row[field] = None if math.isnan(value) else value
+        return row
+
+    def query(self, filters=(), ordering=None, descending=False, limit=20):
+        """
+        按营养素条件过滤、排序并取前 limit 条。
+
+        返回:
+            (int, list[dict]): 命中总数，以及前 limit 条记录
+        """
+        mask = np.ones(len(self.ids), dtype=bool)
+        for field, op, value in filters:
+            # NaN 参与比较的结果恒为 False，缺失值自然被过滤掉
+            mask &= FILTER_OPERATORS[op](self.columns[field], value)
+        matched = np.flatnonzero(mask)
+        total = len(matched)
+        if not ordering:
+            return total, [self._row(i) for i in matched[:limit].tolist()]
+
+        keys = self.columns[ordering][matched]
+        keys = -keys if descending else keys.copy()
+        keys[np.isnan(keys)] = np.inf
+        if limit < total:
+            # 先用 partition 求出第 K 小的值，只对不超过它的候选排序；与第 K 个同值的都保留为候选，
+            # 否则 argpartition 在同值中任取，同值按食物ID排序的结果就不稳定
+            kth = np.partition(keys, limit - 1)[limit - 1]
+            top = np.flatnonzero(keys <= kth)
+        else:
+            top = np.arange(total)
+        top = top[np.lexsort((matched[top], keys[top]))][:limit]
+        return total, [self._row(i) for i in matched[top].tolist()]
+
+
+_table = NutrientTable()
+_table_lock = threading.Lock()
+
+
+def get_nutrient_table():
+    """获取当前进程的营养素列式表，食物库版本变化时自动重建"""
+    global _table
+    from .models import FoodItem, FoodCatalogVersion
+
+    version = FoodCatalogVersion.current()
+    if _table.version == version:
+        return _table
+    with _table_lock:
+        if _table.version != version:
+            rows = FoodItem.objects.order_by('id').values_list('id', 'name', *NUTRIENT_FIELDS).iterator(chunk_size=2000)
+            _table = NutrientTable().build(rows, version)
+    return _table
+
+
+def query_foods(filters=(), ordering=None, descending=False, limit=20):
+    """便捷函数：在当前食物库上执行营养素查询"""
+    return get_nutrient_table().query(filters, ordering, descending, limit)
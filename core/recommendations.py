@@ -0,0 +1,122 @@
+"""
+recommendations.py - 基于阅读历史共现的文章推荐 (物品-物品协同过滤)
+功能:
+1. ArticleSimilarity 保存稀疏的共读矩阵：同一用户读过的任意两篇文章，co_reads 各加一
+2. rebuild_similarity(): 从阅读历史全量重算共读矩阵 (python manage.py rebuild_article_similarity)
+3. record_read(): 用户第一次阅读某篇文章时增量更新，把它与该用户读过的其他文章各配对一次
+4. recommend_articles(): 以用户最近读过的文章为种子，在共读矩阵中按 article 查找相似文章，
+   累加共读人数排序并排除已读文章；结果按用户缓存，用户有新的阅读记录时失效
+"""
+from collections import Counter
+from itertools import groupby, permutations
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import ArticleSimilarity, UserReadHistory
+
+# 作为推荐种子的最近阅读文章数
+SEED_LIMIT = 50
+# 每个用户缓存的推荐结果数 (接口 limit 的上限)
+MAX_RECOMMENDATIONS = 50
+CACHE_KEY = 'article_recommendations:{user_id}'
+CACHE_TIMEOUT = 600
+BATCH_SIZE = 2000
+
+
+def read_article_ids(user_id):
+    """用户读过的文章 id，按最近阅读时间排序 (走 readhistory_user_time_idx 索引)"""
+    ids = UserReadHistory.objects.filter(user_id=user_id).order_by('-read_time').values_list('article_id', flat=True)
+    return list(dict.fromkeys(ids))
+
+
+def invalidate_recommendations(user_id):
+    cache.delete(CACHE_KEY.format(user_id=user_id))
+
+
+def increment_co_reads(pairs):
+    """
+    有序文章对 (a, b) 的共读人数各加一，行不存在时以 co_reads=1 插入。
+    用 INSERT ... ON CONFLICT DO UPDATE 在一条语句内原子完成 (SQLite 3.24+ / PostgreSQL)：
+    不先查询哪些行已存在，两个用户同时第一次读同一对文章时两次加一都会生效。
+    """
+    meta = ArticleSimilarity._meta
+    quote = connection.ops.quote_name
+    table = quote(meta.db_table)
+    article, similar, co_reads = (quote(meta.get_field(name).column) for name in ('article', 'similar_article', 'co_reads'))
+    with connection.cursor() as cursor:
+        for start in range(0, len(pairs), BATCH_SIZE):
+            batch = pairs[start:start + BATCH_SIZE]
+            cursor.execute(
+                f'INSERT INTO {table} ({article}, {similar}, {co_reads}) VALUES {", ".join(["(%s, %s, 1)"] * len(batch))} '
+                f'ON CONFLICT ({article}, {similar}) DO UPDATE SET {co_reads} = {table}.{co_reads} + 1',
+                [pk for pair in batch for pk in pair]
+            )
+
+
+def record_read(user_id, article_id):
+    """
+    用户第一次阅读某篇文章后调用：与该用户读过的其他文章的共读人数各加一 (正反两行)。
+
+    返回:
+        int: 涉及的文章对数
+    """
+    others = [pk for pk in read_article_ids(user_id) if pk != article_id]
+    if others:
+        with transaction.atomic():
+            increment_co_reads([pair for pk in others for pair in ((article_id, pk), (pk, article_id))])
+    invalidate_recommendations(user_id)
+    return len(others)
+
+
+def rebuild_similarity():
+    """
+    从阅读历史全量重算共读矩阵。
+
+    返回:
+        int: 写入的 ArticleSimilarity 行数
+    """
+    rows = (
+        UserReadHistory.objects.order_by('user_id', 'article_id')
+        .values_list('user_id', 'article_id').distinct().iterator(chunk_size=BATCH_SIZE)
+    )
+    counts = Counter()
+    for _, group in groupby(rows, key=lambda row: row[0]):
+        counts.update(permutations([article_id for _, article_id in group], 2))
+
+    with transaction.atomic():
+        ArticleSimilarity.objects.all().delete()
+        ArticleSimilarity.objects.bulk_create(
+            (ArticleSimilarity(article_id=a, similar_article_id=b, co_reads=n) for (a, b), n in counts.items()),
+            batch_size=BATCH_SIZE
+        )
+    return len(counts)
+
+
+def recommend_articles(user_id):
+    """
+    为用户推荐未读过的文章。
+
+    返回:
+        list[tuple]: [(article_id, score)]，按 score (与已读文章的共读人数之和) 降序，最多 MAX_RECOMMENDATIONS 条
+    """
+    key = CACHE_KEY.format(user_id=user_id)
+    recommendations = cache.get(key)
+    if recommendations is not None:
+        return recommendations
+
+    read_ids = read_article_ids(user_id)
+    recommendations = []
+    if read_ids:
+        recommendations = list(
+            ArticleSimilarity.objects
+            .filter(article_id__in=read_ids[:SEED_LIMIT])
+            .exclude(similar_article_id__in=read_ids)
+            .values('similar_article_id')
+            .annotate(score=Sum('co_reads'))
+            .order_by('-score', 'similar_article_id')
+            .values_list('similar_article_id', 'score')[:MAX_RECOMMENDATIONS]
+        )
+    cache.set(key, recommendations, CACHE_TIMEOUT)
+    return recommendations
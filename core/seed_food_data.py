@@ -4,7 +4,9 @@ seed_food_data.py - 食物数据库初始化脚本
 或者在 Django shell 中: exec(open('core/seed_food_data.py').read())
 """
 
-from core.models import FoodItem
+from core.models import FoodItem, FoodCatalogVersion
+from core.food_search import rebuild_pinyin_keys
+from core.food_sync import propagate_food_calories
 
 # 常见食物数据 (每100g的营养成分)
 FOOD_DATA = [
@@ -53,6 +55,8 @@ def seed_food_database():
     """填充食物数据库"""
     created_count = 0
     updated_count = 0
+    seeded_foods = []
+    calorie_changed_ids = []
     
     for food_data in FOOD_DATA:
         food, created = FoodItem.objects.get_or_create(
@@ -65,11 +69,14 @@ def seed_food_database():
             }
         )
         
+        seeded_foods.append(food)
         if created:
             created_count += 1
             print(f"✅ 创建: {food_data['name']}")
         else:
             # 更新已存在的食物
+            if food.calories_per_100g != food_data["calories_per_100g"]:
+                calorie_changed_ids.append(food.id)
             food.calories_per_100g = food_data["calories_per_100g"]
             food.protein = food_data["protein"]
             food.fat = food_data["fat"]
@@ -78,6 +85,13 @@ def seed_food_database():
             updated_count += 1
             print(f"🔄 更新: {food_data['name']}")
     
+    # 全部写入后递增一次食物库版本号
+    FoodCatalogVersion.bump()
+    # 预计算拼音检索键
+    rebuild_pinyin_keys(seeded_foods)
+    # 同步更新历史餐品的热量
+    propagate_food_calories(calorie_changed_ids)
+    
     print(f"\n完成！创建 {created_count} 个食物，更新 {updated_count} 个食物")
     print(f"食物库总数: {FoodItem.objects.count()}")
 
@@ -4,10 +4,14 @@ from django.db.models import Q
 from .models import (
     SleepRecord, SportRecord, FoodItem, Meal, MealItem, CustomUser, 
     UserHealthGoal, Friendship, Comment, ContentType,
-    BodyMetric, ArticleCategory, HealthArticle, UserReadHistory, SystemLog
+    BodyMetric, ArticleCategory, HealthArticle, UserReadHistory, SystemLog,
+    MealTemplate, MealTemplateItem, WorkoutTrack
 )
 
 class SleepRecordSerializer(serializers.ModelSerializer):
+    # duration 是数据库生成列，DRF 默认会映射为通用的 ModelField (输出字符串)，这里显式声明以保持原有格式
+    duration = serializers.DurationField(read_only=True)
+
     class Meta:
         model = SleepRecord
         # 'user' 会自动关联当前登录用户，'duration' 会自动计算，所以前端只需提交两个字段
@@ -22,6 +26,14 @@ class SportRecordSerializer(serializers.ModelSerializer):
         # user 和 record_date 都是自动生成的
         read_only_fields = ['id', 'user']
 
+class WorkoutTrackSerializer(serializers.ModelSerializer):
+    """运动轨迹摘要 (由 GPX/TCX 文件生成，只读)"""
+    class Meta:
+        model = WorkoutTrack
+        fields = ['sport_record', 'source_format', 'start_time', 'distance_km', 'duration_seconds',
+                  'avg_speed_kmh', 'elevation_gain_m', 'met', 'point_count', 'polyline']
+        read_only_fields = fields
+
 class FoodItemSerializer(serializers.ModelSerializer):
     """用于展示食物库中的食物信息"""
     class Meta:
@@ -41,6 +53,68 @@ class MealItemSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'calories_calculated', 'food_item_name']
 
 
+class MealItemInputSerializer(serializers.Serializer):
+    """批量记录饮食时，单个餐品的输入格式"""
+    food_item = serializers.IntegerField(min_value=1)
+    portion = serializers.FloatField(min_value=0.1)
+
+
+class MealBulkCreateSerializer(serializers.Serializer):
+    """
+    一次请求记录一餐中的多个餐品。
+    同一天同一餐次已存在记录时，餐品追加到该餐次中；否则新建餐次。
+    """
+    MAX_ITEMS = 50
+
+    meal_type = serializers.ChoiceField(choices=Meal._meta.get_field('meal_type').choices)
+    record_date = serializers.DateField(required=False)
+    items = MealItemInputSerializer(many=True, allow_empty=False, max_length=MAX_ITEMS)
+
+
+class MealTemplateItemSerializer(serializers.ModelSerializer):
+    """饮食模板中的单个餐品"""
+    food_item_name = serializers.StringRelatedField(source='food_item.name', read_only=True)
+
+    class Meta:
+        model = MealTemplateItem
+        fields = ['id', 'food_item', 'food_item_name', 'portion', 'calories_calculated']
+        read_only_fields = fields
+
+
+class MealTemplateSerializer(serializers.ModelSerializer):
+    """用于展示饮食模板及其包含的餐品"""
+    items = MealTemplateItemSerializer(many=True, read_only=True)
+    total_calories = serializers.SerializerMethodField()
+
+    class Meta:
+        model = MealTemplate
+        fields = ['id', 'name', 'meal_type', 'created_at', 'total_calories', 'items']
+        read_only_fields = ['id', 'created_at', 'total_calories', 'items']
+
+    def get_total_calories(self, obj):
+        # items 已通过 prefetch_related 取出，在内存中求和
+        return round(sum(item.calories_calculated or 0 for item in obj.items.all()), 1)
+
+
+class MealTemplateCreateSerializer(serializers.Serializer):
+    """
+    创建饮食模板，餐品来源二选一:
+    - meal: 从已有餐次复制全部餐品
+    - items: 直接提交餐品列表 [{food_item, portion}]
+    """
+    name = serializers.CharField(max_length=100)
+    meal_type = serializers.ChoiceField(choices=Meal._meta.get_field('meal_type').choices, required=False)
+    meal = serializers.IntegerField(required=False)
+    items = MealItemInputSerializer(many=True, required=False, max_length=MealBulkCreateSerializer.MAX_ITEMS)
+
+    def validate(self, attrs):
+        if not attrs.get('meal') and not attrs.get('items'):
+            raise serializers.ValidationError('请提供来源餐次 meal 或餐品列表 items')
+        if not attrs.get('meal') and not attrs.get('meal_type'):
+            raise serializers.ValidationError({'meal_type': '直接提交餐品时必须指定餐次类型'})
+        return attrs
+
+
 class MealSerializer(serializers.ModelSerializer):
     """用于展示一"餐"的完整信息，包括它包含的所有食物"""
     # 使用嵌套序列化，当获取一餐的详情时，会把关联的 MealItem 一起显示出来
@@ -160,6 +234,9 @@ class BodyMetricSerializer(serializers.ModelSerializer):
     身体指标序列化器：用于记录和展示用户的体重、身高、BMI。
     BMI 由后端自动计算，前端只需提交 weight 和 height。
     """
+    # bmi 是数据库生成列，显式声明为浮点数输出
+    bmi = serializers.FloatField(read_only=True)
+
     class Meta:
         model = BodyMetric
         fields = ['id', 'user', 'weight', 'height', 'bmi', 'record_date']
@@ -169,6 +246,7 @@ class BodyMetricSerializer(serializers.ModelSerializer):
 class ArticleCategorySerializer(serializers.ModelSerializer):
     """
     文章分类序列化器。
+    article_count 优先使用查询集中 annotate(article_count=Count('articles')) 的结果，避免每个分类单独 COUNT 一次。
     """
     article_count = serializers.SerializerMethodField()
 
@@ -177,6 +255,8 @@ class ArticleCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'description', 'article_count']
 
     def get_article_count(self, obj):
+        if hasattr(obj, 'article_count'):
+            return obj.article_count
         return obj.articles.count()
 
 
@@ -190,10 +270,34 @@ class HealthArticleSerializer(serializers.ModelSerializer):
     class Meta:
         model = HealthArticle
         fields = [
-            'id', 'title', 'content', 'category', 'category_name',
+            'id', 'title', 'content', 'content_html', 'content_hash', 'category', 'category_name',
             'author', 'author_name', 'publish_date', 'views'
         ]
-        read_only_fields = ['id', 'author', 'author_name', 'publish_date', 'views']
+        read_only_fields = ['id', 'content_html', 'content_hash', 'author', 'author_name', 'publish_date', 'views']
+
+
+class HealthArticleDetailSerializer(HealthArticleSerializer):
+    """
+    文章详情使用的序列化器：不返回阅读量。
+    详情的 ETag 不包含阅读量，命中 304 时客户端会沿用第一次加载的响应，其中的阅读量是旧的；阅读量以列表接口为准
+    """
+
+    class Meta(HealthArticleSerializer.Meta):
+        fields = [field for field in HealthArticleSerializer.Meta.fields if field != 'views']
+
+
+class HealthArticleSummarySerializer(serializers.ModelSerializer):
+    """
+    文章列表使用的精简序列化器：只返回摘要，不包含完整正文。
+    配合 select_related('category', 'author') 使用，分类名和作者名不会产生额外查询。
+    """
+    category_name = serializers.CharField(source='category.name', read_only=True, default=None)
+    author_name = serializers.CharField(source='author.username', read_only=True, default=None)
+
+    class Meta:
+        model = HealthArticle
+        fields = ['id', 'title', 'excerpt', 'category_name', 'author_name', 'publish_date', 'views']
+        read_only_fields = fields
 
 
 class UserReadHistorySerializer(serializers.ModelSerializer):
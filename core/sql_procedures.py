@@ -10,59 +10,104 @@ SQL 存储过程、触发器和函数定义文件 (Member A)
 # 1. 触发器 (Triggers) - SQLite 语法
 # ============================================================
 
-TRIGGER_AUTO_CALCULATE_SLEEP_DURATION = """
--- 触发器：自动计算睡眠时长
--- 当插入或更新睡眠记录时，自动计算 duration 字段
-CREATE TRIGGER IF NOT EXISTS trg_calculate_sleep_duration
-AFTER INSERT ON core_sleeprecord
-BEGIN
-    UPDATE core_sleeprecord
-    SET duration = (
-        strftime('%s', NEW.wakeup_time) - strftime('%s', NEW.sleep_time)
-    )
-    WHERE id = NEW.id;
-END;
-"""
+# 睡眠时长 (core_sleeprecord.duration) 与 BMI (core_bodymetric.bmi) 是数据库生成列，
+# 由迁移 0017 创建，写入时由数据库计算，插入和更新都保持正确：
+#   duration = wakeup_time - sleep_time (微秒，与 Django DurationField 一致)
+#   bmi      = ROUND(weight / ((height / 100.0) * (height / 100.0)), 2)
+# 餐品热量依赖食物表，由模型 (MealItem.save / CalculatedCaloriesQuerySet) 计算。
+# 原先的三个 AFTER INSERT 触发器会让每次插入多一次 UPDATE，已由迁移 0017 删除。
+#
+# 文章阅读量由 core/view_counter.py 在内存中缓冲、定期以 views = views + n 批量写回；
+# 原先插入阅读历史时加一的触发器 trg_increment_article_views 会与之重复计数，已由迁移 0018 删除。
 
-TRIGGER_AUTO_CALCULATE_BMI = """
--- 触发器：自动计算 BMI
--- 当插入身体指标记录时，自动计算 BMI = 体重(kg) / (身高(m))^2
-CREATE TRIGGER IF NOT EXISTS trg_calculate_bmi
-AFTER INSERT ON core_bodymetric
-BEGIN
-    UPDATE core_bodymetric
-    SET bmi = ROUND(NEW.weight / ((NEW.height / 100.0) * (NEW.height / 100.0)), 2)
-    WHERE id = NEW.id;
-END;
-"""
+# ------------------------------------------------------------
+# 全文检索 (FTS5) 同步触发器
+# 使用 trigram 分词器支持中文子串检索；写入时在文本末尾补两个空格，
+# 使每个字符都能作为某个 trigram 的开头，从而支持 1~2 个字的短查询
+# (详见 core/full_text_search.py)。由迁移 0009 自动创建。
+# ------------------------------------------------------------
 
-TRIGGER_AUTO_CALCULATE_MEAL_CALORIES = """
--- 触发器：自动计算餐品热量
--- 当插入餐品条目时，自动计算 calories_calculated
-CREATE TRIGGER IF NOT EXISTS trg_calculate_meal_item_calories
-AFTER INSERT ON core_mealitem
+# 各表的同步触发器 (每项一条语句)。SQLite 执行部分 ALTER TABLE (如添加带默认值的列) 时会重建整张表，
+# 表上的触发器随之被删除。重建表的迁移各自带有一份触发器定义并立即恢复；migrate 结束后 ensure_fts_triggers() 再检查一遍
+FOOD_ITEM_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_fooditem_fts_insert
+AFTER INSERT ON core_fooditem
 BEGIN
-    UPDATE core_mealitem
-    SET calories_calculated = (
-        SELECT ROUND((fi.calories_per_100g / 100.0) * NEW.portion, 2)
-        FROM core_fooditem fi
-        WHERE fi.id = NEW.food_item_id
-    )
-    WHERE id = NEW.id;
-END;
-"""
+    INSERT INTO core_fooditem_fts(rowid, name) VALUES (NEW.id, NEW.name || '  ');
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_fooditem_fts_update
+AFTER UPDATE OF name ON core_fooditem
+BEGIN
+    UPDATE core_fooditem_fts SET name = NEW.name || '  ' WHERE rowid = NEW.id;
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_fooditem_fts_delete
+AFTER DELETE ON core_fooditem
+BEGIN
+    DELETE FROM core_fooditem_fts WHERE rowid = OLD.id;
+END""",
+]
 
-TRIGGER_INCREMENT_ARTICLE_VIEWS = """
--- 触发器：自动增加文章阅读量
--- 当插入阅读历史记录时，自动增加对应文章的 views 计数
-CREATE TRIGGER IF NOT EXISTS trg_increment_article_views
-AFTER INSERT ON core_userreadhistory
+HEALTH_ARTICLE_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_insert
+AFTER INSERT ON core_healtharticle
 BEGIN
-    UPDATE core_healtharticle
-    SET views = views + 1
-    WHERE id = NEW.article_id;
-END;
-"""
+    INSERT INTO core_healtharticle_fts(rowid, title, content)
+    VALUES (NEW.id, NEW.title || '  ', NEW.content || '  ');
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_update
+AFTER UPDATE OF title, content ON core_healtharticle
+BEGIN
+    UPDATE core_healtharticle_fts
+    SET title = NEW.title || '  ', content = NEW.content || '  '
+    WHERE rowid = NEW.id;
+END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_healtharticle_fts_delete
+AFTER DELETE ON core_healtharticle
+BEGIN
+    DELETE FROM core_healtharticle_fts WHERE rowid = OLD.id;
+END""",
+]
+
+# 全文索引表 -> 该表的同步触发器
+FTS_TRIGGERS = {
+    'core_fooditem_fts': FOOD_ITEM_FTS_TRIGGERS,
+    'core_healtharticle_fts': HEALTH_ARTICLE_FTS_TRIGGERS,
+}
+
+FTS_FOOD_ITEM = """
+-- 全文索引：食物名称
+CREATE VIRTUAL TABLE IF NOT EXISTS core_fooditem_fts USING fts5(name, tokenize='trigram');
+CREATE VIRTUAL TABLE IF NOT EXISTS core_fooditem_fts_vocab USING fts5vocab(core_fooditem_fts, row);
+""" + ''.join(f'\n{sql};\n' for sql in FOOD_ITEM_FTS_TRIGGERS)
+
+FTS_HEALTH_ARTICLE = """
+-- 全文索引：健康文章标题与正文
+CREATE VIRTUAL TABLE IF NOT EXISTS core_healtharticle_fts USING fts5(title, content, tokenize='trigram');
+CREATE VIRTUAL TABLE IF NOT EXISTS core_healtharticle_fts_vocab USING fts5vocab(core_healtharticle_fts, row);
+""" + ''.join(f'\n{sql};\n' for sql in HEALTH_ARTICLE_FTS_TRIGGERS)
+
+
+def ensure_fts_triggers(connection):
+    """
+    (重新) 创建全文索引已存在的表上缺失的同步触发器，已存在的触发器不受影响。
+
+    返回:
+        int: 执行的 CREATE TRIGGER 语句数
+    """
+    if connection.vendor != 'sqlite':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN (%s, %s)", list(FTS_TRIGGERS))
+        existing = {row[0] for row in cursor.fetchall()}
+        executed = 0
+        for table, triggers in FTS_TRIGGERS.items():
+            if table not in existing:
+                continue
+            for sql in triggers:
+                cursor.execute(sql)
+                executed += 1
+    return executed
+
 
 # ============================================================
 # 2. 视图 (Views) - 外模式定义
@@ -71,27 +116,28 @@ END;
 VIEW_USER_DAILY_SUMMARY = """
 -- 视图：用户每日健康摘要
 -- 用于快速查询某用户某天的健康数据汇总
-CREATE VIEW IF NOT EXISTS v_user_daily_summary AS
+DROP VIEW IF EXISTS v_user_daily_summary;
+CREATE VIEW v_user_daily_summary AS
 SELECT 
     u.id AS user_id,
     u.username,
-    DATE(sr.wakeup_time) AS record_date,
-    ROUND(sr.duration / 3600.0, 2) AS sleep_hours,
+    sr.wakeup_date AS record_date,
+    ROUND(sr.duration / 3600000000.0, 2) AS sleep_hours,
     (
         SELECT SUM(spr.duration_minutes) 
         FROM core_sportrecord spr 
-        WHERE spr.user_id = u.id AND spr.record_date = DATE(sr.wakeup_time)
+        WHERE spr.user_id = u.id AND spr.record_date = sr.wakeup_date
     ) AS total_sport_minutes,
     (
         SELECT SUM(spr.calories_burned) 
         FROM core_sportrecord spr 
-        WHERE spr.user_id = u.id AND spr.record_date = DATE(sr.wakeup_time)
+        WHERE spr.user_id = u.id AND spr.record_date = sr.wakeup_date
     ) AS total_calories_burned,
     (
         SELECT SUM(mi.calories_calculated)
         FROM core_meal m
         JOIN core_mealitem mi ON mi.meal_id = m.id
-        WHERE m.user_id = u.id AND m.record_date = DATE(sr.wakeup_time)
+        WHERE m.user_id = u.id AND m.record_date = sr.wakeup_date
     ) AS total_calories_eaten
 FROM core_customuser u
 LEFT JOIN core_sleeprecord sr ON sr.user_id = u.id;
@@ -100,7 +146,8 @@ LEFT JOIN core_sleeprecord sr ON sr.user_id = u.id;
 VIEW_USER_HEALTH_DATA = """
 -- 视图：用户个人健康数据（外模式）
 -- 普通用户只能通过此视图访问自己的数据
-CREATE VIEW IF NOT EXISTS v_my_health_data AS
+DROP VIEW IF EXISTS v_my_health_data;
+CREATE VIEW v_my_health_data AS
 SELECT 
     sr.id, sr.user_id, sr.sleep_time, sr.wakeup_time, sr.duration
 FROM core_sleeprecord sr;
@@ -124,23 +171,23 @@ def get_weekly_health_report_sql(user_id, end_date):
     """
     return f"""
     SELECT 
-        DATE(sr.wakeup_time) AS date,
-        ROUND(sr.duration / 3600.0, 2) AS sleep_hours,
+        sr.wakeup_date AS date,
+        ROUND(sr.duration / 3600000000.0, 2) AS sleep_hours,
         COALESCE((
             SELECT SUM(spr.calories_burned) 
             FROM core_sportrecord spr 
-            WHERE spr.user_id = {user_id} AND spr.record_date = DATE(sr.wakeup_time)
+            WHERE spr.user_id = {user_id} AND spr.record_date = sr.wakeup_date
         ), 0) AS calories_burned,
         COALESCE((
             SELECT SUM(mi.calories_calculated)
             FROM core_meal m
             JOIN core_mealitem mi ON mi.meal_id = m.id
-            WHERE m.user_id = {user_id} AND m.record_date = DATE(sr.wakeup_time)
+            WHERE m.user_id = {user_id} AND m.record_date = sr.wakeup_date
         ), 0) AS calories_eaten
     FROM core_sleeprecord sr
     WHERE sr.user_id = {user_id}
-      AND DATE(sr.wakeup_time) BETWEEN DATE('{end_date}', '-6 days') AND DATE('{end_date}')
-    ORDER BY DATE(sr.wakeup_time);
+      AND sr.wakeup_date BETWEEN DATE('{end_date}', '-6 days') AND DATE('{end_date}')
+    ORDER BY sr.wakeup_date;
     """
 
 
@@ -196,10 +243,8 @@ def apply_triggers_to_database():
     from django.db import connection
     
     triggers = [
-        TRIGGER_AUTO_CALCULATE_SLEEP_DURATION,
-        TRIGGER_AUTO_CALCULATE_BMI,
-        TRIGGER_AUTO_CALCULATE_MEAL_CALORIES,
-        TRIGGER_INCREMENT_ARTICLE_VIEWS,
+        FTS_FOOD_ITEM,
+        FTS_HEALTH_ARTICLE,
     ]
     
     views = [
@@ -1,12 +1,41 @@
 # core/tests.py
 
+import os
 import json
+import math
+import shutil
+import time
+import threading
+import queue
+import gzip
+import tempfile
+from io import StringIO
 from pathlib import Path
-from django.test import TestCase
+from types import SimpleNamespace
+from unittest import skipUnless
+from unittest.mock import patch
+import numpy as np
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.management import call_command
+from django.db import connection
+from django.core.cache import cache
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import CustomUser, FoodItem, UserHealthGoal, Meal, MealItem, SportRecord
-from datetime import date
+from .models import CustomUser, FoodItem, FoodCatalogVersion, UserHealthGoal, Meal, MealItem, SportRecord, ArticleCategory, HealthArticle, SleepRecord, BodyMetric, UserReadHistory, SystemLog, ArticleSimilarity
+from .food_search import rebuild_pinyin_keys
+from .food_sync import propagate_food_calories
+from .nutrient_query import NutrientTable, get_nutrient_table
+from .recommendations import rebuild_similarity, record_read
+from .audit_log import (
+    SystemLogWriter, FileSink, OVERFLOW_DROP_OLDEST, ARCHIVE_NAME_RE, build_sinks, read_segment, load_segments,
+)
+from .admin import CappedCountPaginator
+from .metrics import registry as metrics_registry, Histogram
+from .middleware import MetricsMiddleware
+from datetime import date, datetime, timedelta
+from django.utils import timezone
 
 class SmartDietRecommendationV3Tests(APITestCase):
     """
@@ -180,4 +209,1769 @@ class SmartDietRecommendationV3Tests(APITestCase):
         self.assertEqual(response.data['status'], 'info')
         self.assertIn("今日热量已基本达标", response.data['message'])
 
-        print("成功验证：运动后但热量达标，不再提供推荐。")
\ No newline at end of file
+        print("成功验证：运动后但热量达标，不再提供推荐。")
+
+class FoodSearchTests(APITestCase):
+    """
+    测试食物名称检索接口 /api/foods/search/
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='search_user', password='testpassword123')
+        for name, calories in [
+            ('菜籽油 [青油]', 899), ('花生油', 899), ('米饭', 116),
+            ('米粉', 346), ('黑豆（干）[黑大豆]', 401), ('黄豆 [大豆]', 390),
+        ]:
+            FoodItem.objects.create(name=name, calories_per_100g=calories)
+        # 直接通过 ORM 写入食物时由调用方递增食物库版本号 (与各导入入口一致)
+        FoodCatalogVersion.bump()
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def _search(self, query, limit=10):
+        response = self.client.get('/api/foods/search/', {'q': query, 'limit': limit})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data]
+
+    def test_alias_match(self):
+        """方括号中的别名也能被检索到"""
+        self.assertEqual(self._search('青油'), ['菜籽油 [青油]'])
+
+    def test_exact_match_ranked_first(self):
+        """完全匹配优先于前缀匹配，前缀匹配优先于子串匹配"""
+        names = self._search('大豆')
+        self.assertEqual(names[0], '黄豆 [大豆]')
+        self.assertIn('黑豆（干）[黑大豆]', names)
+
+    def test_single_character_and_limit(self):
+        names = self._search('米', limit=1)
+        self.assertEqual(len(names), 1)
+        self.assertIn(names[0], ['米饭', '米粉'])
+
+    def test_index_refreshes_after_new_food(self):
+        self.assertEqual(self._search('燕麦'), [])
+        FoodItem.objects.create(name='燕麦片', calories_per_100g=377)
+        FoodCatalogVersion.bump()
+        self.assertEqual(self._search('燕麦'), ['燕麦片'])
+
+    def test_empty_query(self):
+        self.assertEqual(self._search(''), [])
+
+
+class PinyinFoodSearchTests(APITestCase):
+    """
+    测试食物名称的拼音/首字母检索
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='pinyin_user', password='testpassword123')
+        foods = [
+            FoodItem.objects.create(name=name, calories_per_100g=100)
+            for name in ['米饭', '米粉', '菜籽油 [青油]', '豆腐（北豆腐）']
+        ]
+        FoodCatalogVersion.bump()
+        rebuild_pinyin_keys(foods)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def _search(self, query):
+        response = self.client.get('/api/foods/search/', {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [item['name'] for item in response.data]
+
+    def test_full_pinyin_and_initials(self):
+        self.assertEqual(self._search('mifan'), ['米饭'])
+        self.assertEqual(self._search('mf')[0], '米饭')
+        self.assertEqual(set(self._search('mi')), {'米饭', '米粉'})
+
+    def test_alias_and_qualifier(self):
+        """别名生成检索键，括号限定词不生成"""
+        self.assertEqual(self._search('qingyou'), ['菜籽油 [青油]'])
+        self.assertEqual(self._search('doufu'), ['豆腐（北豆腐）'])
+        self.assertEqual(self._search('beidoufu'), [])
+
+    def test_rebuild_replaces_keys(self):
+        food = FoodItem.objects.get(name='米粉')
+        food.name = '面条'
+        food.save()
+        FoodCatalogVersion.bump()
+        rebuild_pinyin_keys([food])
+        self.assertEqual(self._search('mt'), ['面条'])
+        self.assertNotIn('面条', self._search('mifen'))
+
+
+class FoodCatalogSnapshotTests(APITestCase):
+    """
+    测试带版本号与 ETag 的食物库快照 /api/foods/snapshot/
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.snapshot_dir = tempfile.TemporaryDirectory()
+        cls.settings_override = override_settings(FOOD_CATALOG_SNAPSHOT_DIR=cls.snapshot_dir.name)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.snapshot_dir.cleanup()
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='catalog_user', password='testpassword123')
+        FoodItem.objects.create(name='米饭', calories_per_100g=116, protein=2.6, fat=0.3, carbohydrates=25.9)
+        FoodItem.objects.create(name='花生油', calories_per_100g=899)
+        FoodCatalogVersion.bump()
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_snapshot_is_columnar_and_gzipped(self):
+        response = self.client.get('/api/foods/snapshot/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        snapshot = json.loads(gzip.decompress(response.content))
+        self.assertEqual(snapshot['count'], 2)
+        self.assertEqual(snapshot['name'], ['米饭', '花生油'])
+        self.assertEqual(snapshot['protein'], [2.6, None])
+        self.assertEqual(str(snapshot['version']), response['X-Catalog-Version'])
+
+    def test_if_none_match_returns_304_until_catalog_changes(self):
+        response = self.client.get('/api/foods/snapshot/')
+        etag = response['ETag']
+        self.assertEqual(json.loads(response.content)['count'], 2)
+
+        response = self.client.get('/api/foods/snapshot/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        FoodItem.objects.filter(name='花生油').delete()
+        FoodCatalogVersion.bump()
+        response = self.client.get('/api/foods/snapshot/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['name'], ['米饭'])
+
+    def test_versioned_url_is_immutable(self):
+        version = self.client.get('/api/foods/snapshot/')['X-Catalog-Version']
+        response = self.client.get('/api/foods/snapshot/', {'v': version})
+        self.assertIn('immutable', response['Cache-Control'])
+        response = self.client.get('/api/foods/snapshot/', {'v': '1'})
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_list_still_returns_serialized_foods(self):
+        response = self.client.get('/api/foods/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('ETag', response)
+        self.assertEqual([item['name'] for item in response.data], ['米饭', '花生油'])
+
+
+class NutrientQueryTests(APITestCase):
+    """
+    测试营养素区间查询接口 /api/foods/query/
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='nutrient_user', password='testpassword123')
+        for name, calories, protein, fat in [
+            ('鸡胸肉', 133, 24.6, 1.9), ('虾仁', 48, 10.4, 0.7), ('牛里脊', 107, 22.2, 0.9),
+            ('猪五花', 568, 7.7, 59.0), ('米饭', 116, 2.6, 0.3), ('未知食物', 100, None, None),
+        ]:
+            FoodItem.objects.create(name=name, calories_per_100g=calories, protein=protein, fat=fat)
+        FoodCatalogVersion.bump()
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_range_filter_sort_and_top_k(self):
+        response = self.client.get('/api/foods/query/', {
+            'protein__gt': 20, 'fat__lt': 5, 'ordering': 'calories_per_100g',
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual([item['name'] for item in response.data['results']], ['牛里脊', '鸡胸肉'])
+
+        response = self.client.get('/api/foods/query/', {'ordering': '-protein', 'limit': 2})
+        self.assertEqual(response.data['count'], 6)
+        self.assertEqual([item['name'] for item in response.data['results']], ['鸡胸肉', '牛里脊'])
+
+    def test_missing_nutrients_never_match_and_sort_last(self):
+        response = self.client.get('/api/foods/query/', {'fat__gte': 0, 'limit': 100})
+        self.assertNotIn('未知食物', [item['name'] for item in response.data['results']])
+        response = self.client.get('/api/foods/query/', {'ordering': 'protein', 'limit': 100})
+        self.assertEqual(response.data['results'][-1]['name'], '未知食物')
+        self.assertIsNone(response.data['results'][-1]['protein'])
+
+    def test_table_rebuilt_after_catalog_change(self):
+        params = {'protein__gte': 30}
+        self.assertEqual(self.client.get('/api/foods/query/', params).data['count'], 0)
+        FoodItem.objects.create(name='牛肉干', calories_per_100g=550, protein=45.6, fat=40.0)
+        FoodCatalogVersion.bump()
+        self.assertEqual(self.client.get('/api/foods/query/', params).data['count'], 1)
+
+    def test_uses_vectorized_columns(self):
+        self.client.get('/api/foods/query/', {'protein__gt': 1})
+        self.assertIsInstance(get_nutrient_table().columns['protein'], np.ndarray)
+
+    def test_top_k_matches_full_sort(self):
+        """argpartition 选出的 Top-K 与完整排序的前 K 条一致 (同值按食物ID，缺失值排最后)"""
+        rows = [
+            (i, f'食物{i}', (i * 37) % 500, None if i % 7 == 0 else (i * 13) % 40, (i * 11) % 30, None)
+            for i in range(1, 300)
+        ]
+        table = NutrientTable().build(rows)
+        protein = {food_id: values[1] for food_id, _, *values in rows}
+        for descending in (False, True):
+            expected = sorted(
+                protein,
+                key=lambda food_id: (protein[food_id] is None, -(protein[food_id] or 0) if descending else protein[food_id] or 0, food_id),
+            )
+            for limit in (15, 400):
+                with self.subTest(descending=descending, limit=limit):
+                    total, results = table.query([], 'protein', descending, limit)
+                    self.assertEqual(total, len(rows))
+                    self.assertEqual([row['id'] for row in results], expected[:limit])
+
+    def test_invalid_parameters(self):
+        response = self.client.get('/api/foods/query/', {'protein__between': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get('/api/foods/query/', {'ordering': 'name'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class FullTextSearchTests(APITestCase):
+    """
+    测试基于 FTS5 的食物与文章全文检索 (?search=)
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='fts_user', password='testpassword123')
+        for name in ['米饭', '豆腐干（香干）', '菜籽油 [青油]', '豆腐']:
+            FoodItem.objects.create(name=name, calories_per_100g=100)
+        cls.sleep = ArticleCategory.objects.create(name='睡眠健康')
+        cls.sport = ArticleCategory.objects.create(name='运动健身')
+        cls.article = HealthArticle.objects.create(
+            category=cls.sleep, title='如何改善睡眠质量',
+            content='睡眠是人体最基本的生理需求之一。睡前避免使用电子设备。'
+        )
+        HealthArticle.objects.create(
+            category=cls.sport, title='跑步的正确姿势', content='运动后可以改善睡眠。'
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_food_search_short_and_long_queries(self):
+        """1~2 个字的短查询和 3 个字以上的查询都能命中"""
+        response = self.client.get('/api/foods/', {'search': '饭'})
+        self.assertEqual([item['name'] for item in response.data], ['米饭'])
+        response = self.client.get('/api/foods/', {'search': '豆腐干'})
+        self.assertEqual([item['name'] for item in response.data], ['豆腐干（香干）'])
+        self.assertIn('<mark>', response.data[0]['snippet'])
+
+    def test_food_search_follows_updates_and_deletes(self):
+        food = FoodItem.objects.get(name='米饭')
+        food.name = '糙米饭'
+        food.save()
+        response = self.client.get('/api/foods/', {'search': '糙米'})
+        self.assertEqual([item['id'] for item in response.data], [food.id])
+        food.delete()
+        response = self.client.get('/api/foods/', {'search': '糙米'})
+        self.assertEqual(response.data, [])
+
+    def test_admin_search_filters_with_subquery(self):
+        # 管理后台搜索按全文检索过滤，命中的ID不取回 Python，只有 MATCH 表达式一个参数
+        admin_user = CustomUser.objects.create_superuser(username='fts_admin', password='pw')
+        self.client.force_login(admin_user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/admin/core/fooditem/', {'q': '豆腐'})
+        self.assertEqual(sorted(str(food) for food in response.context['cl'].result_list), ['豆腐', '豆腐干（香干）'])
+        listing = [q['sql'] for q in ctx.captured_queries if 'core_fooditem_fts MATCH' in q['sql'] and 'core_fooditem"."name' in q['sql']]
+        self.assertTrue(listing)
+        self.assertIn('IN (SELECT rowid FROM core_fooditem_fts', listing[0])
+
+        response = self.client.get('/admin/core/healtharticle/', {'q': '睡眠'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        response = self.client.get('/admin/core/healtharticle/', {'q': '不存在的词'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+
+    def test_article_search_ranks_title_matches_first(self):
+        response = self.client.get('/api/articles/', {'search': '睡眠'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data[0]['id'], self.article.id)
+        self.assertIn('<mark>', response.data[0]['snippet'])
+
+    def test_article_search_with_category(self):
+        response = self.client.get('/api/articles/', {'search': '睡眠', 'category': self.sport.id})
+        self.assertEqual([item['title'] for item in response.data], ['跑步的正确姿势'])
+
+    def test_article_search_escapes_html(self):
+        HealthArticle.objects.create(category=self.sleep, title='<b>标签</b>测试', content='内容')
+        response = self.client.get('/api/articles/', {'search': '标签'})
+        self.assertNotIn('<b>', response.data[0]['title_highlight'])
+
+    def fts_triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_%_fts_%'")
+            return {row[0] for row in cursor.fetchall()}
+
+    @skipUnless(connection.vendor == 'sqlite', 'FTS5 仅用于 SQLite')
+    def test_sync_triggers_exist_after_migrate(self):
+        expected = {f'trg_{table}_fts_{event}' for table in ('fooditem', 'healtharticle') for event in ('insert', 'update', 'delete')}
+        # 测试数据库由 migrate 创建，经过多次重建 core_healtharticle 表的迁移后触发器仍然存在
+        self.assertEqual(self.fts_triggers(), expected)
+
+        # 触发器丢失时 (如新的迁移重建了表却没有恢复)，migrate 结束后的 post_migrate 检查会补上
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER trg_healtharticle_fts_insert')
+        call_command('migrate', verbosity=0)
+        self.assertEqual(self.fts_triggers(), expected)
+        HealthArticle.objects.create(category=self.sleep, title='午睡指南', content='...')
+        response = self.client.get('/api/articles/', {'search': '午睡'})
+        self.assertEqual([item['title'] for item in response.data], ['午睡指南'])
+
+    def test_rebuilding_migrations_restore_triggers_from_own_copy(self):
+        # 重建 core_healtharticle 表的迁移各自带有一份触发器定义，不依赖 post_migrate 检查
+        from importlib import import_module
+        expected = {f'trg_healtharticle_fts_{event}' for event in ('insert', 'update', 'delete')}
+        for name in ('0019_healtharticle_excerpt', '0021_healtharticle_trending_score', '0022_healtharticle_content_html'):
+            with self.subTest(migration=name):
+                with connection.cursor() as cursor:
+                    for trigger in expected:
+                        cursor.execute(f'DROP TRIGGER {trigger}')
+                    # 测试运行在事务中，SQLite 不能在事务中打开 schema_editor，这里只提供迁移函数用到的两个属性
+                    schema_editor = SimpleNamespace(connection=connection, execute=cursor.execute)
+                    import_module(f'core.migrations.{name}').restore_fts_triggers(None, schema_editor)
+                self.assertEqual(self.fts_triggers() & expected, expected)
+
+
+class MealBulkCreateTests(APITestCase):
+    """
+    测试批量记录饮食接口 /api/meals/bulk/
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='bulk_meal_user', password='testpassword123')
+        cls.rice = FoodItem.objects.create(name='米饭', calories_per_100g=116)
+        cls.egg = FoodItem.objects.create(name='鸡蛋', calories_per_100g=144)
+        cls.broccoli = FoodItem.objects.create(name='西兰花', calories_per_100g=36)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def _post(self, payload):
+        return self.client.post('/api/meals/bulk/', payload, format='json')
+
+    def test_creates_meal_with_items_in_few_queries(self):
+        payload = {
+            'meal_type': 'lunch', 'record_date': '2025-08-01',
+            'items': [
+                {'food_item': self.rice.id, 'portion': 200},
+                {'food_item': self.egg.id, 'portion': 50},
+                {'food_item': self.broccoli.id, 'portion': 100},
+                {'food_item': self.rice.id, 'portion': 50},
+            ],
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self._post(payload)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # 食物、查找餐次、创建餐次、批量插入餐品，外加事务的保存点语句
+        data_queries = [q for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertLessEqual(len(data_queries), 5)
+
+        meal = Meal.objects.get(id=response.data['meal_id'])
+        self.assertTrue(response.data['meal_created'])
+        self.assertEqual(meal.meal_items.count(), 4)
+        self.assertAlmostEqual(meal.total_calories, 232 + 72 + 36 + 58)
+        self.assertEqual(response.data['items'][1]['food_item_name'], '鸡蛋')
+
+    def test_extends_existing_meal(self):
+        meal = Meal.objects.create(user=self.user, meal_type='breakfast', record_date=date(2025, 8, 2))
+        response = self._post({
+            'meal_type': 'breakfast', 'record_date': '2025-08-02',
+            'items': [{'food_item': self.egg.id, 'portion': 100}],
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['meal_id'], meal.id)
+        self.assertFalse(response.data['meal_created'])
+
+    def test_unknown_food_rolls_back_everything(self):
+        response = self._post({
+            'meal_type': 'dinner', 'record_date': '2025-08-03',
+            'items': [{'food_item': self.rice.id, 'portion': 100}, {'food_item': 999999, 'portion': 100}],
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Meal.objects.filter(user=self.user, record_date=date(2025, 8, 3)).exists())
+
+        response = self._post({'meal_type': 'dinner', 'items': []})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MealCopyAndTemplateTests(APITestCase):
+    """
+    测试复制饮食记录 /api/meals/copy/ 与饮食模板 /api/meal-templates/
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='copy_meal_user', password='testpassword123')
+        cls.other = CustomUser.objects.create_user(username='copy_meal_other', password='testpassword123')
+        cls.milk = FoodItem.objects.create(name='牛奶', calories_per_100g=54)
+        cls.bun = FoodItem.objects.create(name='馒头', calories_per_100g=223)
+        for day in range(1, 8):
+            breakfast = Meal.objects.create(user=cls.user, meal_type='breakfast', record_date=date(2025, 7, day))
+            MealItem.objects.create(meal=breakfast, food_item=cls.milk, portion=250)
+            MealItem.objects.create(meal=breakfast, food_item=cls.bun, portion=100)
+        lunch = Meal.objects.create(user=cls.user, meal_type='lunch', record_date=date(2025, 7, 1))
+        MealItem.objects.create(meal=lunch, food_item=cls.bun, portion=200)
+        cls.breakfast = breakfast
+        Meal.objects.create(user=cls.other, meal_type='breakfast', record_date=date(2025, 7, 1))
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_copy_single_day(self):
+        response = self.client.post('/api/meals/copy/?from=2025-07-01&to=2025-08-01')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['meals_created'], 2)
+        self.assertEqual(response.data['items_copied'], 3)
+        meals = Meal.objects.filter(user=self.user, record_date=date(2025, 8, 1))
+        self.assertEqual(sum(meal.total_calories for meal in meals), 135 + 223 + 446)
+
+    def test_copy_week_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/meals/copy/', {'from': '2025-07-01', 'to': '2025-09-01', 'days': 7}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['items_copied'], 15)
+        data_queries = [q for q in queries.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertLessEqual(len(data_queries), 6)
+        self.assertEqual(Meal.objects.filter(user=self.user, record_date__gte=date(2025, 9, 1)).count(), 8)
+
+    def test_copy_appends_to_existing_meal_and_validates(self):
+        existing = Meal.objects.create(user=self.user, meal_type='breakfast', record_date=date(2025, 8, 2))
+        response = self.client.post('/api/meals/copy/?from=2025-07-02&to=2025-08-02')
+        self.assertEqual(response.data['meals_created'], 0)
+        self.assertEqual(existing.meal_items.count(), 2)
+
+        response = self.client.post('/api/meals/copy/?from=2025-06-01&to=2025-08-02')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post('/api/meals/copy/?from=2025-07-01&to=2025-08-02&days=100')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_template_from_meal_and_apply(self):
+        response = self.client.post('/api/meal-templates/', {'name': '食堂早餐', 'meal': self.breakfast.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['meal_type'], 'breakfast')
+        self.assertEqual(response.data['total_calories'], 358.0)
+        template_id = response.data['id']
+
+        response = self.client.post(f'/api/meal-templates/{template_id}/apply/', {'record_date': '2025-08-10'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(response.data['meal_created'])
+        meal = Meal.objects.get(id=response.data['meal_id'])
+        self.assertEqual((meal.record_date, meal.meal_type), (date(2025, 8, 10), 'breakfast'))
+        self.assertEqual(meal.total_calories, 358.0)
+
+    def test_template_from_items_is_private(self):
+        response = self.client.post('/api/meal-templates/', {
+            'name': '加餐', 'meal_type': 'snack', 'items': [{'food_item': self.milk.id, 'portion': 200}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['items'][0]['calories_calculated'], 108.0)
+
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get('/api/meal-templates/').data, [])
+        response = self.client.post(f"/api/meal-templates/{response.data['id']}/apply/", format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class FoodCaloriePropagationTests(TestCase):
+    """
+    测试食物热量变更后，历史餐品与饮食模板条目的热量同步
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='propagate_user', password='testpassword123')
+        cls.rice = FoodItem.objects.create(name='米饭', calories_per_100g=100, product_code='TEST-RICE')
+        cls.egg = FoodItem.objects.create(name='鸡蛋', calories_per_100g=144, product_code='TEST-EGG')
+        meal = Meal.objects.create(user=cls.user, meal_type='lunch', record_date=date(2025, 7, 1))
+        cls.rice_item = MealItem.objects.create(meal=meal, food_item=cls.rice, portion=200)
+        cls.egg_item = MealItem.objects.create(meal=meal, food_item=cls.egg, portion=50)
+
+    def test_propagate_updates_only_changed_foods(self):
+        FoodItem.objects.filter(id=self.rice.id).update(calories_per_100g=116)
+        FoodItem.objects.filter(id=self.egg.id).update(calories_per_100g=999)
+        result = propagate_food_calories([self.rice.id])
+        self.assertEqual(result['meal_items'], 1)
+        self.rice_item.refresh_from_db()
+        self.egg_item.refresh_from_db()
+        self.assertAlmostEqual(self.rice_item.calories_calculated, 232)
+        self.assertAlmostEqual(self.egg_item.calories_calculated, 72)
+
+    def test_import_food_data_propagates_calorie_changes(self):
+        from django.core.management import call_command
+        from io import StringIO
+
+        with tempfile.TemporaryDirectory() as tmp:
+            foods = [
+                {'foodCode': 'TEST-RICE', 'foodName': '米饭', 'energyKCal': '116', 'protein': '2.6', 'fat': '0.3', 'CHO': '25.9'},
+                {'foodCode': 'TEST-EGG', 'foodName': '鸡蛋', 'energyKCal': '144', 'protein': '13.3', 'fat': '8.8', 'CHO': '2.8'},
+            ]
+            Path(tmp, 'foods.json').write_text(json.dumps(foods, ensure_ascii=False), encoding='utf-8')
+            out = StringIO()
+            with CaptureQueriesContext(connection) as ctx:
+                call_command('import_food_data', tmp, stdout=out)
+
+        self.assertIn('已重新计算 1 条历史餐品的热量', out.getvalue())
+        # 整个文件只递增一次食物库版本号，不是每一行一次
+        bumps = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE "core_foodcatalogversion"')]
+        self.assertEqual(len(bumps), 1)
+        self.rice_item.refresh_from_db()
+        self.assertAlmostEqual(self.rice_item.calories_calculated, 232)
+        self.assertEqual(self.rice_item.meal.total_calories, 232 + 72)
+
+
+class TodayStatusTests(APITestCase):
+    """
+    测试今日状态汇总接口 /api/today/
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import datetime as dt
+        from django.utils import timezone
+
+        cls.user = CustomUser.objects.create_user(username='today_user', password='testpassword123')
+        cls.day = date(2025, 8, 1)
+        tz = timezone.get_current_timezone()
+        cls.sleep = SleepRecord.objects.create(
+            user=cls.user, sleep_time=dt(2025, 7, 31, 23, 0, tzinfo=tz), wakeup_time=dt(2025, 8, 1, 7, 0, tzinfo=tz)
+        )
+        SportRecord.objects.create(user=cls.user, sport_type='跑步', duration_minutes=30, calories_burned=300, record_date=cls.day)
+        SportRecord.objects.create(user=cls.user, sport_type='跳绳', duration_minutes=15, calories_burned=150, record_date=cls.day)
+        food = FoodItem.objects.create(name='米饭', calories_per_100g=116)
+        for meal_type in ['breakfast', 'lunch']:
+            meal = Meal.objects.create(user=cls.user, meal_type=meal_type, record_date=cls.day)
+            MealItem.objects.create(meal=meal, food_item=food, portion=100)
+        BodyMetric.objects.create(user=cls.user, weight=60, height=170, record_date=date(2025, 7, 20))
+        UserHealthGoal.objects.create(user=cls.user, target_sleep_duration=8, target_sport_duration_minutes=30, target_diet_calories=200)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_summary_in_constant_queries(self):
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/today/', {'date': '2025-08-01'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual(data['sleep']['record_id'], self.sleep.id)
+        self.assertEqual(data['sleep']['duration_hours'], 8.0)
+        self.assertEqual(data['sports']['count'], 2)
+        self.assertEqual(data['sports']['total_calories_burned'], 450)
+        self.assertEqual([meal['meal_type'] for meal in data['meals']['meals']], ['breakfast', 'lunch'])
+        self.assertEqual(data['meals']['total_calories_eaten'], 232.0)
+        self.assertFalse(data['body_metrics']['record_exists'])
+        self.assertEqual(data['body_metrics']['latest']['bmi'], 20.76)
+        self.assertEqual(data['goals']['progress_sport_duration'], 100)
+        self.assertEqual(data['goals']['progress_diet_calories'], 116)
+
+    def test_empty_day_and_bad_date(self):
+        data = self.client.get('/api/today/', {'date': '2025-07-01'}).data
+        self.assertFalse(data['sleep']['record_exists'])
+        self.assertFalse(data['sports']['record_exists'])
+        self.assertIsNone(data['meals']['record_id'])
+        self.assertIsNone(data['body_metrics']['latest'])
+        response = self.client.get('/api/today/', {'date': '2025/07/01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+
+APPLE_HEALTH_XML = b'''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE HealthData [
+<!ELEMENT HealthData (ExportDate,(Record|Workout)*)>
+]>
+<HealthData locale="zh_CN">
+ <ExportDate value="2025-08-02 10:00:00 +0800"/>
+ <Record type="HKQuantityTypeIdentifierHeartRate" unit="count/min" startDate="2025-08-01 08:00:00 +0800" endDate="2025-08-01 08:00:00 +0800" value="72">
+  <MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="0"/>
+ </Record>
+ <Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="Watch" startDate="2025-07-31 23:00:00 +0800" endDate="2025-08-01 02:00:00 +0800" value="HKCategoryValueSleepAnalysisAsleepCore"/>
+ <Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="Watch" startDate="2025-08-01 02:00:00 +0800" endDate="2025-08-01 02:20:00 +0800" value="HKCategoryValueSleepAnalysisAwake"/>
+ <Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="Watch" startDate="2025-08-01 02:20:00 +0800" endDate="2025-08-01 07:00:00 +0800" value="HKCategoryValueSleepAnalysisAsleepDeep"/>
+ <Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="iPhone" startDate="2025-07-31 22:50:00 +0800" endDate="2025-08-01 06:30:00 +0800" value="HKCategoryValueSleepAnalysisInBed"/>
+ <Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="30.2" durationUnit="min" startDate="2025-08-01 18:00:00 +0800" endDate="2025-08-01 18:30:00 +0800">
+  <WorkoutStatistics type="HKQuantityTypeIdentifierActiveEnergyBurned" sum="310.5" unit="kcal"/>
+ </Workout>
+ <Workout workoutActivityType="HKWorkoutActivityTypeYoga" duration="1200" durationUnit="s" totalEnergyBurned="418.4" totalEnergyBurnedUnit="kJ" startDate="2025-08-02 07:00:00 +0800" endDate="2025-08-02 07:20:00 +0800"/>
+</HealthData>
+'''
+
+
+class WearableImportTests(APITestCase):
+    """测试可穿戴设备数据的流式导入"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='wearer', password='pw')
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, name, content, **extra):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return self.client.post('/api/import/wearable/', {'file': SimpleUploadedFile(name, content), **extra}, format='multipart')
+
+    def test_apple_health_export(self):
+        response = self.upload('export.xml', APPLE_HEALTH_XML)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        details = response.data['details']
+        self.assertEqual((details['sleep_created'], details['sport_created']), (1, 2))
+
+        # 多个设备的睡眠片段合并为一晚，清醒片段不计入
+        sleep = SleepRecord.objects.get(user=self.user)
+        self.assertEqual(timezone.localtime(sleep.sleep_time).strftime('%m-%d %H:%M'), '07-31 22:50')
+        self.assertEqual(timezone.localtime(sleep.wakeup_time).strftime('%m-%d %H:%M'), '08-01 07:00')
+        self.assertEqual(sleep.duration.total_seconds(), 8 * 3600 + 10 * 60)
+
+        sports = {r.sport_type: r for r in SportRecord.objects.filter(user=self.user)}
+        self.assertEqual((sports['跑步'].duration_minutes, sports['跑步'].calories_burned), (30, 310.5))
+        self.assertEqual((sports['瑜伽'].duration_minutes, sports['瑜伽'].calories_burned), (20, 100.0))
+        self.assertEqual(sports['瑜伽'].record_date, date(2025, 8, 2))
+
+        # 再次导入同一文件，全部按自然键去重
+        details = self.upload('export.xml', APPLE_HEALTH_XML).data['details']
+        self.assertEqual((details['sleep_created'], details['sport_created'], details['duplicates']), (0, 0, 3))
+        self.assertEqual(SleepRecord.objects.count(), 1)
+
+    def test_apple_health_entities_are_rejected(self):
+        # 实体膨胀 / 外部实体 (XXE)：文件在解析阶段被拒绝，不展开实体
+        for doctype, reference in (
+            ('<!DOCTYPE HealthData [<!ENTITY a "aaaaaaaaaa"><!ENTITY b "&a;&a;&a;&a;&a;&a;&a;&a;&a;&a;">]>', '&b;'),
+            ('<!DOCTYPE HealthData [<!ENTITY secret SYSTEM "file:///etc/passwd">]>', '&secret;'),
+        ):
+            with self.subTest(doctype=doctype):
+                content = f'<?xml version="1.0"?>{doctype}<HealthData><Note>{reference}</Note></HealthData>'.encode()
+                response = self.upload('export.xml', content)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SleepRecord.objects.exists())
+
+    def test_csv_import_with_export_columns(self):
+        content = (
+            '日期,入睡时间,起床时间,睡眠时长(小时)\n'
+            '2025-08-01,23:30,07:00,7.5\n'
+            '2025-08-02,00:30,06:30,6\n'
+            '2025-08-02,00:30,06:30,6\n'
+            '2025-08-03,,07:00,\n'
+        ).encode('utf-8-sig')
+        details = self.upload('sleep.csv', content).data['details']
+        self.assertEqual(details['sleep_created'], 2)
+        self.assertEqual(details['duplicates'], 1)
+        self.assertEqual(details['skipped'], 1)
+        first = SleepRecord.objects.order_by('sleep_time').first()
+        self.assertEqual(timezone.localtime(first.sleep_time).date(), date(2025, 7, 31))
+        self.assertEqual(first.duration.total_seconds(), 7.5 * 3600)
+
+    def test_json_backup_and_json_lines(self):
+        SportRecord.objects.create(user=self.user, sport_type='跑步', duration_minutes=30, calories_burned=300, record_date=date(2025, 8, 1))
+        backup = json.dumps({
+            'user': {'username': 'wearer'},
+            'sleep_records': [{'sleep_time': '2025-07-31T23:00:00+08:00', 'wakeup_time': '2025-08-01T07:00:00+08:00'}],
+            'sport_records': [
+                {'sport_type': '跑步', 'duration_minutes': 30, 'calories_burned': 300, 'record_date': '2025-08-01'},
+                {'sport_type': '跳绳', 'duration_minutes': 10, 'calories_burned': 120, 'record_date': '2025-08-01'},
+            ],
+            'meals': [{'meal_type': 'lunch', 'items': []}],
+        }, ensure_ascii=False).encode('utf-8')
+        details = self.upload('backup.json', backup).data['details']
+        self.assertEqual((details['sleep_created'], details['sport_created'], details['duplicates']), (1, 1, 1))
+
+        lines = (
+            '{"type": "sport", "sport_type": "游泳", "duration_minutes": 45, "calories_burned": 400, "date": "2025-08-02"}\n'
+            '{"type": "sleep", "start": "2025-08-01T23:00:00", "end": "2025-08-02T06:00:00"}\n'
+            '{"type": "sport", "sport_type": "游泳"}\n'
+        ).encode('utf-8')
+        details = self.upload('band.jsonl', lines).data['details']
+        self.assertEqual((details['sleep_created'], details['sport_created'], details['skipped']), (1, 1, 1))
+
+    def test_small_batches_and_bad_files(self):
+        from core.wearable_import import import_wearable_file
+        import io
+        rows = ''.join(f'sport,跑步,{10 + i},100,2025-08-01\n' for i in range(25))
+        stream = io.BytesIO(('type,sport_type,duration_minutes,calories_burned,record_date\n' + rows).encode())
+        result = import_wearable_file(self.user, stream, 'csv', batch_size=10)
+        self.assertEqual(result['sport_created'], 25)
+
+        response = self.upload('export.xml', b'<HealthData><Record')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.upload('data.txt', b'abc')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+def make_gpx(points, sport='running'):
+    rows = ''.join(
+        f'<trkpt lat="{lat}" lon="{lon}"><ele>{ele}</ele><time>{time}</time></trkpt>'
+        for lat, lon, ele, time in points
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1">'
+        '<metadata><time>2025-08-01T00:00:00Z</time></metadata>'
+        f'<trk><name>晨跑</name><type>{sport}</type><trkseg>{rows}</trkseg></trk></gpx>'
+    ).encode('utf-8')
+
+
+class WorkoutTrackUploadTests(APITestCase):
+    """测试 GPX/TCX 运动轨迹上传"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='runner', password='pw')
+        BodyMetric.objects.create(user=self.user, weight=70, height=175, record_date=date(2025, 7, 1))
+        self.client.force_authenticate(user=self.user)
+
+    def upload(self, name, content, **extra):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        return self.client.post('/api/sports/upload-track/', {'file': SimpleUploadedFile(name, content), **extra}, format='multipart')
+
+    def test_gpx_creates_sport_record_and_track(self):
+        # 沿经线向北 0.09 度 (约 10 公里)，用时 1 小时
+        points = [(round(30 + i * 0.0009, 4), 120, 10 + i % 3, f'2025-08-01T{22 + (i * 36) // 3600:02d}:{(i * 36) // 60 % 60:02d}:{i * 36 % 60:02d}Z')
+                  for i in range(101)]
+        response = self.upload('run.gpx', make_gpx(points))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        record = SportRecord.objects.get(user=self.user)
+        # UTC 22:00 即北京时间次日 06:00
+        self.assertEqual(record.record_date, date(2025, 8, 2))
+        self.assertEqual((record.sport_type, record.duration_minutes), ('跑步', 60))
+        # 10 km/h 对应 MET 9.8: 9.8 * 70kg * 1h
+        self.assertEqual(record.calories_burned, 686.0)
+        track = response.data['track']
+        self.assertAlmostEqual(track['distance_km'], 10.008, places=2)
+        self.assertEqual(track['point_count'], 101)
+        self.assertEqual(track['elevation_gain_m'], 67.0)
+        self.assertTrue(track['polyline'])
+
+        detail = self.client.get(f'/api/sports/{record.id}/track/')
+        self.assertEqual(detail.data['distance_km'], track['distance_km'])
+
+        # 同一条轨迹不能重复导入
+        response = self.upload('run.gpx', make_gpx(points))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tcx_uses_lap_time_and_sport(self):
+        points = ''.join(
+            f'<Trackpoint><Time>2025-08-01T08:{i:02d}:00Z</Time><Position><LatitudeDegrees>{30 + i * 0.003}</LatitudeDegrees>'
+            f'<LongitudeDegrees>120</LongitudeDegrees></Position><DistanceMeters>{i * 333}</DistanceMeters></Trackpoint>'
+            for i in range(31)
+        )
+        content = (
+            '<?xml version="1.0"?><TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2">'
+            '<Activities><Activity Sport="Biking"><Id>2025-08-01T08:00:00Z</Id>'
+            f'<Lap StartTime="2025-08-01T08:00:00Z"><TotalTimeSeconds>1800</TotalTimeSeconds><Track>{points}</Track></Lap>'
+            '</Activity></Activities></TrainingCenterDatabase>'
+        ).encode('utf-8')
+        response = self.upload('ride.tcx', content, save_track='false')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(response.data['track'])
+        self.assertEqual(response.data['record']['sport_type'], '骑行')
+        self.assertEqual(response.data['record']['duration_minutes'], 30)
+        # 约 10 公里 / 0.5 小时 = 20 km/h，对应 MET 8.0
+        self.assertEqual(response.data['record']['calories_burned'], 280.0)
+
+    def test_invalid_files(self):
+        self.assertEqual(self.upload('run.gpx', b'<gpx><trk>').status_code, status.HTTP_400_BAD_REQUEST)
+        no_time = make_gpx([(30, 120, 0, ''), (30.01, 120, 0, '')]).replace(b'<time></time>', b'')
+        self.assertEqual(self.upload('run.gpx', no_time).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.upload('run.fit', b'xx').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_elements_after_last_point_are_ignored(self):
+        from io import BytesIO
+        from core.workout_track import parse_track
+        content = make_gpx([(30, 120, 10, '2025-08-01T08:00:00Z'), (30.01, 120, 12, '2025-08-01T08:05:00Z')]).replace(
+            b'</trk>', b'</trk><extensions><time>2030-01-01T00:00:00Z</time><ele>9999</ele></extensions>')
+        track = parse_track(BytesIO(content), 'gpx')
+        self.assertEqual(track.end_time, datetime(2025, 8, 1, 8, 5, tzinfo=timezone.get_fixed_timezone(0)))
+        self.assertEqual(list(track.eles), [10.0, 12.0])
+        self.assertEqual(track.duration_seconds, 300)
+
+    def test_track_columns_are_packed_arrays(self):
+        """坐标直接存入 array('d') (每个值 8 字节，不保留逐点的 Python 对象)"""
+        from io import BytesIO
+        from core.workout_track import parse_track, track_distance_km
+        count = 2000
+        content = make_gpx([
+            (round(30 + i * 1e-4, 6), round(120 + i * 1e-4, 6), 10 + i % 50,
+             f'2025-08-01T{i // 3600:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z')
+            for i in range(count)
+        ])
+        track = parse_track(BytesIO(content), 'gpx')
+        self.assertEqual(len(track), count)
+        for column in (track.lats, track.lons, track.eles):
+            self.assertEqual((column.typecode, column.itemsize * column.buffer_info()[1]), ('d', 8 * count))
+        self.assertEqual(track.end_time - track.start_time, timedelta(seconds=count - 1))
+        self.assertAlmostEqual(track_distance_km(track.lats, track.lons), 29.39, places=2)
+
+    def test_haversine_and_polyline(self):
+        from array import array
+        from core.workout_track import track_distance_km, encode_polyline
+        self.assertAlmostEqual(track_distance_km(array('d', [0, 1]), array('d', [0, 0])), 111.195, places=2)
+        # Google Encoded Polyline 文档中的示例
+        lats, lons = array('d', [38.5, 40.7, 43.252]), array('d', [-120.2, -120.95, -126.453])
+        self.assertEqual(encode_polyline(lats, lons), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+
+
+class BiometricSeriesTests(APITestCase):
+    """测试高频生理数据的打包存储"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='sensor', password='pw')
+        self.client.force_authenticate(user=self.user)
+
+    def test_whole_day_is_one_row_with_two_bytes_per_sample(self):
+        from core.models import BiometricSeries
+        values = [60 + i % 40 for i in range(1440)]
+        response = self.client.post('/api/biometrics/heart_rate/', {
+            'start': '2025-08-01T00:00:00', 'interval_seconds': 60, 'values': values,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['written'], response.data['days']), (1440, 1))
+        series = BiometricSeries.objects.get(user=self.user, metric='heart_rate')
+        self.assertEqual(len(series.samples), 2 * 1440)
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/biometrics/heart_rate/', {'date': '2025-08-01'})
+        self.assertEqual(response.data['values'], values)
+
+        response = self.client.get('/api/biometrics/heart_rate/', {'date': '2025-08-01', 'resolution': 3600})
+        self.assertEqual(response.data['count'], 24)
+        self.assertEqual(response.data['values'][0], round(sum(values[:60]) / 60, 1))
+
+    def test_append_merges_across_days_and_keeps_gaps(self):
+        tz = timezone.get_current_timezone()
+        start = datetime(2025, 8, 1, 23, 58, tzinfo=tz)
+        self.client.post('/api/biometrics/steps/', {'start': start.isoformat(), 'values': [10, 20, 30, 40]}, format='json')
+        # 覆盖已有采样并在同一天追加新的采样，中间留空
+        response = self.client.post('/api/biometrics/steps/', {'samples': [
+            ['2025-08-02T00:01:00', 45], ['2025-08-02T00:05:00', 5],
+        ]}, format='json')
+        self.assertEqual(response.data['days'], 1)
+
+        data = self.client.get('/api/biometrics/steps/', {
+            'start': '2025-08-01T23:58:00', 'end': '2025-08-02T00:06:00',
+        }).data
+        self.assertEqual(data['values'], [10, 20, 30, 45, None, None, None, 5])
+        data = self.client.get('/api/biometrics/steps/', {
+            'start': '2025-08-01T23:58:00', 'end': '2025-08-02T00:06:00', 'resolution': 240,
+        }).data
+        self.assertEqual(data['values'], [105, 5])
+
+    def test_invalid_requests(self):
+        url = '/api/biometrics/heart_rate/'
+        self.assertEqual(self.client.post(url, {'start': '2025-08-01T00:00:00', 'values': [70000]}, format='json').status_code, 400)
+        self.assertEqual(self.client.post(url, {'start': '2025-08-01T00:00:00', 'interval_seconds': 7, 'values': [1]}, format='json').status_code, 400)
+        self.assertEqual(self.client.get('/api/biometrics/blood_sugar/').status_code, 404)
+        self.assertEqual(self.client.get(url, {'date': '2025-08-01', 'resolution': 90}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'start': '2025-08-01T00:00:00'}).status_code, 400)
+        # 没有数据的一天返回全部为空
+        data = self.client.get(url, {'date': '2025-08-03', 'resolution': 86400}).data
+        self.assertEqual(data['values'], [None])
+
+
+class SleepWakeupDateTests(APITestCase):
+    """测试睡眠记录的本地起床日期列"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='sleeper', password='pw')
+        self.client.force_authenticate(user=self.user)
+
+    def test_wakeup_date_uses_local_timezone(self):
+        # UTC 2025-07-31 23:30 在 Asia/Shanghai 已经是 8 月 1 日
+        utc = datetime(2025, 7, 31, 23, 30, tzinfo=timezone.get_fixed_timezone(0))
+        record = SleepRecord.objects.create(user=self.user, sleep_time=utc.replace(hour=15), wakeup_time=utc)
+        self.assertEqual(record.wakeup_date, date(2025, 8, 1))
+
+        response = self.client.get('/api/sleep/', {'record_date': '2025-08-01'})
+        self.assertEqual([item['id'] for item in response.data], [record.id])
+        self.assertEqual(self.client.get('/api/sleep/', {'record_date': '2025-07-31'}).data, [])
+
+    def test_bulk_import_sets_wakeup_date(self):
+        from core.wearable_import import WearableImporter
+        tz = timezone.get_current_timezone()
+        importer = WearableImporter(self.user)
+        importer.add_sleep(datetime(2025, 8, 1, 23, 0, tzinfo=tz), datetime(2025, 8, 2, 7, 0, tzinfo=tz))
+        importer.finish()
+        self.assertEqual(SleepRecord.objects.get(user=self.user).wakeup_date, date(2025, 8, 2))
+
+    def test_date_range_query_uses_index(self):
+        queryset = SleepRecord.objects.filter(user=self.user, wakeup_date__range=[date(2025, 8, 1), date(2025, 8, 7)])
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+        self.assertIn('sleep_user_wakeup_date_idx', plan)
+
+
+class QueryPlanTests(APITestCase):
+    """
+    用 EXPLAIN QUERY PLAN 检查热点接口的查询计划：
+    访问记录类数据表时不允许出现全表扫描 (SCAN 且未使用索引)，防止日后修改查询或删除索引后悄悄退化。
+    """
+    HOT_TABLES = {
+        'core_sleeprecord', 'core_sportrecord', 'core_meal', 'core_mealitem',
+        'core_bodymetric', 'core_userreadhistory', 'core_systemlog', 'core_healtharticle',
+        'core_articlesimilarity',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='planner', password='pw', is_staff=True)
+        cls.other = CustomUser.objects.create_user(username='neighbour', password='pw')
+        tz = timezone.get_current_timezone()
+        food = FoodItem.objects.create(name='米饭', calories_per_100g=116)
+        category = ArticleCategory.objects.create(name='睡眠知识')
+        article = HealthArticle.objects.create(category=category, title='早睡', content='早睡早起')
+        for user in (cls.user, cls.other):
+            for day in range(1, 8):
+                SleepRecord.objects.create(user=user, sleep_time=datetime(2025, 8, day, 0, 0, tzinfo=tz),
+                                           wakeup_time=datetime(2025, 8, day, 7, 0, tzinfo=tz))
+                SportRecord.objects.create(user=user, sport_type='跑步', duration_minutes=30,
+                                           calories_burned=300, record_date=date(2025, 8, day))
+                meal = Meal.objects.create(user=user, meal_type='lunch', record_date=date(2025, 8, day))
+                MealItem.objects.create(meal=meal, food_item=food, portion=200)
+                BodyMetric.objects.create(user=user, weight=70, height=175, record_date=date(2025, 8, day))
+            UserReadHistory.objects.create(user=user, article=article)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def query_plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+
+    def capture_plans(self, url, params=None):
+        """请求接口，返回其中每条 SELECT 语句及查询计划"""
+        statements = []
+
+        def wrapper(execute, sql, sql_params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                statements.append((sql, sql_params))
+            return execute(sql, sql_params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, url)
+        return [(sql, self.query_plan(sql, sql_params)) for sql, sql_params in statements]
+
+    def assertNoFullScan(self, url, params=None):
+        for sql, plan in self.capture_plans(url, params):
+            for detail in plan:
+                words = detail.split()
+                if words[:1] == ['SCAN'] and words[1] in self.HOT_TABLES and 'USING' not in words:
+                    self.fail(f'{url} 对 {words[1]} 全表扫描:\n{sql}\n{plan}')
+
+    def test_hot_endpoints_do_not_scan_tables(self):
+        endpoints = [
+            ('/api/sleep/', {'record_date': '2025-08-03'}),
+            ('/api/sleep/', None),
+            ('/api/sports/', {'record_date': '2025-08-03'}),
+            ('/api/meals/', {'record_date': '2025-08-03', 'meal_type': 'lunch'}),
+            ('/api/body-metrics/', None),
+            ('/api/read-history/', None),
+            ('/api/system-logs/', None),
+            ('/api/system-logs/', {'user': self.other.id}),
+            ('/api/system-logs/', {'action': 'POST /api/sleep/'}),
+            ('/api/system-logs/', {'start_date': '2025-08-01', 'end_date': '2025-08-07'}),
+            ('/api/articles/', None),
+            ('/api/articles/', {'category': 1}),
+            ('/api/articles/recommended/', None),
+            ('/api/articles/', {'ordering': 'trending'}),
+            ('/api/dashboard/2025-08-03/', None),
+            ('/api/today/', {'date': '2025-08-03'}),
+            ('/api/reports/weekly-sleep/2025-08-07/', None),
+            ('/api/reports/health-summary/', {'start_date': '2025-08-01', 'end_date': '2025-08-07'}),
+            ('/api/feed/', None),
+        ]
+        for url, params in endpoints:
+            with self.subTest(url=url, params=params):
+                self.assertNoFullScan(url, params)
+
+    def test_composite_indexes_are_used(self):
+        user = self.user
+        cases = [
+            (SleepRecord.objects.filter(user=user, wakeup_date__range=[date(2025, 8, 1), date(2025, 8, 7)]),
+             'sleep_user_wakeup_date_idx'),
+            (SleepRecord.objects.filter(user=user).order_by('-wakeup_time'), 'sleep_user_wakeup_time_idx'),
+            (SportRecord.objects.filter(user=user, record_date__range=[date(2025, 8, 1), date(2025, 8, 7)]),
+             'sport_user_date_idx'),
+            (Meal.objects.filter(user=user, record_date=date(2025, 8, 3), meal_type='lunch'), 'meal_user_date_type_idx'),
+            (BodyMetric.objects.filter(user=user, record_date__lte=date(2025, 8, 3)).order_by('-record_date'),
+             'bodymetric_user_date_idx'),
+            (UserReadHistory.objects.filter(user=user), 'readhistory_user_time_idx'),
+            (SystemLog.objects.all()[:50], 'systemlog_timestamp_idx'),
+            (SystemLog.objects.filter(user=user).order_by('-timestamp', '-id')[:51], 'systemlog_user_time_idx'),
+            (SystemLog.objects.filter(SystemLog.action_prefix_q('POST /api/sleep/')), 'systemlog_action_time_idx'),
+            (HealthArticle.objects.order_by('-publish_date', '-id')[:21], 'article_publish_date_idx'),
+            (HealthArticle.objects.filter(category_id=1).order_by('-publish_date', '-id')[:21], 'article_category_date_idx'),
+            (HealthArticle.objects.order_by('-trending_score', '-id')[:21], 'article_trending_idx'),
+        ]
+        for queryset, index_name in cases:
+            sql, params = queryset.query.sql_with_params()
+            with self.subTest(index=index_name):
+                self.assertIn(index_name, ' '.join(self.query_plan(sql, params)))
+
+
+class DerivedValueTests(APITestCase):
+    """测试派生字段 (睡眠时长、BMI、餐品热量) 在各种写入路径下保持一致"""
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='derived', password='pw')
+        self.client.force_authenticate(user=self.user)
+        self.tz = timezone.get_current_timezone()
+
+    def test_sleep_duration_is_generated_in_one_write(self):
+        with CaptureQueriesContext(connection) as ctx:
+            record = SleepRecord.objects.create(
+                user=self.user, sleep_time=datetime(2025, 8, 1, 23, 0, tzinfo=self.tz),
+                wakeup_time=datetime(2025, 8, 2, 6, 30, 0, 250000, tzinfo=self.tz),
+            )
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(record.duration, timedelta(hours=7, minutes=30, microseconds=250000))
+
+        response = self.client.patch(f'/api/sleep/{record.id}/', {'wakeup_time': '2025-08-02T07:00:00'}, format='json')
+        self.assertEqual(response.data['duration'], '08:00:00')
+
+        SleepRecord.objects.filter(pk=record.pk).update(sleep_time=datetime(2025, 8, 2, 0, 0, tzinfo=self.tz))
+        record.refresh_from_db()
+        self.assertEqual(record.duration, timedelta(hours=7))
+
+        created = SleepRecord.objects.bulk_create([SleepRecord(
+            user=self.user, sleep_time=datetime(2025, 8, 2, 22, 0, tzinfo=self.tz),
+            wakeup_time=datetime(2025, 8, 3, 6, 0, tzinfo=self.tz),
+        )])
+        self.assertEqual(created[0].duration, timedelta(hours=8))
+
+    def test_sleep_wakeup_date_on_bulk_paths(self):
+        # UTC 2025-07-31 23:30 在 Asia/Shanghai 已经是 8 月 1 日
+        utc = timezone.get_fixed_timezone(0)
+        record, = SleepRecord.objects.bulk_create([SleepRecord(
+            user=self.user, sleep_time=datetime(2025, 7, 31, 15, 0, tzinfo=utc),
+            wakeup_time=datetime(2025, 7, 31, 23, 30, tzinfo=utc),
+        )])
+        self.assertEqual(SleepRecord.objects.get(pk=record.pk).wakeup_date, date(2025, 8, 1))
+
+        SleepRecord.objects.filter(pk=record.pk).update(wakeup_time=datetime(2025, 8, 3, 7, 0, tzinfo=self.tz))
+        record.refresh_from_db()
+        self.assertEqual(record.wakeup_date, date(2025, 8, 3))
+        self.assertEqual(
+            list(SleepRecord.objects.filter(user=self.user, wakeup_date=date(2025, 8, 3)).values_list('pk', flat=True)),
+            [record.pk],
+        )
+
+    def test_bmi_follows_weight_and_height(self):
+        metric = BodyMetric.objects.create(user=self.user, weight=70, height=175, record_date=date(2025, 8, 1))
+        self.assertEqual(metric.bmi, 22.86)
+        metric.weight = 81
+        metric.save()
+        self.assertEqual(metric.bmi, 26.45)
+        BodyMetric.objects.filter(pk=metric.pk).update(height=0)
+        metric.refresh_from_db()
+        self.assertIsNone(metric.bmi)
+
+    def test_meal_item_calories_on_bulk_paths(self):
+        rice = FoodItem.objects.create(name='米饭', calories_per_100g=116)
+        egg = FoodItem.objects.create(name='鸡蛋', calories_per_100g=144)
+        meal = Meal.objects.create(user=self.user, meal_type='lunch', record_date=date(2025, 8, 1))
+        item, = MealItem.objects.bulk_create([MealItem(meal=meal, food_item=rice, portion=200)])
+        self.assertAlmostEqual(item.calories_calculated, 232)
+
+        meal.meal_items.update(portion=150)
+        self.assertAlmostEqual(MealItem.objects.get(pk=item.pk).calories_calculated, 174)
+        MealItem.objects.filter(pk=item.pk).update(food_item=egg, portion=50)
+        self.assertAlmostEqual(MealItem.objects.get(pk=item.pk).calories_calculated, 72)
+        MealItem.objects.filter(pk=item.pk).update(food_item_id=rice.id)
+        self.assertAlmostEqual(MealItem.objects.get(pk=item.pk).calories_calculated, 58)
+
+    def test_reports_aggregate_generated_duration(self):
+        for day in (1, 2):
+            SleepRecord.objects.create(user=self.user, sleep_time=datetime(2025, 8, day, 0, 0, tzinfo=self.tz),
+                                       wakeup_time=datetime(2025, 8, day, 6 + day, 0, tzinfo=self.tz))
+        response = self.client.get('/api/reports/health-summary/', {'start_date': '2025-08-01', 'end_date': '2025-08-02'})
+        sleep = response.data['report']['sleep_analysis']
+        self.assertEqual(sleep['average_duration_hours'], 7.5)
+        self.assertEqual(sleep['extremes'], {'shortest_sleep_hours': 7.0, 'longest_sleep_hours': 8.0})
+        response = self.client.post('/api/body-metrics/', {'weight': 70, 'height': 175, 'record_date': '2025-08-02'}, format='json')
+        self.assertEqual(response.data['bmi'], 22.86)
+
+    def test_summary_views_exist_after_migrate(self):
+        SleepRecord.objects.create(user=self.user, sleep_time=datetime(2025, 8, 1, 0, 0, tzinfo=self.tz),
+                                   wakeup_time=datetime(2025, 8, 1, 7, 30, tzinfo=self.tz))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT record_date, sleep_hours FROM v_user_daily_summary WHERE user_id = %s', [self.user.id])
+            self.assertEqual(cursor.fetchall(), [(date(2025, 8, 1), 7.5)])
+            cursor.execute('SELECT COUNT(*) FROM v_my_health_data WHERE user_id = %s', [self.user.id])
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+
+class ArticleViewCounterTests(APITestCase):
+    """测试文章阅读量的缓冲计数"""
+
+    def setUp(self):
+        from core.view_counter import article_views
+        self.counter = article_views
+        # 写回其他测试残留的计数，并重新开始计时
+        self.counter.flush()
+        self.user = CustomUser.objects.create_user(username='reader', password='pw')
+        self.client.force_authenticate(user=self.user)
+        self.first = HealthArticle.objects.create(title='早睡', content='早睡早起')
+        self.second = HealthArticle.objects.create(title='喝水', content='多喝水')
+
+    def test_reads_are_buffered_and_flushed_in_bulk(self):
+        for expected in (1, 2, 3):
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(f'/api/articles/{self.first.id}/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(self.counter.pending(self.first.id), expected)
+            self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')])
+        self.client.get(f'/api/articles/{self.second.id}/')
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.views, 0)
+
+        # 只有一篇文章的增量不同：两条 UPDATE；阅读历史只记录一次
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.counter.flush(), 2)
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]), 2)
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.views, self.second.views), (3, 1))
+        self.assertEqual(UserReadHistory.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self.counter.flush(), 0)
+
+    def test_flush_when_threshold_reached(self):
+        from core.view_counter import ViewCounter
+        counter = ViewCounter(HealthArticle, 'views', flush_interval=3600, flush_threshold=3)
+        counter.increment(self.first.id)
+        counter.increment(self.second.id)
+        self.assertEqual(HealthArticle.objects.get(pk=self.first.id).views, 0)
+        counter.increment(self.first.id)
+        self.assertEqual(counter.pending(self.first.id), 0)
+        self.assertEqual(HealthArticle.objects.get(pk=self.first.id).views, 2)
+        self.assertEqual(HealthArticle.objects.get(pk=self.second.id).views, 1)
+
+
+class ArticleCategoryListingTests(APITestCase):
+    """测试文章分类列表的聚合查询与缓存"""
+
+    def setUp(self):
+        ArticleCategory.invalidate_listing()
+        self.user = CustomUser.objects.create_user(username='browser', password='pw')
+        self.client.force_authenticate(user=self.user)
+        self.sleep = ArticleCategory.objects.create(name='睡眠知识')
+        self.sport = ArticleCategory.objects.create(name='运动指导')
+        for i in range(3):
+            HealthArticle.objects.create(category=self.sleep, title=f'睡眠{i}', content='...')
+        self.article = HealthArticle.objects.create(category=self.sport, title='跑步', content='...')
+
+    def counts(self):
+        return {item['name']: item['article_count'] for item in self.client.get('/api/article-categories/').data}
+
+    def test_listing_uses_one_query_then_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.counts(), {'睡眠知识': 3, '运动指导': 1})
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counts(), {'睡眠知识': 3, '运动指导': 1})
+
+    def test_cache_invalidated_by_article_changes(self):
+        self.counts()
+        self.article.category = self.sleep
+        self.article.save()
+        self.assertEqual(self.counts(), {'睡眠知识': 4, '运动指导': 0})
+        HealthArticle.objects.get(title='睡眠0').delete()
+        self.assertEqual(self.counts(), {'睡眠知识': 3, '运动指导': 0})
+        HealthArticle.objects.create(category=self.sport, title='游泳', content='...')
+        self.assertEqual(self.counts(), {'睡眠知识': 3, '运动指导': 1})
+        # 仅修改阅读量不会让缓存失效
+        self.article.views = 10
+        self.article.save(update_fields=['views'])
+        with self.assertNumQueries(0):
+            self.counts()
+        ArticleCategory.objects.create(name='饮食建议')
+        self.assertEqual(self.counts(), {'睡眠知识': 3, '运动指导': 1, '饮食建议': 0})
+
+    def test_cache_invalidated_by_bulk_delete(self):
+        self.counts()
+        HealthArticle.objects.filter(category=self.sleep, title__in=['睡眠0', '睡眠1']).delete()
+        self.assertEqual(self.counts(), {'睡眠知识': 1, '运动指导': 1})
+        ArticleCategory.objects.filter(pk=self.sport.pk).delete()
+        self.assertEqual(self.counts(), {'睡眠知识': 1})
+
+    def test_cache_invalidated_by_admin_delete_selected(self):
+        admin_user = CustomUser.objects.create_superuser(username='editor', password='pw')
+        self.client.force_login(admin_user)
+        self.counts()
+        ids = list(HealthArticle.objects.filter(category=self.sleep).values_list('id', flat=True))
+        response = self.client.post('/admin/core/healtharticle/', {
+            'action': 'delete_selected', '_selected_action': ids, 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(self.counts(), {'睡眠知识': 0, '运动指导': 1})
+        response = self.client.post('/admin/core/articlecategory/', {
+            'action': 'delete_selected', '_selected_action': [self.sleep.id], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(self.counts(), {'运动指导': 1})
+
+
+class ArticleListTests(APITestCase):
+    """测试文章列表的摘要投影与游标分页"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='lister', password='pw')
+        cls.category = ArticleCategory.objects.create(name='饮食建议')
+        start = timezone.now() - timedelta(days=30)
+        cls.articles = [
+            HealthArticle.objects.create(
+                category=cls.category if i % 2 else None, author=cls.user, title=f'文章{i}',
+                content='多吃蔬菜。\n\n' * 50, publish_date=start + timedelta(hours=i),
+            )
+            for i in range(25)
+        ]
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_returns_summaries_in_pages(self):
+        with self.assertNumQueries(1):
+            page = self.client.get('/api/articles/').data
+        self.assertEqual(len(page['results']), 20)
+        first = page['results'][0]
+        self.assertEqual(set(first), {'id', 'title', 'excerpt', 'category_name', 'author_name', 'publish_date', 'views'})
+        self.assertEqual(first['title'], '文章24')
+        self.assertEqual(first['author_name'], 'lister')
+        self.assertEqual(len(first['excerpt']), HealthArticle.EXCERPT_LENGTH + 3)
+        self.assertNotIn('\n', first['excerpt'])
+
+        second = self.client.get(page['next']).data
+        self.assertEqual([item['title'] for item in second['results']], [f'文章{i}' for i in range(4, -1, -1)])
+        self.assertIsNone(second['next'])
+
+        page = self.client.get('/api/articles/', {'category': self.category.id, 'limit': 5}).data
+        self.assertEqual([item['title'] for item in page['results']], ['文章23', '文章21', '文章19', '文章17', '文章15'])
+
+    def test_excerpt_follows_content(self):
+        article = self.articles[0]
+        article.content = '短文'
+        article.save(update_fields=['content'])
+        article.refresh_from_db()
+        self.assertEqual(article.excerpt, '短文')
+
+
+class ArticleRecommendationTests(APITestCase):
+    """测试基于阅读历史共现的文章推荐"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [CustomUser.objects.create_user(username=f'reader{i}', password='pw') for i in range(3)]
+        cls.articles = [HealthArticle.objects.create(title=f'文章{i}', content='内容') for i in range(4)]
+
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        # 详情接口缓冲的阅读量在测试数据库销毁前写回
+        from core.view_counter import article_views
+        article_views.flush()
+
+    def read(self, user, *articles):
+        self.client.force_authenticate(user=user)
+        for article in articles:
+            self.assertEqual(self.client.get(f'/api/articles/{article.id}/').status_code, status.HTTP_200_OK)
+
+    def matrix(self):
+        return set(ArticleSimilarity.objects.values_list('article_id', 'similar_article_id', 'co_reads'))
+
+    def test_incremental_updates_match_rebuild(self):
+        a, b, c, d = self.articles
+        self.read(self.users[0], a, b, c, a)
+        self.read(self.users[1], b, c, d)
+        incremental = self.matrix()
+        self.assertIn((b.id, c.id, 2), incremental)
+        self.assertIn((c.id, b.id, 2), incremental)
+        self.assertEqual(rebuild_similarity(), len(incremental))
+        self.assertEqual(self.matrix(), incremental)
+
+    def test_recommendations_rank_unread_articles_by_co_reads(self):
+        a, b, c, d = self.articles
+        self.read(self.users[0], a, b, c)
+        self.read(self.users[1], a, b)
+        self.read(self.users[2], a)
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/articles/recommended/')
+        self.assertEqual([(item['id'], item['score']) for item in response.data], [(b.id, 2), (c.id, 1)])
+        self.assertIn('excerpt', response.data[0])
+        # 命中缓存时只查询文章本身
+        with self.assertNumQueries(1):
+            self.client.get('/api/articles/recommended/')
+
+        # 新的阅读记录使推荐缓存失效，已读文章不再推荐
+        self.read(self.users[2], b)
+        response = self.client.get('/api/articles/recommended/', {'limit': 1})
+        self.assertEqual([item['id'] for item in response.data], [c.id])
+
+    def test_no_history_returns_empty_list(self):
+        self.client.force_authenticate(user=self.users[0])
+        self.assertEqual(self.client.get('/api/articles/recommended/').data, [])
+
+    def test_simultaneous_first_reads_both_count(self):
+        from core import recommendations
+        a, b = self.articles[:2]
+        for user in self.users[:2]:
+            UserReadHistory.objects.create(user=user, article=a)
+            UserReadHistory.objects.create(user=user, article=b)
+
+        # 第二个用户读完历史、还没写入共读矩阵时，第一个用户的写入先完成 (原先会丢失一次加一)
+        read_ids = recommendations.read_article_ids
+
+        def interleaved(user_id):
+            ids = read_ids(user_id)
+            recommendations.increment_co_reads([(a.id, b.id), (b.id, a.id)])
+            return ids
+
+        with patch.object(recommendations, 'read_article_ids', interleaved), \
+                CaptureQueriesContext(connection) as ctx:
+            record_read(self.users[1].id, b.id)
+        self.assertEqual(self.matrix(), {(a.id, b.id, 2), (b.id, a.id, 2)})
+        # 写入前不再查询哪些文章对已存在
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'articlesimilarity' in q['sql']])
+
+
+class TrendingArticleTests(APITestCase):
+    """测试按时间衰减的文章热度"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='trender', password='pw')
+        now = timezone.now()
+        cls.old = HealthArticle.objects.create(title='旧文章', content='内容', publish_date=now - timedelta(days=10))
+        cls.new = HealthArticle.objects.create(title='新文章', content='内容', publish_date=now - timedelta(days=2))
+
+    def setUp(self):
+        from core.view_counter import article_views
+        self.counter = article_views
+        self.counter.flush()
+        self.client.force_authenticate(user=self.user)
+
+    def test_score_decays_by_half_life(self):
+        self.assertAlmostEqual(self.new.trending_score - self.old.trending_score, 8 * math.log(2), places=6)
+
+    def test_reads_are_added_with_current_weight(self):
+        before = self.old.trending_score
+        for _ in range(10):
+            self.counter.increment(self.old.id)
+        now = timezone.now()
+        self.counter.flush()
+        self.old.refresh_from_db()
+        points = HealthArticle.trending_points(now, 10)
+        self.assertAlmostEqual(self.old.trending_score, max(before, points) + math.log1p(math.exp(-abs(before - points))), places=3)
+        self.assertEqual(self.old.views, 10)
+
+    def test_trending_ordering(self):
+        page = self.client.get('/api/articles/', {'ordering': 'trending'}).data
+        self.assertEqual([item['title'] for item in page['results']], ['新文章', '旧文章'])
+
+        # 最近的 10 次阅读让旧文章超过 2 天前发布、无人阅读的新文章
+        for _ in range(10):
+            self.client.get(f'/api/articles/{self.old.id}/')
+        self.counter.flush()
+        page = self.client.get('/api/articles/', {'ordering': 'trending', 'limit': 1}).data
+        self.assertEqual([item['title'] for item in page['results']], ['旧文章'])
+        page = self.client.get(page['next']).data
+        self.assertEqual([item['title'] for item in page['results']], ['新文章'])
+
+        page = self.client.get('/api/articles/').data
+        self.assertEqual([item['title'] for item in page['results']], ['新文章', '旧文章'])
+
+
+class ArticleRenderTests(APITestCase):
+    """测试文章正文预渲染为 HTML 及详情接口的 ETag"""
+
+    CONTENT = (
+        '# 睡眠指南\n\n**睡眠的重要性**\n\n1. 恢复体力\n2. 增强*免疫*\n\n'
+        '- 规律作息\n- 少用 `手机`\n\n<script>alert(1)</script>\n'
+        '[来源](https://example.com/a?b=1&c=2) [坏链接](javascript:alert(1))'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='renderer', password='pw')
+        cls.article = HealthArticle.objects.create(title='睡眠指南', content=cls.CONTENT)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def tearDown(self):
+        from core.view_counter import article_views
+        article_views.flush()
+
+    def test_content_rendered_and_sanitized_on_save(self):
+        html = self.article.content_html
+        self.assertIn('<h1>睡眠指南</h1>', html)
+        self.assertIn('<p><strong>睡眠的重要性</strong></p>', html)
+        self.assertIn('<ol><li>恢复体力</li><li>增强<em>免疫</em></li></ol>', html)
+        self.assertIn('<ul><li>规律作息</li><li>少用 <code>手机</code></li></ul>', html)
+        self.assertIn('&lt;script&gt;', html)
+        self.assertNotIn('<script>', html)
+        self.assertIn('<a href="https://example.com/a?b=1&amp;c=2" rel="nofollow noopener" target="_blank">来源</a>', html)
+        self.assertNotIn('href="javascript', html)
+        self.assertEqual(len(self.article.content_hash), 64)
+
+        self.article.content = '新的正文'
+        self.article.save(update_fields=['content'])
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.content_html, '<p>新的正文</p>')
+
+    def test_retrieve_supports_etag(self):
+        url = f'/api/articles/{self.article.id}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['content_html'], self.article.content_html)
+        # 阅读量不在 ETag 中，详情也不返回，避免 304 时客户端沿用旧的阅读量
+        self.assertNotIn('views', response.data)
+        etag = response['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+
+        # 304 同样计入阅读量；阅读量变化不影响 ETag
+        from core.view_counter import article_views
+        article_views.flush()
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.views, 2)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.article.title = '睡眠指南 (修订)'
+        self.article.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class SystemLoggingMiddlewareTests(APITestCase):
+    """测试敏感操作的审计日志 (请求处于事务中时同步写入)"""
+
+    def test_sensitive_write_is_logged(self):
+        CustomUser.objects.create_user(username='audited', password='secret123')
+        response = self.client.post('/api/login/', {'username': 'audited', 'password': 'secret123'}, format='json')
+        log = SystemLog.objects.get(action='POST /api/login/')
+        self.assertEqual(log.details, f'Status: {response.status_code}')
+        self.assertEqual(log.ip_address, '127.0.0.1')
+
+
+class SystemLogWriterTests(TransactionTestCase):
+    """测试系统日志的后台批量写入 (不在事务中，日志交给后台线程)"""
+
+    def make_writer(self, **kwargs):
+        writer = SystemLogWriter(**kwargs)
+        self.addCleanup(writer.shutdown)
+        return writer
+
+    def entries(self, count, prefix='GET'):
+        return [SystemLog(action=f'{prefix} /api/{i}/', details='test') for i in range(count)]
+
+    def test_batches_are_written_by_background_thread(self):
+        writer = self.make_writer(batch_size=3, flush_interval=10)
+        for entry in self.entries(7):
+            writer.submit(entry)
+        self.assertTrue(writer.flush())
+        self.assertEqual(writer.written, 7)
+        self.assertEqual(SystemLog.objects.count(), 7)
+        self.assertNotEqual(writer.thread, threading.current_thread())
+
+    def test_partial_batch_is_written_after_interval(self):
+        writer = self.make_writer(batch_size=100, flush_interval=0.05)
+        writer.submit(self.entries(1)[0])
+        deadline = time.monotonic() + 5
+        while writer.written < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(writer.written, 1)
+        self.assertEqual(SystemLog.objects.count(), 1)
+
+    def test_overflow_policies(self):
+        writer = self.make_writer(max_queue_size=2, autostart=False)
+        for entry in self.entries(3):
+            writer.submit(entry)
+        self.assertEqual(writer.dropped, 1)
+        writer.flush()
+        self.assertEqual(sorted(SystemLog.objects.values_list('action', flat=True)), ['GET /api/0/', 'GET /api/1/'])
+
+        writer = self.make_writer(max_queue_size=2, autostart=False, overflow=OVERFLOW_DROP_OLDEST)
+        for entry in self.entries(3, prefix='PUT'):
+            writer.submit(entry)
+        self.assertEqual(writer.dropped, 1)
+        writer.shutdown()
+        self.assertEqual(sorted(SystemLog.objects.filter(action__startswith='PUT').values_list('action', flat=True)),
+                         ['PUT /api/1/', 'PUT /api/2/'])
+
+    def test_bad_row_does_not_drop_whole_batch(self):
+        user = CustomUser.objects.create_user(username='gone', password='pw')
+        writer = self.make_writer(autostart=False)
+        entries = self.entries(3)
+        entries[1].user_id = user.id
+        user.delete()
+        for entry in entries:
+            writer.submit(entry)
+        writer.flush()
+        self.assertEqual((writer.written, writer.dropped), (2, 1))
+        self.assertEqual(sorted(SystemLog.objects.values_list('action', flat=True)), ['GET /api/0/', 'GET /api/2/'])
+
+    def test_drop_oldest_keeps_stop_marker_and_counts_each_loss(self):
+        from core.audit_log import _STOP
+        writer = self.make_writer(max_queue_size=2, autostart=False, overflow=OVERFLOW_DROP_OLDEST)
+        writer.queue.put(_STOP)
+        writer.queue.put(self.entries(1)[0])
+        writer.submit(self.entries(1, prefix='PUT')[0])
+        self.assertEqual(writer.dropped, 1)
+        self.assertIn(_STOP, list(writer.queue.queue))
+
+        # 丢掉最旧的日志后新日志仍然放不进队列 (被别的线程抢先占满)：两条都计入丢弃数
+        writer = self.make_writer(max_queue_size=2, autostart=False, overflow=OVERFLOW_DROP_OLDEST)
+        for entry in self.entries(2):
+            writer.submit(entry)
+        with patch.object(writer.queue, 'put_nowait', side_effect=queue.Full):
+            writer.submit(self.entries(1, prefix='PUT')[0])
+        self.assertEqual(writer.dropped, 2)
+
+    def test_shutdown_writes_remaining_entries(self):
+        writer = self.make_writer(batch_size=100, flush_interval=10)
+        for entry in self.entries(5):
+            writer.submit(entry)
+        writer.shutdown()
+        self.assertFalse(writer.thread.is_alive())
+        self.assertEqual(SystemLog.objects.count(), 5)
+
+
+class AuditLogSinkTests(TestCase):
+    """测试系统日志的文件输出 (轮转的 gzip JSON Lines) 与导回数据库"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.user = CustomUser.objects.create_user(username='auditor', password='pw')
+        tz = timezone.get_current_timezone()
+        self.entries = [
+            SystemLog(user=self.user, action=f'POST /api/sleep/{i}/', ip_address='10.0.0.1', details='Status: 201',
+                      timestamp=datetime(2025, 8, 1 + i // 3, 12, i, tzinfo=tz))
+            for i in range(6)
+        ]
+
+    def segments(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_file_sink_rotates_by_day_and_size(self):
+        sink = FileSink(self.directory, max_bytes=200)
+        sink.write(self.entries[:4])
+        sink.write(self.entries[4:])
+        sink.close()
+        self.assertEqual(self.segments(), [
+            'systemlog-20250801-0001.jsonl.gz', 'systemlog-20250801-0002.jsonl.gz',
+            'systemlog-20250802-0001.jsonl.gz', 'systemlog-20250802-0002.jsonl.gz',
+        ])
+        records = [record for name in self.segments() for record in read_segment(os.path.join(self.directory, name))]
+        self.assertEqual([record['action'] for record in records], [entry.action for entry in self.entries])
+        self.assertEqual(records[0]['user_id'], self.user.id)
+
+    def test_unfinished_segment_is_readable(self):
+        sink = FileSink(self.directory)
+        sink.write(self.entries[:2])
+        # 不关闭文件 (模拟进程异常退出)：已刷新的记录仍然可以读出
+        path = os.path.join(self.directory, self.segments()[0])
+        self.assertEqual(len(list(read_segment(path))), 2)
+        sink.close()
+
+    def test_sinks_sharing_directory_do_not_overwrite(self):
+        # 两个进程的 sink 写同一个目录；第二个打开时还看不到第一个刚创建的文件 (同时打开)
+        first, second = FileSink(self.directory), FileSink(self.directory)
+        first.write(self.entries[:2])
+        with patch('core.audit_log.os.listdir', return_value=[]):
+            second.write(self.entries[2:3])
+        first.write(self.entries[1:2])
+        first.close()
+        second.close()
+        self.assertEqual(self.segments(), ['systemlog-20250801-0001.jsonl.gz', 'systemlog-20250801-0002.jsonl.gz'])
+        actions = sorted(record['action'] for name in self.segments() for record in read_segment(os.path.join(self.directory, name)))
+        self.assertEqual(actions, sorted(entry.action for entry in self.entries[:3] + self.entries[1:2]))
+
+    def test_writer_with_file_sink_skips_database(self):
+        writer = SystemLogWriter(sinks=build_sinks('file'), autostart=False)
+        writer.sinks[0].directory = self.directory
+        writer.submit(self.entries[0])
+        writer.shutdown()
+        self.assertFalse(SystemLog.objects.exists())
+        self.assertEqual(writer.written, 1)
+        self.assertEqual(len(self.segments()), 1)
+
+    def test_load_system_logs_command(self):
+        sink = FileSink(self.directory)
+        sink.write(self.entries)
+        sink.close()
+        out = StringIO()
+        call_command('load_system_logs', '--start', '2025-08-02', '--dir', self.directory, stdout=out)
+        self.assertEqual(
+            list(SystemLog.objects.order_by('timestamp').values_list('action', flat=True)),
+            [entry.action for entry in self.entries[3:]]
+        )
+        self.assertEqual(SystemLog.objects.first().user, self.user)
+
+        # 重复导入时跳过已存在的记录
+        call_command('load_system_logs', '--start', '2025-08-01', '--end', '2025-08-02', '--dir', self.directory, stdout=out)
+        self.assertEqual(SystemLog.objects.count(), 6)
+        self.assertIn('跳过已存在的 3 条', out.getvalue())
+
+    def test_reloading_logs_of_deleted_user_does_not_duplicate(self):
+        sink = FileSink(self.directory)
+        sink.write(self.entries[:3])
+        sink.close()
+        self.user.delete()
+        self.assertEqual(load_segments(date(2025, 8, 1), date(2025, 8, 1), self.directory)['loaded'], 3)
+        result = load_segments(date(2025, 8, 1), date(2025, 8, 1), self.directory)
+        self.assertEqual((result['loaded'], result['duplicates']), (0, 3))
+        self.assertEqual(SystemLog.objects.filter(user__isnull=True).count(), 3)
+
+
+class SystemLogRetentionTests(APITestCase):
+    """测试系统日志的筛选分页、归档与导回"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(username='logadmin', password='pw', is_staff=True)
+        cls.member = CustomUser.objects.create_user(username='member', password='pw')
+        now = timezone.now()
+        SystemLog.objects.bulk_create([
+            SystemLog(user=cls.member if i % 2 else cls.admin, action=f"{'POST' if i % 3 else 'DELETE'} /api/sleep/{i}/",
+                      timestamp=now - timedelta(days=i * 20))
+            for i in range(10)
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.admin)
+
+    def test_filters_and_cursor_pagination(self):
+        page = self.client.get('/api/system-logs/', {'limit': 4}).data
+        self.assertEqual([item['action'] for item in page['results']],
+                         ['DELETE /api/sleep/0/', 'POST /api/sleep/1/', 'POST /api/sleep/2/', 'DELETE /api/sleep/3/'])
+        page = self.client.get(page['next']).data
+        self.assertEqual(len(page['results']), 4)
+
+        page = self.client.get('/api/system-logs/', {'user': self.member.id}).data
+        self.assertEqual({item['username'] for item in page['results']}, {'member'})
+        self.assertEqual(len(page['results']), 5)
+        page = self.client.get('/api/system-logs/', {'action': 'DELETE '}).data
+        self.assertEqual(len(page['results']), 4)
+        start = (timezone.localdate() - timedelta(days=40)).isoformat()
+        end = (timezone.localdate() - timedelta(days=20)).isoformat()
+        page = self.client.get('/api/system-logs/', {'start_date': start, 'end_date': end}).data
+        self.assertEqual([item['action'] for item in page['results']], ['POST /api/sleep/1/', 'POST /api/sleep/2/'])
+
+        self.assertEqual(self.client.get('/api/system-logs/', {'user': 'abc'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/system-logs/', {'start_date': '08/01'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.member)
+        self.assertEqual(self.client.get('/api/system-logs/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_archive_and_load_back(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        out = StringIO()
+        call_command('archive_system_logs', '--days', '90', '--dir', directory, '--chunk-size', '2', stdout=out)
+        # 90 天以内的 5 条 (0, 20, 40, 60, 80 天前) 保留在数据库
+        self.assertEqual(SystemLog.objects.count(), 5)
+        self.assertTrue(all(ARCHIVE_NAME_RE.match(name) for name in os.listdir(directory)))
+        archived = [record for name in sorted(os.listdir(directory)) for record in read_segment(os.path.join(directory, name))]
+        self.assertEqual(sorted(record['action'] for record in archived), sorted(f"{'POST' if i % 3 else 'DELETE'} /api/sleep/{i}/" for i in range(5, 10)))
+
+        # 导回一段日期内的归档日志
+        day = timezone.localdate() - timedelta(days=100)
+        result = load_segments(day, day, directory)
+        self.assertEqual(result['loaded'], 1)
+        self.assertTrue(SystemLog.objects.filter(action='POST /api/sleep/5/').exists())
+
+    def test_admin_changelist(self):
+        admin_user = CustomUser.objects.create_superuser(username='root', password='pw')
+        self.client.force_login(admin_user)
+        response = self.client.get('/admin/core/systemlog/', {'path': '/api/sleep/', 'q': 'member'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+        with patch.object(CappedCountPaginator, 'COUNT_LIMIT', 3):
+            self.assertEqual(CappedCountPaginator(SystemLog.objects.all(), 2).num_pages, 2)
+
+
+class MetricsTests(APITestCase):
+    """测试接口耗时/查询数统计与 /api/metrics/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_user(username='metricsadmin', password='pw', is_staff=True)
+        cls.member = CustomUser.objects.create_user(username='metricsmember', password='pw')
+
+    def setUp(self):
+        metrics_registry.reset()
+        self.addCleanup(metrics_registry.reset)
+
+    def test_histogram_buckets(self):
+        histogram = Histogram((1, 5, 10))
+        for value in (0, 1, 3, 7, 50):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(), [(1, 2), (5, 3), (10, 4), ('+Inf', 5)])
+        self.assertEqual(histogram.quantile(0.5), 5)
+        self.assertIsNone(histogram.quantile(0.99))
+
+    def test_json_route_stats(self):
+        self.client.force_authenticate(user=self.member)
+        for _ in range(3):
+            self.client.get('/api/articles/')
+        self.client.get('/api/articles/999999/')
+
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/metrics/', {'format': 'json'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        routes = {(item['method'], item['route']): item for item in response.json()['routes']}
+        listing = routes[('GET', 'healtharticle-list')]
+        self.assertEqual(listing['count'], 3)
+        self.assertEqual(listing['responses'], {'2xx': 3})
+        self.assertGreaterEqual(listing['db_queries']['sum'], 3)
+        self.assertGreater(listing['latency']['sum'], 0)
+        # 路由标签按 URL 名称归并，不包含主键
+        self.assertEqual(routes[('GET', 'healtharticle-detail')]['responses'], {'4xx': 1})
+
+    def test_prometheus_text(self):
+        self.client.force_authenticate(user=self.admin)
+        self.client.get('/api/articles/')
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('http_request_duration_seconds_bucket{method="GET",route="healtharticle-list",le="+Inf"} 1', text)
+        self.assertIn('http_responses_total{method="GET",route="healtharticle-list",status="2xx"} 1', text)
+        self.assertIn('http_request_db_queries_count{method="GET",route="healtharticle-list"} 1', text)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(user=self.member)
+        self.assertEqual(self.client.get('/api/metrics/', {'format': 'json'}).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=None)
+        self.assertIn(self.client.get('/api/metrics/').status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            MetricsMiddleware(lambda request: None)
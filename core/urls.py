@@ -18,11 +18,14 @@ from .views import (
     login_view, 
     logout_view,
     DashboardView,
+    TodayStatusView,
+    BiometricSeriesView,
     SleepRecordViewSet, 
     SportRecordViewSet, 
     FoodItemViewSet, 
     MealViewSet, 
     MealItemViewSet,
+    MealTemplateViewSet,
     ProfileView,
     UserHealthGoalView,
     WeeklySleepReportView,
@@ -38,9 +41,11 @@ from .views import (
     HealthArticleViewSet,
     UserReadHistoryViewSet,
     SystemLogViewSet,
+    MetricsView,
     # 新增 Views (Member C)
     DataExportView,
     FoodImportView,
+    WearableImportView,
 )
 
 from django.conf import settings
@@ -95,6 +100,7 @@ router.register(r'sports', SportRecordViewSet, basename='sportrecord')
 router.register(r'foods', FoodItemViewSet, basename='fooditem')
 router.register(r'meals', MealViewSet, basename='meal')
 router.register(r'meal-items', MealItemViewSet, basename='mealitem')
+router.register(r'meal-templates', MealTemplateViewSet, basename='mealtemplate')
 router.register(r'friendships', FriendshipViewSet, basename='friendship')
 router.register(r'comments', CommentViewSet, basename='comment')
 # 新增路由 (Member A)
@@ -143,6 +149,8 @@ urlpatterns = [
     
     # 2. 看板数据和个人档案以及个人目标的 API
     path('api/dashboard/<str:date_str>/', DashboardView.as_view(), name='api-dashboard'),
+    path('api/today/', TodayStatusView.as_view(), name='api-today'),
+    path('api/biometrics/<str:metric>/', BiometricSeriesView.as_view(), name='api-biometrics'),
     path('api/profile/', ProfileView.as_view(), name='api-profile'),
     path('api/goals/', UserHealthGoalView.as_view(), name='api-health-goals'),
     
@@ -158,6 +166,10 @@ urlpatterns = [
     # 5. 数据导入导出 API (Member C)
     path('data-export/', data_export_view, name='api-data-export'),
     path('api/import/foods/', FoodImportView.as_view(), name='api-food-import'),
+    path('api/import/wearable/', WearableImportView.as_view(), name='api-wearable-import'),
+
+    # 接口性能统计 (仅管理员)
+    path('api/metrics/', MetricsView.as_view(), name='api-metrics'),
 
     # 6. 所有由 ViewSet 自动生成的 CRUD API
     path('api/', include(router.urls)),
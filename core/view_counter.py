@@ -0,0 +1,104 @@
+"""
+view_counter.py - 文章阅读量的缓冲计数 (write-behind)
+功能:
+1. 阅读文章时只在进程内存中累加计数，不写数据库，读请求不再争用 SQLite 的写锁
+2. 距上次写回超过 FLUSH_INTERVAL 秒、或缓冲的阅读次数达到 FLUSH_THRESHOLD 时批量写回：
+   每篇文章只执行一次 views = views + n (F 表达式，在数据库内累加)，增量相同的文章合并为一条 UPDATE；
+   多个进程各自缓冲、各自写回也不会丢失计数
+3. 进程退出时 (atexit) 写回剩余的计数
+4. 文章详情返回的阅读量 = 数据库中的值 + 本进程尚未写回的计数
+5. 写回阅读量的同一条 UPDATE 顺带累加文章热度 (HealthArticle.trending_updates)，阅读时间按写回时间计
+"""
+import time
+import atexit
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import HealthArticle
+
+# 两次写回之间的最长间隔 (秒)
+FLUSH_INTERVAL = 10
+# 缓冲的阅读次数达到该值时立即写回
+FLUSH_THRESHOLD = 500
+
+
+class ViewCounter:
+    """
+    按主键缓冲某个计数字段的增量。
+
+    使用方式:
+        counter = ViewCounter(HealthArticle, 'views')
+        counter.increment(article.id)
+        counter.flush()
+
+    extra_updates(n, now) 可选，返回写回 n 次计数时需要一并更新的其他字段 (update() 的参数)。
+    """
+
+    def __init__(self, model, field, extra_updates=None, flush_interval=FLUSH_INTERVAL, flush_threshold=FLUSH_THRESHOLD):
+        self.model = model
+        self.field = field
+        self.extra_updates = extra_updates
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.lock = threading.Lock()
+        self.counts = defaultdict(int)
+        self.total = 0
+        self.last_flush = time.monotonic()
+
+    def increment(self, pk, n=1):
+        """累加计数，到达写回条件时由当前请求顺带写回"""
+        with self.lock:
+            self.counts[pk] += n
+            self.total += n
+            due = self.total >= self.flush_threshold or time.monotonic() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def pending(self, pk):
+        """尚未写回数据库的计数"""
+        with self.lock:
+            return self.counts.get(pk, 0)
+
+    def flush(self):
+        """
+        把缓冲的计数写回数据库。
+
+        返回:
+            int: 执行的 UPDATE 语句数
+        """
+        with self.lock:
+            counts, self.counts = self.counts, defaultdict(int)
+            self.total = 0
+            self.last_flush = time.monotonic()
+        if not counts:
+            return 0
+
+        # 增量相同的文章合并为一条 UPDATE
+        groups = defaultdict(list)
+        for pk, n in counts.items():
+            groups[n].append(pk)
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                for n, pks in groups.items():
+                    values = {self.field: F(self.field) + n}
+                    if self.extra_updates:
+                        values.update(self.extra_updates(n, now))
+                    self.model.objects.filter(pk__in=pks).update(**values)
+        except Exception as e:
+            # 写回失败时把计数放回缓冲区，等待下次写回
+            print(f"ViewCounter Error: {e}")
+            with self.lock:
+                for pk, n in counts.items():
+                    self.counts[pk] += n
+                    self.total += n
+            return 0
+        return len(groups)
+
+
+article_views = ViewCounter(HealthArticle, 'views', extra_updates=HealthArticle.trending_updates)
+atexit.register(article_views.flush)
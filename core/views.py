@@ -1,5 +1,7 @@
-import json, requests, random
-from django.http import JsonResponse
+import json, gzip, requests, random, zipfile
+import xml.etree.ElementTree as ET
+from xml.parsers.expat import ExpatError
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
 from django.contrib.auth import authenticate, login, logout
 from django.views.decorators.csrf import csrf_exempt # 方便开发阶段调试API
 
@@ -9,19 +11,34 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, ValidationError
-from .models import CustomUser, SleepRecord, SportRecord, FoodItem, Meal, MealItem, UserHealthGoal, Friendship, Comment, ContentType
+from rest_framework.pagination import CursorPagination
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from .models import CustomUser, SleepRecord, SportRecord, FoodItem, FoodCatalogVersion, Meal, MealItem, UserHealthGoal, Friendship, Comment, ContentType, MealTemplate, MealTemplateItem, WorkoutTrack, calculate_item_calories
 from .serializers import (
     SleepRecordSerializer, 
     SportRecordSerializer, 
     FoodItemSerializer, 
     MealSerializer, 
     MealItemSerializer,
+    MealBulkCreateSerializer,
+    MealTemplateSerializer,
+    MealTemplateCreateSerializer,
+    WorkoutTrackSerializer,
     UserProfileSerializer,
     UserHealthGoalSerializer,
     FriendshipSerializer,
     CommentSerializer
 )
-
+from .food_search import search_foods
+from .full_text_search import search_food_items, search_articles
+from .food_catalog import get_catalog_version, catalog_etag, get_snapshot
+from .nutrient_query import query_foods, parse_filters, parse_ordering
+from .workout_track import SUPPORTED_FORMATS as TRACK_FORMATS, detect_format as detect_track_format, import_track
+from . import biometric_series
+from .wearable_import import SUPPORTED_FORMATS as WEARABLE_FORMATS, detect_format, import_wearable_file
+from .metrics import registry as metrics_registry
+
+from django.db import transaction
 from django.db.models import Q
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
@@ -30,6 +47,7 @@ from django.utils.decorators import method_decorator
 from datetime import datetime, time, timedelta
 from django.db.models import Sum, Count, Avg, Min, Max
 from django.utils import timezone
+from django.core.cache import cache
 from collections import Counter
 
 # ==========================================================
@@ -68,7 +86,8 @@ class OpenFoodFactsService:
             return
 
         products = data.get("products", [])
-        
+        cached = 0
+
         for product in products:
             # 确保产品包含我们需要的所有核心数据
             code = product.get('code')
@@ -87,6 +106,11 @@ class OpenFoodFactsService:
                         'calories_per_100g': float(calories)
                     }
                 )
+                cached += 1
+
+        # 全部写入后递增一次食物库版本号
+        if cached:
+            FoodCatalogVersion.bump()
 
 # ==========================================================
 # 【新增】外部食物数据服务
@@ -124,7 +148,8 @@ class OpenFoodFactsService:
             return
 
         products = data.get("products", [])
-        
+        cached = 0
+
         for product in products:
             # 确保产品包含我们需要的所有核心数据
             code = product.get('code')
@@ -143,6 +168,11 @@ class OpenFoodFactsService:
                         'calories_per_100g': float(calories)
                     }
                 )
+                cached += 1
+
+        # 全部写入后递增一次食物库版本号
+        if cached:
+            FoodCatalogVersion.bump()
 
 def index_view(request):
     """
@@ -284,6 +314,26 @@ def logout_view(request):
         return JsonResponse({'status': 'success', 'message': '已成功注销'})
     return JsonResponse({'status': 'error', 'message': '仅支持POST请求'}, status=405)
 
+def parse_limit(request, default, maximum):
+    """从查询参数中解析 limit，并限制在 [1, maximum] 范围内"""
+    try:
+        limit = int(request.query_params.get('limit', default))
+    except ValueError:
+        raise ValidationError({'limit': 'limit 必须是整数'})
+    return max(1, min(limit, maximum))
+
+def etag_matches(request, etag):
+    """请求的 If-None-Match 是否命中 etag (按弱校验比较，忽略 W/ 前缀)"""
+    client_etags = [tag.strip().removeprefix('W/') for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]
+    return etag.removeprefix('W/') in client_etags or '*' in client_etags
+
+def get_or_create_meal(user, record_date, meal_type):
+    """查找用户某天某餐次的第一条餐次记录，不存在时新建；返回 (meal, created)"""
+    meal = Meal.objects.filter(user=user, record_date=record_date, meal_type=meal_type).order_by('id').first()
+    if meal:
+        return meal, False
+    return Meal.objects.create(user=user, record_date=record_date, meal_type=meal_type), True
+
 @method_decorator(csrf_exempt, name='dispatch')
 class SleepRecordViewSet(viewsets.ModelViewSet):
     serializer_class = SleepRecordSerializer
@@ -297,7 +347,7 @@ class SleepRecordViewSet(viewsets.ModelViewSet):
         if record_date_str:
             # 对于睡眠记录，我们约定按"起床日期"进行筛选
             # 前端传入的 record_date 就是期望查看的起床日期
-            queryset = queryset.filter(wakeup_time__date=record_date_str)
+            queryset = queryset.filter(wakeup_date=record_date_str)
             
         return queryset.order_by('-wakeup_time')
 
@@ -310,8 +360,8 @@ class SleepRecordViewSet(viewsets.ModelViewSet):
         【新增】轻量级接口，检查今天是否已有睡眠记录。
         访问URL: GET /api/sleep/today-check/
         """
-        today = timezone.now().date()
-        record = self.get_queryset().filter(wakeup_time__date=today).first()
+        today = timezone.localdate()
+        record = self.get_queryset().filter(wakeup_date=today).first()
         
         if record:
             return Response({"record_exists": True, "record_id": record.id})
@@ -352,6 +402,55 @@ class SportRecordViewSet(viewsets.ModelViewSet):
         else:
             return Response({"record_exists": False, "record_id": None})
 
+    @action(detail=False, methods=['post'], url_path='upload-track')
+    def upload_track(self, request):
+        """
+        上传 GPX/TCX 运动轨迹文件，自动计算距离、时长和消耗热量并生成运动记录。
+        访问URL: POST /api/sports/upload-track/
+
+        请求体: multipart/form-data
+            file: 轨迹文件 (.gpx / .tcx)
+            sport_type: 可选，运动类型 (默认使用文件中声明的类型)
+            save_track: 可选，是否保存轨迹摘要，默认 true
+        """
+        if 'file' not in request.FILES:
+            return Response({'status': 'error', 'message': '请上传 GPX 或 TCX 文件'}, status=400)
+
+        file = request.FILES['file']
+        fmt = detect_track_format(file.name, request.data.get('format'))
+        if fmt is None:
+            return Response({
+                'status': 'error',
+                'message': f"无法识别文件格式，请指定 format ({', '.join(TRACK_FORMATS)})"
+            }, status=400)
+
+        sport_type = (request.data.get('sport_type') or '').strip() or None
+        save_track = str(request.data.get('save_track', 'true')).lower() != 'false'
+        try:
+            record, track, summary = import_track(request.user, file.file, fmt, sport_type, save_track)
+        except (ValueError, ExpatError) as e:
+            return Response({'status': 'error', 'message': f'轨迹解析失败: {str(e)}'}, status=400)
+
+        return Response({
+            'status': 'success',
+            'record': SportRecordSerializer(record).data,
+            'track': WorkoutTrackSerializer(track).data if track else None,
+            'distance_km': summary['distance_km'],
+            'avg_speed_kmh': summary['avg_speed_kmh'],
+        }, status=201)
+
+    @action(detail=True, methods=['get'], url_path='track')
+    def track(self, request, pk=None):
+        """
+        查看运动记录的轨迹摘要。
+        访问URL: GET /api/sports/{id}/track/
+        """
+        record = self.get_object()
+        track = WorkoutTrack.objects.filter(sport_record=record).first()
+        if track is None:
+            return Response({'status': 'error', 'message': '该运动记录没有轨迹'}, status=404)
+        return Response(WorkoutTrackSerializer(track).data)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class FoodItemViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -361,6 +460,91 @@ class FoodItemViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = FoodItemSerializer
     permission_classes = [permissions.IsAuthenticated] # 登录用户才能查看食物库
 
+    SEARCH_DEFAULT_LIMIT = 10
+    SEARCH_MAX_LIMIT = 50
+
+    # 不带版本号访问时每次都要向服务器验证 (命中则返回 304)；
+    # 带上当前版本号 (?v=) 的地址内容永远不变，可以长期缓存
+    CACHE_CONTROL_REVALIDATE = 'private, no-cache'
+    CACHE_CONTROL_IMMUTABLE = 'private, max-age=31536000, immutable'
+
+    def list(self, request, *args, **kwargs):
+        """
+        食物库列表。带 search 参数时走 FTS5 全文检索，按相关度排序并附带高亮片段。
+        访问URL: GET /api/foods/?search=豆腐&limit=20
+        """
+        query = request.query_params.get('search', '').strip()
+        if not query:
+            return super().list(request, *args, **kwargs)
+
+        limit = parse_limit(request, default=20, maximum=100)
+        hits = search_food_items(query, limit)
+        foods = FoodItem.objects.in_bulk([hit['id'] for hit in hits])
+        results = []
+        for hit in hits:
+            food = foods.get(hit['id'])
+            if food:
+                results.append({**self.get_serializer(food).data, 'snippet': hit['snippet'], 'rank': hit['rank']})
+        return Response(results)
+
+    @action(detail=False, methods=['get'], url_path='search')
+    def search(self, request):
+        """
+        食物名称自动补全接口，基于内存 n-gram 索引，按匹配质量返回 Top-K。
+        访问URL: GET /api/foods/search/?q=菜籽&limit=10
+        """
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response([])
+
+        limit = parse_limit(request, default=self.SEARCH_DEFAULT_LIMIT, maximum=self.SEARCH_MAX_LIMIT)
+        return Response(search_foods(query, limit))
+
+    @action(detail=False, methods=['get'], url_path='query')
+    def query(self, request):
+        """
+        按营养素区间查询食物，支持 gt/gte/lt/lte 条件、排序与 Top-K。
+        访问URL: GET /api/foods/query/?protein__gt=20&fat__lt=5&ordering=calories_per_100g&limit=20
+        """
+        try:
+            filters = parse_filters(request.query_params)
+            ordering, descending = parse_ordering(request.query_params.get('ordering', '').strip())
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=400)
+
+        limit = parse_limit(request, default=20, maximum=100)
+        total, results = query_foods(filters, ordering, descending, limit)
+        return Response({'count': total, 'results': results})
+
+    @action(detail=False, methods=['get'], url_path='snapshot')
+    def snapshot(self, request):
+        """
+        按版本号缓存的食物库列式快照 (gzip 预压缩，支持 ETag / If-None-Match)，客户端缓存仍有效时返回 304。
+        访问URL: GET /api/foods/snapshot/  或  GET /api/foods/snapshot/?v=<版本号>
+        """
+        version = get_catalog_version()
+        etag = catalog_etag(version)
+        if request.query_params.get('v') == str(version):
+            cache_control = self.CACHE_CONTROL_IMMUTABLE
+        else:
+            cache_control = self.CACHE_CONTROL_REVALIDATE
+
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            data = get_snapshot(version)
+            if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+                response = HttpResponse(data, content_type='application/json; charset=utf-8')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(gzip.decompress(data), content_type='application/json; charset=utf-8')
+
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        response['Vary'] = 'Accept-Encoding, Cookie, Authorization'
+        response['X-Catalog-Version'] = str(version)
+        return response
+
 @method_decorator(csrf_exempt, name='dispatch')
 class MealViewSet(viewsets.ModelViewSet):
     serializer_class = MealSerializer
@@ -412,6 +596,209 @@ class MealViewSet(viewsets.ModelViewSet):
         else:
             return Response({"record_exists": False, "record_id": None})
 
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
+        """
+        一次请求记录一餐中的多个餐品 (在一个事务中完成)。
+        访问URL: POST /api/meals/bulk/
+        请求体: {"meal_type": "lunch", "record_date": "2025-08-01",
+                 "items": [{"food_item": 12, "portion": 150}, ...]}
+
+        食物一次性通过 in_bulk 取出，热量在内存中计算后 bulk_create 写入，
+        不再逐条调用 MealItem.save() 查询食物。
+        """
+        serializer = MealBulkCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'status': 'error', 'message': serializer.errors}, status=400)
+        data = serializer.validated_data
+        record_date = data.get('record_date') or timezone.localdate()
+
+        food_ids = {item['food_item'] for item in data['items']}
+        foods = FoodItem.objects.only('id', 'name', 'calories_per_100g').in_bulk(food_ids)
+        missing = sorted(food_ids - foods.keys())
+        if missing:
+            return Response({'status': 'error', 'message': f'食物不存在: {missing}'}, status=400)
+
+        with transaction.atomic():
+            meal, meal_created = get_or_create_meal(request.user, record_date, data['meal_type'])
+            meal_items = []
+            for item in data['items']:
+                food = foods[item['food_item']]
+                meal_items.append(MealItem(
+                    meal=meal, food_item=food, portion=item['portion'],
+                    calories_calculated=calculate_item_calories(food.calories_per_100g, item['portion']),
+                ))
+            MealItem.objects.bulk_create(meal_items)
+
+        return Response({
+            'status': 'success',
+            'meal_id': meal.id,
+            'meal_created': meal_created,
+            'items': MealItemSerializer(meal_items, many=True).data,
+            'added_calories': round(sum(item.calories_calculated for item in meal_items), 1),
+        }, status=201)
+
+    MAX_COPY_DAYS = 31
+
+    @action(detail=False, methods=['post'], url_path='copy')
+    def copy(self, request):
+        """
+        把某一天 (或连续多天) 的饮食记录复制到另一天。
+        访问URL: POST /api/meals/copy/?from=2025-08-01&to=2025-08-02
+                 POST /api/meals/copy/?from=2025-07-01&to=2025-08-01&days=31&meal_type=breakfast
+
+        目标日期已有同餐次记录时，餐品追加到该餐次。餐次与餐品都用 bulk_create 写入，
+        并直接复用原餐品已计算好的热量，复制一个月的记录也只需要几条 SQL。
+        """
+        def param(name, default=None):
+            return request.query_params.get(name) or request.data.get(name) or default
+
+        try:
+            from_date = datetime.strptime(param('from', ''), '%Y-%m-%d').date()
+            to_date = datetime.strptime(param('to', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return Response({'status': 'error', 'message': '日期格式错误，请使用YYYY-MM-DD'}, status=400)
+        try:
+            days = int(param('days', 1))
+        except (TypeError, ValueError):
+            return Response({'status': 'error', 'message': 'days 必须是整数'}, status=400)
+        if not 1 <= days <= self.MAX_COPY_DAYS:
+            return Response({'status': 'error', 'message': f'days 必须在 1 到 {self.MAX_COPY_DAYS} 之间'}, status=400)
+        if from_date == to_date:
+            return Response({'status': 'error', 'message': '来源日期与目标日期不能相同'}, status=400)
+
+        offset = to_date - from_date
+        source_meals = Meal.objects.filter(
+            user=request.user, record_date__gte=from_date, record_date__lt=from_date + timedelta(days=days)
+        )
+        meal_type = param('meal_type')
+        if meal_type:
+            source_meals = source_meals.filter(meal_type=meal_type)
+        source_meals = list(source_meals.order_by('record_date', 'id'))
+        if not source_meals:
+            return Response({'status': 'error', 'message': '所选日期没有可复制的饮食记录'}, status=404)
+
+        source_items = MealItem.objects.filter(meal__in=source_meals).order_by('id').values_list(
+            'meal_id', 'food_item_id', 'portion', 'calories_calculated'
+        )
+
+        # 目标日期中已存在的餐次，同一天同一餐次取第一条
+        target_meals = {}
+        existing = Meal.objects.filter(
+            user=request.user, record_date__in={meal.record_date + offset for meal in source_meals}
+        ).order_by('id')
+        for meal in existing:
+            target_meals.setdefault((meal.record_date, meal.meal_type), meal)
+
+        with transaction.atomic():
+            new_meals = []
+            target_for_source = {}
+            for meal in source_meals:
+                key = (meal.record_date + offset, meal.meal_type)
+                if key not in target_meals:
+                    target_meals[key] = Meal(user=request.user, record_date=key[0], meal_type=key[1])
+                    new_meals.append(target_meals[key])
+                target_for_source[meal.id] = target_meals[key]
+            Meal.objects.bulk_create(new_meals)
+
+            new_items = [
+                MealItem(meal=target_for_source[meal_id], food_item_id=food_item_id,
+                         portion=portion, calories_calculated=calories)
+                for meal_id, food_item_id, portion, calories in source_items
+            ]
+            MealItem.objects.bulk_create(new_items, batch_size=500)
+
+        return Response({
+            'status': 'success',
+            'message': f'已将 {from_date} 起 {days} 天的饮食记录复制到 {to_date} 起',
+            'meals_created': len(new_meals),
+            'items_copied': len(new_items),
+        }, status=201)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class MealTemplateViewSet(viewsets.ModelViewSet):
+    """
+    管理用户的饮食模板 (如 "食堂早餐")，并支持一键套用到某一天。
+    """
+    serializer_class = MealTemplateSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+
+    def get_queryset(self):
+        return MealTemplate.objects.filter(user=self.request.user).prefetch_related('items__food_item')
+
+    def create(self, request, *args, **kwargs):
+        """
+        创建饮食模板。
+        访问URL: POST /api/meal-templates/
+        请求体: {"name": "食堂早餐", "meal": 25}  (从已有餐次复制)
+            或: {"name": "食堂早餐", "meal_type": "breakfast", "items": [{"food_item": 12, "portion": 150}]}
+        """
+        serializer = MealTemplateCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'status': 'error', 'message': serializer.errors}, status=400)
+        data = serializer.validated_data
+
+        if data.get('meal'):
+            meal = Meal.objects.filter(id=data['meal'], user=request.user).first()
+            if not meal:
+                return Response({'status': 'error', 'message': '来源餐次不存在'}, status=404)
+            meal_type = data.get('meal_type') or meal.meal_type
+            rows = list(meal.meal_items.values_list('food_item_id', 'portion', 'calories_calculated'))
+        else:
+            meal_type = data['meal_type']
+            food_ids = {item['food_item'] for item in data['items']}
+            foods = FoodItem.objects.only('id', 'calories_per_100g').in_bulk(food_ids)
+            missing = sorted(food_ids - foods.keys())
+            if missing:
+                return Response({'status': 'error', 'message': f'食物不存在: {missing}'}, status=400)
+            rows = [
+                (item['food_item'], item['portion'], calculate_item_calories(foods[item['food_item']].calories_per_100g, item['portion']))
+                for item in data['items']
+            ]
+
+        with transaction.atomic():
+            template = MealTemplate.objects.create(user=request.user, name=data['name'], meal_type=meal_type)
+            MealTemplateItem.objects.bulk_create([
+                MealTemplateItem(template=template, food_item_id=food_item_id, portion=portion, calories_calculated=calories)
+                for food_item_id, portion, calories in rows
+            ])
+
+        template = self.get_queryset().get(pk=template.pk)
+        return Response(self.get_serializer(template).data, status=201)
+
+    @action(detail=True, methods=['post'], url_path='apply')
+    def apply(self, request, pk=None):
+        """
+        把模板中的餐品添加到指定日期的餐次中 (餐次不存在时新建)。
+        访问URL: POST /api/meal-templates/{id}/apply/
+        请求体: {"record_date": "2025-08-01", "meal_type": "breakfast"}  (两者均可省略)
+        """
+        template = self.get_object()
+        record_date_str = request.data.get('record_date')
+        try:
+            record_date = datetime.strptime(record_date_str, '%Y-%m-%d').date() if record_date_str else timezone.localdate()
+        except ValueError:
+            return Response({'status': 'error', 'message': '日期格式错误，请使用YYYY-MM-DD'}, status=400)
+        meal_type = request.data.get('meal_type') or template.meal_type
+        if meal_type not in dict(Meal._meta.get_field('meal_type').choices):
+            return Response({'status': 'error', 'message': f'无效的餐次类型: {meal_type}'}, status=400)
+
+        with transaction.atomic():
+            meal, meal_created = get_or_create_meal(request.user, record_date, meal_type)
+            MealItem.objects.bulk_create([
+                MealItem(meal=meal, food_item_id=item.food_item_id, portion=item.portion,
+                         calories_calculated=item.calories_calculated)
+                for item in template.items.all()
+            ])
+
+        return Response({
+            'status': 'success',
+            'meal_id': meal.id,
+            'meal_created': meal_created,
+            'items_added': len(template.items.all()),
+        }, status=201)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class MealItemViewSet(viewsets.ModelViewSet):
     """
@@ -446,7 +833,7 @@ class DashboardView(APIView):
         
         # --- 3, 4, 5. 数据聚合 (逻辑微调，确保即使没记录也有默认值) ---
         # 睡眠
-        sleep_record = SleepRecord.objects.filter(user=user, wakeup_time__date=target_date).first()
+        sleep_record = SleepRecord.objects.filter(user=user, wakeup_date=target_date).first()
         if sleep_record:
             response_data['sleep'] = {
                 "duration_hours": round(sleep_record.duration.total_seconds() / 3600, 1),
@@ -556,6 +943,195 @@ class DashboardView(APIView):
         
         return Response(final_response)
 
+@method_decorator(csrf_exempt, name='dispatch')
+class TodayStatusView(APIView):
+    """
+    【新增】今日状态汇总接口，一次返回睡眠、运动、饮食、身体指标与健康目标的
+    记录情况、记录ID和汇总数字，替代各资源分别调用 today-check。
+    每个资源只执行一条查询，总查询数固定为 5 条。
+    访问URL: GET /api/today/  或  GET /api/today/?date=2025-08-01
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        date_str = request.query_params.get('date')
+        try:
+            target_date = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else timezone.localdate()
+        except ValueError:
+            return Response({'status': 'error', 'message': '日期格式错误，请使用YYYY-MM-DD'}, status=400)
+        user = request.user
+
+        # 1. 睡眠 (按起床日期归属)
+        sleep = SleepRecord.objects.filter(user=user, wakeup_date=target_date).order_by('id').first()
+        duration_hours = round(sleep.duration.total_seconds() / 3600, 1) if sleep and sleep.duration else 0
+
+        # 2. 运动
+        sports = SportRecord.objects.filter(user=user, record_date=target_date).aggregate(
+            count=Count('id'), first_id=Min('id'),
+            total_duration_minutes=Sum('duration_minutes'), total_calories_burned=Sum('calories_burned'),
+        )
+
+        # 3. 饮食：每餐的热量在同一条查询中汇总
+        meals = list(
+            Meal.objects.filter(user=user, record_date=target_date)
+            .annotate(total_calories=Sum('meal_items__calories_calculated'))
+            .order_by('id')
+            .values('id', 'meal_type', 'total_calories')
+        )
+        for meal in meals:
+            meal['total_calories'] = round(meal['total_calories'] or 0, 1)
+        calories_eaten = round(sum(meal['total_calories'] for meal in meals), 1)
+
+        # 4. 身体指标：截至当天的最近一次记录
+        metric = BodyMetric.objects.filter(user=user, record_date__lte=target_date).order_by('-record_date', '-id').first()
+
+        # 5. 健康目标 (只读，不在 GET 请求中创建记录)
+        goal = UserHealthGoal.objects.filter(user=user).first()
+
+        def progress(actual, target, cap=True):
+            # 与每日看板一致：睡眠和运动的完成度最高 100%，饮食不封顶以便看出是否超标
+            if not target:
+                return 0
+            percent = round((actual / target) * 100)
+            return min(percent, 100) if cap else percent
+
+        sport_minutes = sports['total_duration_minutes'] or 0
+        sport_calories = sports['total_calories_burned'] or 0
+        return Response({
+            'date': target_date.isoformat(),
+            'sleep': {
+                'record_exists': sleep is not None,
+                'record_id': sleep.id if sleep else None,
+                'duration_hours': duration_hours,
+                'sleep_time': sleep.sleep_time.isoformat() if sleep else None,
+                'wakeup_time': sleep.wakeup_time.isoformat() if sleep else None,
+            },
+            'sports': {
+                'record_exists': sports['count'] > 0,
+                'record_id': sports['first_id'],
+                'count': sports['count'],
+                'total_duration_minutes': sport_minutes,
+                'total_calories_burned': sport_calories,
+            },
+            'meals': {
+                'record_exists': bool(meals),
+                'record_id': meals[0]['id'] if meals else None,
+                'meals': meals,
+                'total_calories_eaten': calories_eaten,
+            },
+            'body_metrics': {
+                'record_exists': metric is not None and metric.record_date == target_date,
+                'record_id': metric.id if metric else None,
+                'latest': {
+                    'record_date': metric.record_date.isoformat(),
+                    'weight': metric.weight, 'height': metric.height, 'bmi': metric.bmi,
+                } if metric else None,
+            },
+            'goals': {
+                'record_exists': goal is not None,
+                'target_sleep_duration': goal.target_sleep_duration if goal else None,
+                'target_sport_duration_minutes': goal.target_sport_duration_minutes if goal else None,
+                'target_sport_calories': goal.target_sport_calories if goal else None,
+                'target_diet_calories': goal.target_diet_calories if goal else None,
+                'progress_sleep_duration': progress(duration_hours, goal and goal.target_sleep_duration),
+                'progress_sport_duration': progress(sport_minutes, goal and goal.target_sport_duration_minutes),
+                'progress_sport_calories': progress(sport_calories, goal and goal.target_sport_calories),
+                'progress_diet_calories': progress(calories_eaten, goal and goal.target_diet_calories, cap=False),
+            },
+        })
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BiometricSeriesView(APIView):
+    """
+    【新增】高频生理数据 (每分钟心率、步数) 接口。
+    每个用户每天每个指标只存一行打包的二进制数组，读写逻辑见 biometric_series.py。
+    访问URL: GET/POST /api/biometrics/<metric>/，metric 为 heart_rate 或 steps
+    """
+    permission_classes = [IsAuthenticated]
+
+    MAX_RANGE_DAYS = 31
+    MAX_SAMPLES_PER_REQUEST = 100000
+
+    def _parse_datetime(self, value):
+        dt = datetime.fromisoformat(value)
+        return timezone.make_aware(dt) if timezone.is_naive(dt) else dt
+
+    def get(self, request, metric):
+        """
+        GET /api/biometrics/heart_rate/?date=2025-08-01&resolution=300
+        GET /api/biometrics/steps/?start=2025-08-01T08:00&end=2025-08-01T12:00&agg=max
+
+        参数:
+            date: 查询某一整天 (默认今天)；或使用 start/end 指定区间 (左闭右开)
+            resolution: 降采样后的粒度 (秒)，必须是采样间隔的整数倍，默认不降采样
+            agg: 降采样的聚合方式 mean/sum/max/min，默认心率取均值、步数求和
+        """
+        if metric not in biometric_series.METRICS:
+            return Response({'status': 'error', 'message': f"不支持的指标: {metric}"}, status=404)
+        params = request.query_params
+        try:
+            if params.get('start') or params.get('end'):
+                start, end = self._parse_datetime(params['start']), self._parse_datetime(params['end'])
+            else:
+                date_str = params.get('date')
+                day = datetime.strptime(date_str, '%Y-%m-%d').date() if date_str else timezone.localdate()
+                start = biometric_series.day_start(day)
+                end = start + timedelta(days=1)
+        except (KeyError, ValueError):
+            return Response({'status': 'error', 'message': '时间格式错误，请提供 date=YYYY-MM-DD 或成对的 start/end'}, status=400)
+        if end <= start or end - start > timedelta(days=self.MAX_RANGE_DAYS):
+            return Response({'status': 'error', 'message': f'查询区间必须大于0且不超过 {self.MAX_RANGE_DAYS} 天'}, status=400)
+
+        how = params.get('agg', biometric_series.DEFAULT_AGGREGATES[metric])
+        try:
+            grid_start, interval, samples = biometric_series.read_range(request.user, metric, start, end)
+            resolution = int(params.get('resolution', interval))
+            if resolution <= 0 or resolution % interval:
+                raise ValueError(f'resolution 必须是采样间隔 ({interval} 秒) 的整数倍')
+            values = biometric_series.downsample(samples, resolution // interval, how)
+        except ValueError as e:
+            return Response({'status': 'error', 'message': str(e)}, status=400)
+
+        return Response({
+            'metric': metric,
+            'start': grid_start.isoformat(),
+            'interval_seconds': resolution,
+            'aggregate': how if resolution != interval else None,
+            'count': len(values),
+            'values': values,
+        })
+
+    def post(self, request, metric):
+        """
+        POST /api/biometrics/heart_rate/
+
+        请求体二选一:
+            {"start": "2025-08-01T08:00:00", "interval_seconds": 60, "values": [72, 75, null, 80]}
+            {"interval_seconds": 60, "samples": [["2025-08-01T08:00:00", 72], ["2025-08-01T08:05:00", 90]]}
+        """
+        if metric not in biometric_series.METRICS:
+            return Response({'status': 'error', 'message': f"不支持的指标: {metric}"}, status=404)
+        data = request.data
+        try:
+            interval = int(data.get('interval_seconds', 60))
+            if 'values' in data:
+                values = data['values']
+                if not isinstance(values, list) or len(values) > self.MAX_SAMPLES_PER_REQUEST:
+                    raise ValueError(f'values 必须是长度不超过 {self.MAX_SAMPLES_PER_REQUEST} 的数组')
+                result = biometric_series.append_values(request.user, metric, self._parse_datetime(data['start']), values, interval)
+            elif 'samples' in data:
+                samples = data['samples']
+                if not isinstance(samples, list) or len(samples) > self.MAX_SAMPLES_PER_REQUEST:
+                    raise ValueError(f'samples 必须是长度不超过 {self.MAX_SAMPLES_PER_REQUEST} 的数组')
+                parsed = [(self._parse_datetime(moment), value) for moment, value in samples]
+                result = biometric_series.append_samples(request.user, metric, parsed, interval)
+            else:
+                raise ValueError('请提供 values (配合 start) 或 samples')
+        except (KeyError, TypeError, ValueError) as e:
+            return Response({'status': 'error', 'message': f'数据格式错误: {e}'}, status=400)
+
+        return Response({'status': 'success', **result}, status=201)
+
 @method_decorator(csrf_exempt, name='dispatch')    
 class ProfileView(APIView):
     """
@@ -633,21 +1209,15 @@ class WeeklySleepReportView(APIView):
         start_date_obj = end_date_obj - timedelta(days=6)
         user = request.user
 
-        # 范围开始于 start_date_obj 的 00:00:00
-        start_datetime = timezone.make_aware(datetime.combine(start_date_obj, time.min))
-        # 范围结束于 end_date_obj 的 23:59:59...
-        end_datetime = timezone.make_aware(datetime.combine(end_date_obj, time.max))
-
-        # 使用 __range 进行查询，这是最可靠的方式
+        # 按起床日期 (本地日期) 查询，走 (user, wakeup_date) 索引
         sleep_records = SleepRecord.objects.filter(
             user=user,
-            wakeup_time__range=[start_datetime, end_datetime]
+            wakeup_date__range=[start_date_obj, end_date_obj]
         )
 
         # 将查询结果处理成以日期为键的字典
-        # 注意：要从 record.wakeup_time 中获取本地时区的日期
         sleep_data_map = {
-            timezone.localtime(record.wakeup_time).date().isoformat(): round(record.duration.total_seconds() / 3600, 1)
+            record.wakeup_date.isoformat(): round(record.duration.total_seconds() / 3600, 1)
             for record in sleep_records
         }
 
@@ -697,7 +1267,7 @@ class HealthReportView(APIView):
         user = request.user
         num_days = (end_date - start_date).days + 1
 
-        sleep_records = SleepRecord.objects.filter(user=user, wakeup_time__date__range=[start_date, end_date])
+        sleep_records = SleepRecord.objects.filter(user=user, wakeup_date__range=[start_date, end_date])
         sport_records = SportRecord.objects.filter(user=user, record_date__range=[start_date, end_date])
         meals = Meal.objects.filter(user=user, record_date__range=[start_date, end_date]).prefetch_related('meal_items')
 
@@ -737,7 +1307,7 @@ class HealthReportView(APIView):
             analysis["suggestions"].append("您在此期间没有记录任何睡眠数据。规律睡眠是健康基石。")
             return analysis
 
-        unique_dates_count = records.values('wakeup_time__date').distinct().count()
+        unique_dates_count = records.values('wakeup_date').distinct().count()
         # 2. 用不重复的日期数来计算覆盖率
         analysis["data_coverage_percent"] = round((unique_dates_count / num_days) * 100) if num_days > 0 else 0
         summary = records.aggregate(
@@ -930,11 +1500,11 @@ class HealthAlertView(APIView):
         # 1. 检查睡眠不足预警
         sleep_records = SleepRecord.objects.filter(
             user=user, 
-            wakeup_time__date__range=[start_date, today]
+            wakeup_date__range=[start_date, today]
         )
         # 将记录按日期分组，方便查找
         sleep_by_date = {
-            timezone.localtime(r.wakeup_time).date(): r.duration.total_seconds() / 3600
+            r.wakeup_date: r.duration.total_seconds() / 3600
             for r in sleep_records
         }
 
@@ -1387,9 +1957,11 @@ class CommentViewSet(viewsets.ModelViewSet):
 
 from .serializers import (
     BodyMetricSerializer, ArticleCategorySerializer, 
-    HealthArticleSerializer, UserReadHistorySerializer, SystemLogSerializer
+    HealthArticleSerializer, HealthArticleDetailSerializer, HealthArticleSummarySerializer, UserReadHistorySerializer, SystemLogSerializer
 )
 from .models import BodyMetric, ArticleCategory, HealthArticle, UserReadHistory, SystemLog
+from .view_counter import article_views
+from .recommendations import MAX_RECOMMENDATIONS, record_read, recommend_articles
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -1413,29 +1985,121 @@ class BodyMetricViewSet(viewsets.ModelViewSet):
 class ArticleCategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     文章分类 API（只读）。
+    文章数通过一次 GROUP BY 查询统计；列表整体缓存，命中缓存时不访问数据库。
     """
-    queryset = ArticleCategory.objects.all()
     serializer_class = ArticleCategorySerializer
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        return ArticleCategory.objects.annotate(article_count=Count('articles')).order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        data = cache.get(ArticleCategory.LISTING_CACHE_KEY)
+        if data is None:
+            data = list(self.get_serializer(self.get_queryset(), many=True).data)
+            cache.set(ArticleCategory.LISTING_CACHE_KEY, data, ArticleCategory.LISTING_CACHE_TIMEOUT)
+        return Response(data)
+
+
+class ArticleCursorPagination(CursorPagination):
+    """
+    文章列表按发布时间倒序的游标分页 (?cursor=...&limit=20)，?ordering=trending 时按热度倒序。
+    每页都是一次走 publish_date / trending_score 索引的范围查询，翻页成本与文章总数无关，新发布的文章也不会造成重复或遗漏。
+    """
+    ordering = ('-publish_date', '-id')
+    ORDERINGS = {'trending': ('-trending_score', '-id')}
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+
+    def get_ordering(self, request, queryset, view):
+        return self.ORDERINGS.get(request.query_params.get('ordering'), self.ordering)
+
 
 @method_decorator(csrf_exempt, name='dispatch')
 class HealthArticleViewSet(viewsets.ModelViewSet):
     """
     健康文章 API。
     普通用户只能读取，管理员可以创建/修改/删除。
+    列表只返回摘要 (HealthArticleSummarySerializer) 并分页，完整正文通过详情接口获取。
     """
     serializer_class = HealthArticleSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ArticleCursorPagination
+    # 列表需要读取的列：不加载正文 (trending_score 是热门排序的游标位置)
+    SUMMARY_FIELDS = [
+        'id', 'title', 'excerpt', 'publish_date', 'views', 'trending_score',
+        'category', 'category__name', 'author', 'author__username',
+    ]
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return HealthArticleSummarySerializer
+        if self.action == 'retrieve':
+            return HealthArticleDetailSerializer
+        return HealthArticleSerializer
 
     def get_queryset(self):
         queryset = HealthArticle.objects.all()
+        if self.action == 'list':
+            queryset = queryset.select_related('category', 'author').only(*self.SUMMARY_FIELDS)
+        elif self.action == 'retrieve':
+            queryset = queryset.select_related('category', 'author')
         # 支持按分类过滤
         category_id = self.request.query_params.get('category')
         if category_id:
             queryset = queryset.filter(category_id=category_id)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        文章列表。不带 search 参数时按发布时间倒序游标分页:
+        GET /api/articles/?category=1&limit=20 -> {"next": ..., "previous": ..., "results": [...]}
+        GET /api/articles/?ordering=trending -> 按热度 (随时间衰减的阅读量) 排序的热门文章
+        带 search 参数时走 FTS5 全文检索（标题权重高于正文），
+        按相关度排序，并附带标题高亮和正文摘要片段。
+        访问URL: GET /api/articles/?search=睡眠&category=1&limit=20
+        """
+        query = request.query_params.get('search', '').strip()
+        if not query:
+            return super().list(request, *args, **kwargs)
+
+        limit = parse_limit(request, default=20, maximum=100)
+        hits = search_articles(query, limit, category_id=request.query_params.get('category'))
+        articles = (
+            HealthArticle.objects.select_related('category', 'author').only(*self.SUMMARY_FIELDS)
+            .in_bulk([hit['id'] for hit in hits])
+        )
+        results = []
+        for hit in hits:
+            article = articles.get(hit['id'])
+            if article:
+                results.append({
+                    **self.get_serializer(article).data,
+                    'title_highlight': hit['title_highlight'],
+                    'snippet': hit['snippet'],
+                    'rank': hit['rank'],
+                })
+        return Response(results)
+
+    @action(detail=False, methods=['get'], url_path='recommended')
+    def recommended(self, request):
+        """
+        根据阅读历史推荐文章：与用户读过的文章被同一批用户共读得越多，排名越靠前 (见 core/recommendations.py)。
+        访问URL: GET /api/articles/recommended/?limit=10
+        """
+        limit = parse_limit(request, default=10, maximum=MAX_RECOMMENDATIONS)
+        scores = recommend_articles(request.user.id)[:limit]
+        articles = (
+            HealthArticle.objects.select_related('category', 'author').only(*self.SUMMARY_FIELDS)
+            .in_bulk([article_id for article_id, _ in scores])
+        )
+        results = [
+            {**HealthArticleSummarySerializer(articles[article_id]).data, 'score': score}
+            for article_id, score in scores if article_id in articles
+        ]
+        return Response(results)
+
     def perform_create(self, serializer):
         # 只有管理员可以创建文章
         if not self.request.user.is_staff:
@@ -1443,19 +2107,31 @@ class HealthArticleViewSet(viewsets.ModelViewSet):
         serializer.save(author=self.request.user)
 
     def retrieve(self, request, *args, **kwargs):
-        """重写 retrieve 方法，在获取文章详情时自动记录阅读历史"""
+        """
+        重写 retrieve 方法，在获取文章详情时自动记录阅读历史。
+        正文以保存时渲染好的 content_html 返回，并带 ETag：客户端凭 If-None-Match 重复访问时返回 304，
+        阅读历史和阅读量照常记录。阅读量不在 ETag 中，所以详情不返回阅读量 (以列表接口为准)。
+        """
         instance = self.get_object()
         # 记录阅读历史
-        UserReadHistory.objects.get_or_create(
+        _, created = UserReadHistory.objects.get_or_create(
             user=request.user,
             article=instance
         )
-        # 增加阅读量 (也可以通过触发器实现)
-        instance.views += 1
-        instance.save(update_fields=['views'])
-        
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        if created:
+            # 第一次阅读：增量更新文章共读矩阵，并使该用户的推荐缓存失效
+            record_read(request.user.id, instance.id)
+        # 增加阅读量：先记在内存缓冲区，定期批量写回 (见 core/view_counter.py)，读请求不再写文章表
+        article_views.increment(instance.pk)
+
+        if etag_matches(request, instance.etag):
+            response = HttpResponseNotModified()
+        else:
+            response = Response(self.get_serializer(instance).data)
+        response['ETag'] = instance.etag
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Cookie, Authorization'
+        return response
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -1470,18 +2146,83 @@ class UserReadHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         return UserReadHistory.objects.filter(user=self.request.user)
 
 
+class SystemLogCursorPagination(CursorPagination):
+    """系统日志按时间倒序的游标分页 (?cursor=...&limit=50)，翻页成本与日志总数无关"""
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+    page_size_query_param = 'limit'
+    max_page_size = 200
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class SystemLogViewSet(viewsets.ReadOnlyModelViewSet):
     """
     系统日志 API（只读，仅管理员可访问）。
+    按时间倒序游标分页，支持筛选:
+    GET /api/system-logs/?user=3&action=POST /api/sleep/&start_date=2025-08-01&end_date=2025-08-07
+        user: 用户 id；action: 操作前缀；start_date / end_date: 日期区间 (含两端)
+    超过保留期的日志已归档到文件 (archive_system_logs)，需要时用 load_system_logs 导回。
     """
     serializer_class = SystemLogSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SystemLogCursorPagination
 
     def get_queryset(self):
         if not self.request.user.is_staff:
             raise PermissionDenied("只有管理员可以查看系统日志。")
-        return SystemLog.objects.all()
+        queryset = SystemLog.objects.select_related('user')
+        params = self.request.query_params
+
+        user_id = params.get('user')
+        if user_id:
+            if not user_id.isdigit():
+                raise ValidationError({'user': 'user 必须是用户 id'})
+            queryset = queryset.filter(user_id=int(user_id))
+        action = params.get('action')
+        if action:
+            queryset = queryset.filter(SystemLog.action_prefix_q(action))
+        try:
+            start_date = params.get('start_date')
+            if start_date:
+                day = datetime.strptime(start_date, '%Y-%m-%d').date()
+                queryset = queryset.filter(timestamp__gte=timezone.make_aware(datetime.combine(day, time.min)))
+            end_date = params.get('end_date')
+            if end_date:
+                day = datetime.strptime(end_date, '%Y-%m-%d').date() + timedelta(days=1)
+                queryset = queryset.filter(timestamp__lt=timezone.make_aware(datetime.combine(day, time.min)))
+        except ValueError:
+            raise ValidationError({'date': '日期格式应为 YYYY-MM-DD'})
+        return queryset
+
+
+class PrometheusTextRenderer(BaseRenderer):
+    """Prometheus 抓取使用的文本格式"""
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        # 出错时 (如 403) data 是 dict
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class MetricsView(APIView):
+    """
+    接口性能统计 (仅管理员)，数据由 MetricsMiddleware 采集，只包含当前进程。
+    GET /api/metrics/              Prometheus 文本格式
+    GET /api/metrics/?format=json  JSON: 每个路由的请求数、状态码分布，耗时/查询数/数据库耗时的总和、平均值和 p50/p95/p99 (桶上界估算)
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [PrometheusTextRenderer, JSONRenderer]
+
+    def get(self, request):
+        if not request.user.is_staff:
+            raise PermissionDenied("只有管理员可以查看接口统计。")
+        if request.accepted_renderer.format == 'json':
+            return Response(metrics_registry.snapshot())
+        return Response(metrics_registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 # ============================================================
@@ -1578,3 +2319,42 @@ class FoodImportView(APIView):
             return Response({'status': 'error', 'message': f'导入失败: {str(e)}'}, status=500)
 
 
+@method_decorator(csrf_exempt, name='dispatch')
+class WearableImportView(APIView):
+    """
+    可穿戴设备数据导入 API。
+    流式解析手环/手机导出的 CSV、JSON、Apple Health export.xml (或 export.zip)，
+    为当前用户批量写入睡眠和运动记录，已存在的记录自动跳过。
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        POST /api/import/wearable/
+
+        请求体: multipart/form-data，包含 file 字段；可选 format 字段 (csv/json/xml/zip)，默认按扩展名判断
+        """
+        if 'file' not in request.FILES:
+            return Response({'status': 'error', 'message': '请上传导出文件'}, status=400)
+
+        file = request.FILES['file']
+        fmt = detect_format(file.name, request.data.get('format'))
+        if fmt is None:
+            return Response({
+                'status': 'error',
+                'message': f"无法识别文件格式，请指定 format ({', '.join(WEARABLE_FORMATS)})"
+            }, status=400)
+
+        try:
+            result = import_wearable_file(request.user, file.file, fmt)
+        except (ValueError, ET.ParseError, zipfile.BadZipFile, UnicodeDecodeError) as e:
+            return Response({'status': 'error', 'message': f'文件解析失败: {str(e)}'}, status=400)
+
+        return Response({
+            'status': 'success',
+            'message': (f"导入完成: 睡眠记录 {result['sleep_created']} 条, 运动记录 {result['sport_created']} 条, "
+                        f"重复 {result['duplicates']} 条, 跳过 {result['skipped']} 条"),
+            'details': result
+        })
+
+
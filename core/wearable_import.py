@@ -0,0 +1,558 @@
+"""
+wearable_import.py - 手环/手机健康数据流式导入
+功能:
+1. 流式解析 CSV、JSON (数组 / 每行一条的 JSON Lines / 本系统导出的 JSON 备份) 与
+   Apple Health 导出文件 (export.xml 或 export.zip)，逐条读取，内存占用不随文件大小增长
+2. 将记录映射为睡眠记录 (SleepRecord) 与运动记录 (SportRecord)
+3. 按自然键去重 (已存在于数据库中、或文件内重复的记录会被跳过)：
+   - 睡眠: (用户, 入睡时间)
+   - 运动: (用户, 日期, 运动类型, 时长, 消耗热量)
+4. 攒满一批后使用 bulk_create 批量写入；bulk_create 不会调用 save()，起床日期在构造对象时直接计算
+
+CSV / JSON 记录字段 (中英文列名均可):
+    睡眠: type=sleep, sleep_time(入睡时间), wakeup_time(起床时间)
+    运动: type=sport, sport_type(运动类型), duration_minutes(运动时长(分钟)),
+          calories_burned(消耗卡路里(大卡)), record_date(日期)
+    未提供 type 时，根据是否包含运动类型自动判断。
+    时间可以是完整的日期时间，也可以是 "HH:MM" 配合日期列 (与睡眠 CSV 导出格式一致)。
+"""
+import io
+import csv
+import json
+import zipfile
+from datetime import datetime, timedelta
+
+# 上传的 XML 不可信：defusedxml 拒绝实体声明与外部引用 (实体膨胀、XXE)，
+# Apple Health 导出文件中只有元素/属性声明的 DTD 不受影响
+import defusedxml.ElementTree as ET
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SleepRecord, SportRecord
+
+BATCH_SIZE = 1000
+# 最多返回的错误信息条数
+MAX_ERRORS = 20
+SUPPORTED_FORMATS = ['csv', 'json', 'xml', 'zip']
+FORMAT_EXTENSIONS = {
+    '.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.ndjson': 'json', '.xml': 'xml', '.zip': 'zip',
+}
+
+# 列名别名 -> 标准字段名
+FIELD_ALIASES = {
+    'type': 'type', '类型': 'type',
+    'sleep_time': 'sleep_time', 'start': 'sleep_time', '入睡时间': 'sleep_time',
+    'wakeup_time': 'wakeup_time', 'end': 'wakeup_time', '起床时间': 'wakeup_time',
+    'record_date': 'record_date', 'date': 'record_date', '日期': 'record_date',
+    'sport_type': 'sport_type', '运动类型': 'sport_type',
+    'duration_minutes': 'duration_minutes', '运动时长(分钟)': 'duration_minutes',
+    'calories_burned': 'calories_burned', '消耗卡路里(大卡)': 'calories_burned',
+}
+RECORD_TYPES = {'sleep': 'sleep', '睡眠': 'sleep', 'sport': 'sport', '运动': 'sport'}
+
+# Apple Health 中的睡眠阶段：清醒 (Awake) 不计入睡眠
+APPLE_SLEEP_TYPE = 'HKCategoryTypeIdentifierSleepAnalysis'
+APPLE_AWAKE_VALUE = 'HKCategoryValueSleepAnalysisAwake'
+APPLE_DATE_FORMAT = '%Y-%m-%d %H:%M:%S %z'
+APPLE_WORKOUT_PREFIX = 'HKWorkoutActivityType'
+APPLE_ENERGY_TYPE = 'HKQuantityTypeIdentifierActiveEnergyBurned'
+APPLE_WORKOUT_TYPES = {
+    'Running': '跑步',
+    'Walking': '步行',
+    'Cycling': '骑行',
+    'Swimming': '游泳',
+    'Hiking': '登山',
+    'Yoga': '瑜伽',
+    'JumpRope': '跳绳',
+    'Elliptical': '椭圆机',
+    'Rowing': '划船',
+    'Basketball': '篮球',
+    'Soccer': '足球',
+    'Badminton': '羽毛球',
+    'TableTennis': '乒乓球',
+    'Tennis': '网球',
+    'Dance': '舞蹈',
+    'TraditionalStrengthTraining': '力量训练',
+    'FunctionalStrengthTraining': '力量训练',
+    'HighIntensityIntervalTraining': 'HIIT',
+    'StairClimbing': '爬楼梯',
+}
+# 间隔不超过该时长的睡眠片段合并为同一晚的睡眠
+SLEEP_MERGE_GAP = timedelta(hours=1)
+# 合并后短于该时长的睡眠视为无效片段
+MIN_SLEEP_DURATION = timedelta(minutes=30)
+
+JSON_CHUNK_SIZE = 64 * 1024
+JSON_BACKUP_KEYS = {'sleep_records': 'sleep', 'sport_records': 'sport'}
+
+
+def detect_format(filename, fmt=None):
+    """根据显式指定的格式或文件扩展名判断导入格式，无法判断时返回 None"""
+    if fmt:
+        fmt = fmt.lower()
+        return fmt if fmt in SUPPORTED_FORMATS else None
+    name = (filename or '').lower()
+    for extension, detected in FORMAT_EXTENSIONS.items():
+        if name.endswith(extension):
+            return detected
+    return None
+
+
+def _parse_datetime(value, base_date=None):
+    """解析日期时间；只有 "HH:MM" 时与 base_date 组合。无时区信息时按当前时区处理"""
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        value = str(value).strip()
+        if base_date is not None and len(value) <= 8 and ':' in value:
+            dt = datetime.combine(base_date, datetime.strptime(value[:5], '%H:%M').time())
+        else:
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    return dt
+
+
+def _parse_date(value):
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').date()
+
+
+def normalize_row(row):
+    """
+    将一行 CSV / JSON 记录转换为标准格式。
+
+    返回:
+        ('sleep', sleep_time, wakeup_time) 或
+        ('sport', record_date, sport_type, duration_minutes, calories_burned)
+    异常:
+        ValueError: 字段缺失或格式错误
+    """
+    data = {}
+    for key, value in row.items():
+        field = FIELD_ALIASES.get(str(key).strip().lower()) or FIELD_ALIASES.get(str(key).strip())
+        if field and value not in (None, ''):
+            data[field] = value
+
+    record_type = RECORD_TYPES.get(str(data.get('type', '')).strip().lower())
+    if record_type is None:
+        if 'sport_type' in data:
+            record_type = 'sport'
+        elif 'sleep_time' in data and 'wakeup_time' in data:
+            record_type = 'sleep'
+        else:
+            raise ValueError('无法识别记录类型')
+
+    if record_type == 'sleep':
+        if 'sleep_time' not in data or 'wakeup_time' not in data:
+            raise ValueError('睡眠记录缺少入睡时间或起床时间')
+        base_date = _parse_date(data['record_date']) if 'record_date' in data else None
+        wakeup_time = _parse_datetime(data['wakeup_time'], base_date)
+        sleep_time = _parse_datetime(data['sleep_time'], base_date)
+        if base_date is not None and sleep_time >= wakeup_time:
+            # 仅有 "HH:MM" 时，日期列是起床日期，入睡时间晚于起床时间说明是前一天晚上入睡
+            sleep_time -= timedelta(days=1)
+        if sleep_time >= wakeup_time:
+            raise ValueError('入睡时间必须早于起床时间')
+        return 'sleep', sleep_time, wakeup_time
+
+    for field in ('sport_type', 'duration_minutes', 'calories_burned'):
+        if field not in data:
+            raise ValueError(f'运动记录缺少字段 {field}')
+    duration_minutes = int(round(float(data['duration_minutes'])))
+    calories_burned = float(data['calories_burned'])
+    if duration_minutes <= 0 or calories_burned < 0:
+        raise ValueError('运动时长必须大于0，消耗热量不能为负数')
+    if 'record_date' in data:
+        record_date = _parse_date(data['record_date'])
+    elif 'sleep_time' in data:
+        record_date = timezone.localtime(_parse_datetime(data['sleep_time'])).date()
+    else:
+        raise ValueError('运动记录缺少日期')
+    return 'sport', record_date, str(data['sport_type']).strip()[:100], duration_minutes, calories_burned
+
+
+class WearableImporter:
+    """
+    把标准化后的记录按批写入数据库，并统计导入结果。
+
+    使用方式:
+        importer = WearableImporter(user)
+        importer.add_sleep(sleep_time, wakeup_time)
+        importer.add_sport(record_date, '跑步', 30, 300)
+        result = importer.finish()
+    """
+
+    def __init__(self, user, batch_size=BATCH_SIZE):
+        self.user = user
+        self.batch_size = batch_size
+        self.sleep_batch = []
+        self.sport_batch = []
+        # 本次导入中已出现过的自然键，用于文件内去重
+        self.seen_sleep = set()
+        self.seen_sport = set()
+        self.result = {
+            'sleep_created': 0,
+            'sport_created': 0,
+            'duplicates': 0,
+            'skipped': 0,
+            'errors': [],
+        }
+
+    def error(self, message):
+        self.result['skipped'] += 1
+        if len(self.result['errors']) < MAX_ERRORS:
+            self.result['errors'].append(message)
+
+    def add_row(self, row, line=None):
+        """添加一行 CSV / JSON 记录，格式错误的行计入 skipped"""
+        try:
+            record = normalize_row(row)
+        except (ValueError, TypeError) as e:
+            self.error(f'第 {line} 条记录: {e}' if line is not None else str(e))
+            return
+        if record[0] == 'sleep':
+            self.add_sleep(*record[1:])
+        else:
+            self.add_sport(*record[1:])
+
+    def add_sleep(self, sleep_time, wakeup_time):
+        key = sleep_time
+        if key in self.seen_sleep:
+            self.result['duplicates'] += 1
+            return
+        self.seen_sleep.add(key)
+        self.sleep_batch.append((sleep_time, wakeup_time))
+        if len(self.sleep_batch) >= self.batch_size:
+            self.flush_sleep()
+
+    def add_sport(self, record_date, sport_type, duration_minutes, calories_burned):
+        key = (record_date, sport_type, duration_minutes, round(calories_burned, 1))
+        if key in self.seen_sport:
+            self.result['duplicates'] += 1
+            return
+        self.seen_sport.add(key)
+        self.sport_batch.append(key + (calories_burned,))
+        if len(self.sport_batch) >= self.batch_size:
+            self.flush_sport()
+
+    def flush_sleep(self):
+        batch, self.sleep_batch = self.sleep_batch, []
+        if not batch:
+            return
+        existing = set(
+            SleepRecord.objects
+            .filter(user=self.user, sleep_time__in=[sleep_time for sleep_time, _ in batch])
+            .values_list('sleep_time', flat=True)
+        )
+        records = [
+            # 睡眠时长与起床日期都是数据库生成列
+            SleepRecord(user=self.user, sleep_time=sleep_time, wakeup_time=wakeup_time)
+            for sleep_time, wakeup_time in batch
+            if sleep_time not in existing
+        ]
+        with transaction.atomic():
+            SleepRecord.objects.bulk_create(records)
+        self.result['sleep_created'] += len(records)
+        self.result['duplicates'] += len(batch) - len(records)
+
+    def flush_sport(self):
+        batch, self.sport_batch = self.sport_batch, []
+        if not batch:
+            return
+        existing = {
+            (record_date, sport_type, duration_minutes, round(calories_burned, 1))
+            for record_date, sport_type, duration_minutes, calories_burned in
+            SportRecord.objects
+            .filter(user=self.user, record_date__in={item[0] for item in batch})
+            .values_list('record_date', 'sport_type', 'duration_minutes', 'calories_burned')
+        }
+        records = [
+            SportRecord(user=self.user, record_date=record_date, sport_type=sport_type,
+                        duration_minutes=duration_minutes, calories_burned=calories_burned)
+            for record_date, sport_type, duration_minutes, rounded, calories_burned in batch
+            if (record_date, sport_type, duration_minutes, rounded) not in existing
+        ]
+        with transaction.atomic():
+            SportRecord.objects.bulk_create(records)
+        self.result['sport_created'] += len(records)
+        self.result['duplicates'] += len(batch) - len(records)
+
+    def finish(self):
+        self.flush_sleep()
+        self.flush_sport()
+        return self.result
+
+
+# ---------- CSV ----------
+
+def import_csv(stream, importer):
+    """逐行读取 CSV (第一行为表头)"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        for line, row in enumerate(csv.DictReader(text), start=2):
+            importer.add_row(row, line)
+    finally:
+        # 避免关闭 TextIOWrapper 时连带关闭调用方的文件
+        text.detach()
+
+
+# ---------- JSON ----------
+
+class _JSONStream:
+    """
+    基于 json.JSONDecoder.raw_decode 的增量读取器：每次只在缓冲区中解码一个 JSON 值，
+    缓冲区不足时再从文件读取下一块。
+    """
+
+    def __init__(self, stream):
+        self.reader = io.TextIOWrapper(stream, encoding='utf-8-sig')
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.reader.read(JSON_CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个字符，文件结束时返回空字符串"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f'JSON 格式错误: 此处应为 "{char}"')
+        self.pos += 1
+
+    def value(self):
+        """解码一个完整的 JSON 值"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # 数字可能恰好被缓冲区截断，需确认其后还有字符
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def items(self):
+        """逐个产出当前数组中的元素"""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            char = self.peek()
+            self.pos += 1
+            if char == ']':
+                return
+            if char != ',':
+                raise ValueError('JSON 格式错误: 数组元素之间应为 ","')
+
+    def detach(self):
+        self.reader.detach()
+
+
+def iter_json_records(stream):
+    """
+    流式读取 JSON，逐条产出 (type, dict)。type 为 None 表示需要根据字段判断。
+
+    支持:
+        1. 记录数组: [{...}, {...}]
+        2. JSON Lines: 每行一个记录对象
+        3. 本系统的 JSON 备份: {"sleep_records": [...], "sport_records": [...], ...}
+    """
+    reader = _JSONStream(stream)
+    try:
+        while True:
+            char = reader.peek()
+            if not char:
+                return
+            if char == '[':
+                for item in reader.items():
+                    yield None, item
+                continue
+            if char != '{':
+                raise ValueError('JSON 格式错误: 顶层必须是对象或数组')
+
+            # 逐个键读取对象；备份文件中的记录数组按元素流式产出，其余值整体解码
+            reader.pos += 1
+            row, streamed, first = {}, False, True
+            while reader.peek() != '}':
+                if not first:
+                    reader.expect(',')
+                first = False
+                key = reader.value()
+                reader.expect(':')
+                if key in JSON_BACKUP_KEYS and reader.peek() == '[':
+                    streamed = True
+                    for item in reader.items():
+                        yield JSON_BACKUP_KEYS[key], item
+                else:
+                    row[key] = reader.value()
+            reader.pos += 1
+            if not streamed:
+                yield None, row
+    finally:
+        reader.detach()
+
+
+def import_json(stream, importer):
+    for line, (record_type, row) in enumerate(iter_json_records(stream), start=1):
+        if not isinstance(row, dict):
+            importer.error(f'第 {line} 条记录: 不是 JSON 对象')
+            continue
+        if record_type and 'type' not in row:
+            row = dict(row, type=record_type)
+        importer.add_row(row, line)
+
+
+# ---------- Apple Health ----------
+
+def _apple_datetime(value):
+    return datetime.strptime(value, APPLE_DATE_FORMAT)
+
+
+def _apple_minutes(value, unit):
+    minutes = float(value)
+    if unit == 's':
+        minutes /= 60
+    elif unit == 'h' or unit == 'hr':
+        minutes *= 60
+    return minutes
+
+
+def _apple_kcal(value, unit):
+    kcal = float(value)
+    return kcal / 4.184 if unit == 'kJ' else kcal
+
+
+def _apple_workout(elem):
+    """Workout 元素 -> (record_date, sport_type, duration_minutes, calories_burned)"""
+    start = _apple_datetime(elem.get('startDate'))
+    if elem.get('duration'):
+        minutes = _apple_minutes(elem.get('duration'), elem.get('durationUnit', 'min'))
+    else:
+        minutes = (_apple_datetime(elem.get('endDate')) - start).total_seconds() / 60
+
+    calories = None
+    if elem.get('totalEnergyBurned'):
+        calories = _apple_kcal(elem.get('totalEnergyBurned'), elem.get('totalEnergyBurnedUnit', 'kcal'))
+    else:
+        # 较新的导出格式把热量放在 WorkoutStatistics 子元素中
+        for stats in elem.iter('WorkoutStatistics'):
+            if stats.get('type') == APPLE_ENERGY_TYPE and stats.get('sum'):
+                calories = _apple_kcal(stats.get('sum'), stats.get('unit', 'kcal'))
+                break
+
+    activity = (elem.get('workoutActivityType') or '').replace(APPLE_WORKOUT_PREFIX, '')
+    sport_type = APPLE_WORKOUT_TYPES.get(activity, activity or '其他')
+    return timezone.localtime(start).date(), sport_type, int(round(minutes)), round(calories or 0.0, 1)
+
+
+def merge_sleep_segments(segments):
+    """把同一晚的睡眠片段 (可能来自多个设备、互相重叠) 合并为完整的睡眠记录"""
+    nights = []
+    for start, end in sorted(segments):
+        if nights and start - nights[-1][1] <= SLEEP_MERGE_GAP:
+            if end > nights[-1][1]:
+                nights[-1][1] = end
+        else:
+            nights.append([start, end])
+    return [(start, end) for start, end in nights if end - start >= MIN_SLEEP_DURATION]
+
+
+def import_apple_health(stream, importer):
+    """
+    使用 iterparse (defusedxml) 流式解析 Apple Health export.xml；文件中声明实体时抛出 ValueError。
+
+    每处理完根节点下的一个元素就清空根节点，已解析的元素 (尤其是数量巨大的心率、步数 Record)
+    不会在内存中累积。睡眠片段需要跨记录合并，只保留 (开始, 结束) 元组。
+    """
+    sleep_segments = []
+    depth = 0
+    root = None
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+        depth -= 1
+        if depth != 1:
+            continue
+
+        tag = elem.tag
+        try:
+            if tag == 'Record':
+                if elem.get('type') == APPLE_SLEEP_TYPE and elem.get('value') != APPLE_AWAKE_VALUE:
+                    sleep_segments.append((_apple_datetime(elem.get('startDate')),
+                                           _apple_datetime(elem.get('endDate'))))
+            elif tag == 'Workout':
+                record_date, sport_type, minutes, calories = _apple_workout(elem)
+                if minutes > 0:
+                    importer.add_sport(record_date, sport_type, minutes, calories)
+                else:
+                    importer.error(f'运动 {sport_type} ({record_date}) 时长不足1分钟')
+        except (TypeError, ValueError) as e:
+            importer.error(f'{tag} 记录解析失败: {e}')
+        root.clear()
+
+    for sleep_time, wakeup_time in merge_sleep_segments(sleep_segments):
+        importer.add_sleep(sleep_time, wakeup_time)
+
+
+def import_apple_health_zip(stream, importer):
+    """Apple Health 导出的 export.zip，直接从压缩包中流式读取 export.xml"""
+    with zipfile.ZipFile(stream) as archive:
+        names = [name for name in archive.namelist()
+                 if name.endswith('/export.xml') or name == 'export.xml']
+        if not names:
+            raise ValueError('压缩包中没有找到 export.xml')
+        with archive.open(names[0]) as xml_stream:
+            import_apple_health(xml_stream, importer)
+
+
+IMPORTERS = {
+    'csv': import_csv,
+    'json': import_json,
+    'xml': import_apple_health,
+    'zip': import_apple_health_zip,
+}
+
+
+def import_wearable_file(user, stream, fmt, batch_size=BATCH_SIZE):
+    """
+    导入一个可穿戴设备导出文件。
+
+    参数:
+        user: 记录所属用户
+        stream: 以二进制模式打开的文件对象 (上传文件或本地文件)
+        fmt: 'csv' / 'json' / 'xml' / 'zip'
+    返回:
+        dict: {'sleep_created', 'sport_created', 'duplicates', 'skipped', 'errors'}
+    异常:
+        ValueError / json.JSONDecodeError / ET.ParseError / zipfile.BadZipFile: 文件整体无法解析
+    """
+    if fmt not in IMPORTERS:
+        raise ValueError(f"不支持的格式: {fmt}，可用: {', '.join(SUPPORTED_FORMATS)}")
+    importer = WearableImporter(user, batch_size)
+    IMPORTERS[fmt](stream, importer)
+    return importer.finish()
@@ -0,0 +1,377 @@
+"""
+workout_track.py - GPX/TCX 运动轨迹解析
+功能:
+1. 使用 expat 事件回调流式解析 GPX / TCX 文件，不构建 DOM 树 (也不创建逐个元素对象)，
+   轨迹点坐标直接存入紧凑的 array('d')
+2. 用 haversine 公式计算相邻轨迹点间的距离并求和 (NumPy 向量化计算)
+3. 根据运动类型和平均速度查 MET 表，按 "MET × 体重(kg) × 小时" 估算消耗热量
+4. 生成运动记录 (SportRecord) 与可选的轨迹摘要 (WorkoutTrack)，摘要中只保存抽稀后的编码折线
+"""
+import math
+from xml.parsers import expat
+from array import array
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+SUPPORTED_FORMATS = ['gpx', 'tcx']
+
+EARTH_RADIUS_KM = 6371.0088
+# 用户没有身体指标记录时使用的默认体重
+DEFAULT_WEIGHT_KG = 60.0
+DEFAULT_SPORT_TYPE = '跑步'
+# 轨迹摘要中最多保留的折线点数
+MAX_POLYLINE_POINTS = 300
+
+# 文件中的运动类型 -> 系统中的运动类型
+SPORT_TYPE_ALIASES = {
+    'running': '跑步', 'run': '跑步',
+    'walking': '步行', 'walk': '步行',
+    'biking': '骑行', 'cycling': '骑行', 'ride': '骑行',
+    'hiking': '登山', 'hike': '登山',
+}
+# MET 表: [(最低速度 km/h, MET)]，取不超过实际速度的最后一档 (参考 Compendium of Physical Activities)
+MET_TABLES = {
+    '跑步': [(0, 6.0), (8.0, 8.3), (9.7, 9.8), (11.3, 11.0), (12.9, 11.8), (14.5, 12.8), (16.1, 14.5), (17.7, 16.0)],
+    '步行': [(0, 2.0), (3.2, 2.8), (4.0, 3.0), (4.8, 3.5), (5.6, 4.3), (6.4, 5.0), (7.2, 7.0)],
+    '骑行': [(0, 4.0), (16.1, 6.8), (19.3, 8.0), (22.5, 10.0), (25.7, 12.0), (30.6, 15.8)],
+    '登山': [(0, 6.0)],
+}
+DEFAULT_MET = 5.0
+
+
+def detect_format(filename, fmt=None):
+    """根据显式指定的格式或文件扩展名判断轨迹格式，无法判断时返回 None"""
+    fmt = (fmt or (filename or '').rpartition('.')[2]).lower()
+    return fmt if fmt in SUPPORTED_FORMATS else None
+
+
+class TrackData:
+    """
+    解析后的轨迹。
+
+    - lats / lons / eles: 轨迹点的纬度、经度、海拔 (海拔缺失时为 NaN)
+    - start_time / end_time: 第一个和最后一个带时间的轨迹点
+    - moving_seconds: TCX 中各圈 (Lap) 的 TotalTimeSeconds 之和，GPX 为 None
+    - sport: 文件中声明的运动类型
+    """
+
+    def __init__(self):
+        self.lats = array('d')
+        self.lons = array('d')
+        self.eles = array('d')
+        self.start_time = None
+        self.end_time = None
+        self.moving_seconds = None
+        self.sport = None
+
+    def __len__(self):
+        return len(self.lats)
+
+    @property
+    def duration_seconds(self):
+        if self.moving_seconds:
+            return self.moving_seconds
+        if self.start_time is None or self.end_time is None:
+            return 0
+        return (self.end_time - self.start_time).total_seconds()
+
+
+def _parse_time(text):
+    dt = datetime.fromisoformat(text.strip().replace('Z', '+00:00'))
+    if timezone.is_naive(dt):
+        # GPX 规范中的时间均为 UTC
+        dt = dt.replace(tzinfo=dt_timezone.utc)
+    return dt
+
+
+# 元素名 (不含命名空间前缀) -> 处理方式
+KIND_POINT = 'point'
+KIND_ACTIVITY = 'activity'
+ELEMENT_KINDS = {
+    'trkpt': KIND_POINT, 'Trackpoint': KIND_POINT,
+    'Activity': KIND_ACTIVITY,
+    # 以下元素需要读取文本内容
+    'time': 'time', 'Time': 'time',
+    'ele': 'ele', 'AltitudeMeters': 'ele',
+    'LatitudeDegrees': 'lat', 'LongitudeDegrees': 'lon',
+    'TotalTimeSeconds': 'lap_seconds',
+    'type': 'sport',
+}
+# 轨迹点内需要读取文本的字段
+POINT_FIELDS = frozenset(['time', 'ele', 'lat', 'lon'])
+PARSE_CHUNK_SIZE = 256 * 1024
+
+
+class _ElementKinds(dict):
+    """原始元素名 (可能带命名空间前缀) -> 处理方式，首次出现时计算并缓存"""
+
+    def __missing__(self, name):
+        kind = self[name] = ELEMENT_KINDS.get(name.rpartition(':')[2])
+        return kind
+
+
+def parse_track(stream, fmt):
+    """
+    流式解析 GPX / TCX 文件。
+
+    直接使用 expat 的回调接口按块喂入文件内容，不创建任何元素对象，内存中只保留坐标数组。
+    回调是解析的主要开销，因此尽量精简：
+    - 结束标签回调只处理轨迹点：在 </trkpt> / </Trackpoint> 处结算当前轨迹点并清空，
+      轨迹点之外的 <time>、<ele> (如 <extensions> 中的) 不会写入最后一个轨迹点
+    - 字符回调直接是当前字段文本列表的 list.append (不进入 Python 函数)，
+      遇到下一个开始标签时切换或摘下；字段后面多收到的空白在转换数值时自然忽略
+    - 经纬度、海拔在结算时直接转成 float 追加到 array('d')；时间字符串只解析第一个和最后一个
+    异常:
+        ValueError: 格式不支持或文件中没有轨迹点
+        xml.parsers.expat.ExpatError: XML 格式错误
+    """
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"不支持的格式: {fmt}，可用: {', '.join(SUPPORTED_FORMATS)}")
+
+    track = TrackData()
+    nan = float('nan')
+    lats, lons, eles = track.lats, track.lons, track.eles
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    kinds = _ElementKinds()
+    # 当前轨迹点: 直接使用 expat 传入的属性字典 (GPX 的经纬度是属性)，再放入各字段的文本片段列表；
+    # None 表示还没有遇到轨迹点
+    point = None
+    first_time = last_time = None
+    laps, sports = [], []
+
+    def finish_point():
+        nonlocal first_time, last_time
+        time_parts = point.get('time')
+        if time_parts:
+            if first_time is None:
+                first_time = time_parts
+            last_time = time_parts
+        lat, lon = point.get('lat'), point.get('lon')
+        # 室内运动的轨迹点可能只有时间没有坐标
+        if lat is None or lon is None:
+            return
+        if fmt == 'tcx':
+            lat, lon = ''.join(lat), ''.join(lon)
+        lats.append(float(lat))
+        lons.append(float(lon))
+        ele = point.get('ele')
+        if ele:
+            ele = ''.join(ele)
+            eles.append(float(ele) if not ele.isspace() else nan)
+        else:
+            eles.append(nan)
+
+    def start_element(name, attrs):
+        nonlocal point
+        kind = kinds[name]
+        if kind in POINT_FIELDS:
+            if point is None:
+                parser.CharacterDataHandler = None
+            else:
+                parts = point[kind] = []
+                parser.CharacterDataHandler = parts.append
+        elif kind is None:
+            parser.CharacterDataHandler = None
+        elif kind == KIND_POINT:
+            point = attrs
+            parser.CharacterDataHandler = None
+        elif kind == KIND_ACTIVITY:
+            track.sport = track.sport or attrs.get('Sport')
+            parser.CharacterDataHandler = None
+        else:
+            parts = []
+            (laps if kind == 'lap_seconds' else sports).append(parts)
+            parser.CharacterDataHandler = parts.append
+
+    def end_element(name):
+        nonlocal point
+        if kinds[name] == KIND_POINT and point is not None:
+            finish_point()
+            point = None
+            parser.CharacterDataHandler = None
+
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    while True:
+        chunk = stream.read(PARSE_CHUNK_SIZE)
+        if not chunk:
+            break
+        parser.Parse(chunk, False)
+    parser.Parse(b'', True)
+
+    if not len(track):
+        raise ValueError('文件中没有带坐标的轨迹点')
+    if fmt == 'tcx':
+        track.moving_seconds = sum(float(value) for value in map(''.join, laps) if value.strip()) or None
+    elif not track.sport:
+        track.sport = next((value.strip() for value in map(''.join, sports) if value.strip()), None)
+    first_time = ''.join(first_time).strip() if first_time else ''
+    last_time = ''.join(last_time).strip() if last_time else ''
+    track.start_time = _parse_time(first_time) if first_time else None
+    track.end_time = _parse_time(last_time) if last_time else None
+    return track
+
+
+def track_distance_km(lats, lons):
+    """相邻轨迹点之间 haversine 距离之和 (公里)"""
+    if len(lats) < 2:
+        return 0.0
+    lat = np.radians(np.frombuffer(lats, dtype=np.float64))
+    lon = np.radians(np.frombuffer(lons, dtype=np.float64))
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    return float(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0))).sum())
+
+
+def elevation_gain(eles):
+    """累计爬升 (米)：相邻海拔的正差值之和，忽略缺失海拔"""
+    values = np.frombuffer(eles, dtype=np.float64) if len(eles) else np.empty(0)
+    values = values[~np.isnan(values)]
+    if len(values) < 2:
+        return 0.0
+    diffs = np.diff(values)
+    return float(diffs[diffs > 0].sum())
+
+
+def resolve_sport_type(declared):
+    """把文件中声明的运动类型映射为系统中的运动类型"""
+    if not declared:
+        return DEFAULT_SPORT_TYPE
+    return SPORT_TYPE_ALIASES.get(declared.strip().lower(), declared.strip()[:100])
+
+
+def estimate_met(sport_type, speed_kmh):
+    """按运动类型与平均速度查 MET 表"""
+    table = MET_TABLES.get(sport_type)
+    if not table:
+        return DEFAULT_MET
+    met = table[0][1]
+    for min_speed, value in table:
+        if speed_kmh >= min_speed:
+            met = value
+    return met
+
+
+def encode_polyline(lats, lons, max_points=MAX_POLYLINE_POINTS):
+    """把轨迹均匀抽稀到不超过 max_points 个点，编码为 Google Encoded Polyline 字符串"""
+    count = len(lats)
+    if not count:
+        return ''
+    step = max(1, math.ceil(count / max_points))
+    indices = list(range(0, count, step))
+    if indices[-1] != count - 1:
+        indices[-1] = count - 1
+
+    def encode_value(value):
+        value = ~(value << 1) if value < 0 else value << 1
+        chunks = []
+        while value >= 0x20:
+            chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chunks.append(chr(value + 63))
+        return ''.join(chunks)
+
+    encoded = []
+    prev_lat = prev_lon = 0
+    for i in indices:
+        lat, lon = round(lats[i] * 1e5), round(lons[i] * 1e5)
+        encoded.append(encode_value(lat - prev_lat))
+        encoded.append(encode_value(lon - prev_lon))
+        prev_lat, prev_lon = lat, lon
+    return ''.join(encoded)
+
+
+def summarize_track(track, sport_type=None, weight_kg=None):
+    """
+    计算轨迹摘要。
+
+    返回:
+        dict: sport_type, start_time, distance_km, duration_seconds, avg_speed_kmh,
+              elevation_gain_m, met, calories_burned, point_count
+    异常:
+        ValueError: 轨迹缺少时间信息
+    """
+    duration_seconds = track.duration_seconds
+    if duration_seconds <= 0:
+        raise ValueError('轨迹缺少时间信息，无法计算运动时长')
+    sport_type = sport_type or resolve_sport_type(track.sport)
+    weight_kg = weight_kg or DEFAULT_WEIGHT_KG
+
+    distance_km = track_distance_km(track.lats, track.lons)
+    hours = duration_seconds / 3600
+    speed_kmh = distance_km / hours
+    met = estimate_met(sport_type, speed_kmh)
+    return {
+        'sport_type': sport_type,
+        'start_time': track.start_time,
+        'distance_km': round(distance_km, 3),
+        'duration_seconds': int(round(duration_seconds)),
+        'avg_speed_kmh': round(speed_kmh, 2),
+        'elevation_gain_m': round(elevation_gain(track.eles), 1),
+        'met': met,
+        'calories_burned': round(met * weight_kg * hours, 1),
+        'point_count': len(track),
+    }
+
+
+def latest_weight(user):
+    """用户最近一次记录的体重，没有记录时返回 None"""
+    from .models import BodyMetric
+    return (
+        BodyMetric.objects.filter(user=user)
+        .order_by('-record_date', '-id')
+        .values_list('weight', flat=True)
+        .first()
+    )
+
+
+def import_track(user, stream, fmt, sport_type=None, save_track=True):
+    """
+    解析轨迹文件并生成运动记录。
+
+    参数:
+        sport_type: 指定运动类型；为空时使用文件中声明的类型
+        save_track: 是否保存轨迹摘要 (WorkoutTrack)
+    返回:
+        (SportRecord, WorkoutTrack 或 None, dict 摘要)
+    异常:
+        ValueError: 文件无法解析、缺少时间信息或该轨迹已导入
+    """
+    from .models import SportRecord, WorkoutTrack
+
+    track = parse_track(stream, fmt)
+    summary = summarize_track(track, sport_type, latest_weight(user))
+    start_time = summary['start_time']
+    if save_track and start_time and WorkoutTrack.objects.filter(
+            sport_record__user=user, start_time=start_time).exists():
+        raise ValueError('该运动轨迹已经导入过')
+
+    record_date = timezone.localtime(start_time).date() if start_time else timezone.localdate()
+    with transaction.atomic():
+        record = SportRecord.objects.create(
+            user=user,
+            sport_type=summary['sport_type'],
+            duration_minutes=max(1, round(summary['duration_seconds'] / 60)),
+            calories_burned=summary['calories_burned'],
+            record_date=record_date,
+        )
+        workout_track = None
+        if save_track:
+            workout_track = WorkoutTrack.objects.create(
+                sport_record=record,
+                source_format=fmt,
+                start_time=start_time or timezone.now(),
+                distance_km=summary['distance_km'],
+                duration_seconds=summary['duration_seconds'],
+                avg_speed_kmh=summary['avg_speed_kmh'],
+                elevation_gain_m=summary['elevation_gain_m'],
+                met=summary['met'],
+                point_count=summary['point_count'],
+                polyline=encode_polyline(track.lats, track.lons),
+            )
+    return record, workout_track, summary
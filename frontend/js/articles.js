@@ -6,11 +6,14 @@
 document.addEventListener('DOMContentLoaded', function () {
     // DOM 元素
     const categoryFilter = document.getElementById('category-filter');
+    const orderingFilter = document.getElementById('ordering-filter');
     const searchInput = document.getElementById('search-input');
     const searchBtn = document.getElementById('search-btn');
     const articleList = document.getElementById('article-list');
     const emptyState = document.getElementById('empty-state');
     const articleDetailModal = document.getElementById('articleDetailModal');
+    const loadMoreWrapper = document.getElementById('load-more-wrapper');
+    const loadMoreBtn = document.getElementById('load-more-btn');
 
     // 详情模态框元素
     const detailTitle = document.getElementById('articleDetailModalLabel');
@@ -21,6 +24,8 @@ document.addEventListener('DOMContentLoaded', function () {
     const articleContent = document.getElementById('article-content');
 
     let allArticles = [];
+    // 文章列表分页：下一页的地址 (后端游标分页返回的 next)
+    let nextPageUrl = null;
 
     // 初始化
     init();
@@ -31,6 +36,8 @@ document.addEventListener('DOMContentLoaded', function () {
 
         // 事件监听
         categoryFilter.addEventListener('change', filterArticles);
+        orderingFilter.addEventListener('change', filterArticles);
+        loadMoreBtn.addEventListener('click', () => loadArticles(nextPageUrl, true));
         searchBtn.addEventListener('click', filterArticles);
         searchInput.addEventListener('keypress', function (e) {
             if (e.key === 'Enter') filterArticles();
@@ -53,15 +60,17 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     }
 
-    // 加载文章列表
-    async function loadArticles() {
+    // 加载文章列表 (分页，每页只包含摘要)
+    async function loadArticles(url = '/api/articles/', append = false) {
         try {
-            const response = await fetch('/api/articles/', {
+            const response = await fetch(url, {
                 credentials: 'include'
             });
             if (!response.ok) throw new Error('加载文章失败');
 
-            allArticles = await response.json();
+            const page = await response.json();
+            allArticles = append ? allArticles.concat(page.results) : page.results;
+            nextPageUrl = page.next;
             renderArticles(allArticles);
         } catch (error) {
             console.error('加载文章失败:', error);
@@ -70,28 +79,44 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     // 过滤文章
-    function filterArticles() {
+    async function filterArticles() {
         const categoryId = categoryFilter.value;
-        const searchTerm = searchInput.value.toLowerCase().trim();
-
-        let filtered = allArticles;
-
-        if (categoryId) {
-            filtered = filtered.filter(a => a.category == categoryId);
-        }
+        const searchTerm = searchInput.value.trim();
 
         if (searchTerm) {
-            filtered = filtered.filter(a =>
-                a.title.toLowerCase().includes(searchTerm) ||
-                (a.content && a.content.toLowerCase().includes(searchTerm))
-            );
+            // 关键词检索交给后端全文索引，结果按相关度排序并带高亮片段
+            await searchArticles(searchTerm, categoryId);
+            return;
         }
 
-        renderArticles(filtered);
+        // 分类筛选和排序交给后端，从第一页重新加载
+        const params = new URLSearchParams();
+        if (categoryId) params.append('category', categoryId);
+        if (orderingFilter.value) params.append('ordering', orderingFilter.value);
+        await loadArticles(`/api/articles/?${params.toString()}`);
+    }
+
+    // 全文检索文章
+    async function searchArticles(searchTerm, categoryId) {
+        const params = new URLSearchParams({ search: searchTerm });
+        if (categoryId) params.append('category', categoryId);
+        try {
+            const response = await fetch(`/api/articles/?${params.toString()}`, {
+                credentials: 'include'
+            });
+            if (!response.ok) throw new Error('搜索文章失败');
+
+            nextPageUrl = null;
+            renderArticles(await response.json());
+        } catch (error) {
+            console.error('搜索文章失败:', error);
+            articleList.innerHTML = '<div class="col-12 text-center text-danger py-5">搜索失败，请稍后重试</div>';
+        }
     }
 
     // 渲染文章列表
     function renderArticles(articles) {
+        loadMoreWrapper.classList.toggle('d-none', !nextPageUrl);
         if (articles.length === 0) {
             articleList.innerHTML = '';
             emptyState.classList.remove('d-none');
@@ -106,8 +131,8 @@ document.addEventListener('DOMContentLoaded', function () {
                         <div class="mb-2">
                             <span class="badge bg-primary">${article.category_name || '未分类'}</span>
                         </div>
-                        <h5 class="card-title">${escapeHtml(article.title)}</h5>
-                        <p class="card-text text-muted">${escapeHtml(article.content ? article.content.substring(0, 100) + '...' : '')}</p>
+                        <h5 class="card-title">${article.title_highlight || escapeHtml(article.title)}</h5>
+                        <p class="card-text text-muted">${article.snippet || escapeHtml(article.excerpt)}</p>
                     </div>
                     <div class="card-footer bg-transparent border-top-0">
                         <small class="text-muted">
@@ -137,25 +162,22 @@ document.addEventListener('DOMContentLoaded', function () {
             detailCategory.textContent = article.category_name || '未分类';
             detailAuthor.textContent = article.author_name || '匿名';
             detailDate.textContent = article.publish_date ? article.publish_date.slice(0, 10) : '--';
-            detailViews.textContent = article.views;
+            // 详情不返回阅读量 (命中 304 时响应是第一次加载的缓存)，在列表中的阅读量基础上计入本次阅读
+            const articleIndex = allArticles.findIndex(a => a.id === id);
+            if (articleIndex !== -1) {
+                allArticles[articleIndex].views += 1;
+                detailViews.textContent = allArticles[articleIndex].views;
+            } else {
+                detailViews.textContent = '--';
+            }
 
-            // 简单地将内容中的换行转为 <p> 标签
-            articleContent.innerHTML = article.content
-                .split('\n')
-                .filter(p => p.trim())
-                .map(p => `<p>${escapeHtml(p)}</p>`)
-                .join('');
+            // 正文由服务器在保存文章时渲染并转义 (content_html)，重复打开同一篇文章时浏览器凭 ETag 得到 304
+            articleContent.innerHTML = article.content_html;
 
             // 显示模态框
             const modal = new bootstrap.Modal(articleDetailModal);
             modal.show();
 
-            // 更新列表中的阅读数
-            const articleIndex = allArticles.findIndex(a => a.id === id);
-            if (articleIndex !== -1) {
-                allArticles[articleIndex].views = article.views;
-            }
-
         } catch (error) {
             console.error('加载文章详情失败:', error);
             alert('加载文章详情失败');
@@ -12,16 +12,28 @@ document.addEventListener('DOMContentLoaded', function() {
     const recordListTitleEl = document.getElementById('record-list-title');
 
     // API的URL
-    const API_FOODS_URL = '/api/foods/';
+    const API_FOODS_SEARCH_URL = '/api/foods/search/';
     const API_MEALS_URL = '/api/meals/';
+    const API_MEALS_BULK_URL = '/api/meals/bulk/';
     const API_MEAL_ITEMS_URL = '/api/meal-items/';
 
     // --- 2. 核心功能函数 ---
 
-    // [不变] 函数：获取食物库并填充datalist
-    async function fetchAndPopulateFoodItems() {
+    // 函数：按输入内容检索食物并填充datalist (只拉取 Top-K 结果，不再下载整个食物库)
+    const FOOD_SEARCH_LIMIT = 15;
+    let foodSearchTimer = null;
+    let foodSearchController = null;
+
+    async function searchAndPopulateFoodItems(query) {
+        if (!query) return;
+        // 新的输入到来时，取消上一次尚未完成的请求
+        if (foodSearchController) foodSearchController.abort();
+        foodSearchController = new AbortController();
+
+        const url = `${API_FOODS_SEARCH_URL}?q=${encodeURIComponent(query)}&limit=${FOOD_SEARCH_LIMIT}`;
         try {
-            const response = await fetch(API_FOODS_URL, { credentials: 'include' });
+            const response = await fetch(url, { credentials: 'include', signal: foodSearchController.signal });
+            if (!response.ok) throw new Error('食物检索失败');
             const foodItems = await response.json();
             
             foodDatalist.innerHTML = '';
@@ -33,10 +45,21 @@ document.addEventListener('DOMContentLoaded', function() {
                 foodDatalist.appendChild(option);
             });
         } catch (error) {
+            if (error.name === 'AbortError') return;
             console.error('获取食物库失败:', error);
         }
     }
 
+    // 输入防抖：停止输入 200ms 后才发起检索
+    function handleFoodInput(event) {
+        const query = event.target.value.trim();
+        // 已经从候选列表中选中的食物无需再次检索
+        const selected = Array.from(foodDatalist.options).some(option => option.value === query);
+        if (selected) return;
+        clearTimeout(foodSearchTimer);
+        foodSearchTimer = setTimeout(() => searchAndPopulateFoodItems(query), 200);
+    }
+
     /**
      * 函数：获取并渲染指定日期的餐次记录
      * @param {string} dateStr - 'YYYY-MM-DD'格式的日期
@@ -268,18 +291,18 @@ document.addEventListener('DOMContentLoaded', function() {
         }
         
         try {
-            let mealId = await getOrCreateMeal(recordDate, mealType);
-            const mealItemData = {
-                meal: mealId,
-                food_item: parseInt(foodId, 10),
-                portion: parseFloat(portion)
+            // 一次请求完成 "查找或创建餐次 + 添加餐品"
+            const mealData = {
+                meal_type: mealType,
+                record_date: recordDate,
+                items: [{ food_item: parseInt(foodId, 10), portion: parseFloat(portion) }]
             };
 
-            const response = await fetch(API_MEAL_ITEMS_URL, {
+            const response = await fetch(API_MEALS_BULK_URL, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCsrfToken() },
                 credentials: 'include',
-                body: JSON.stringify(mealItemData)
+                body: JSON.stringify(mealData)
             });
             if (!response.ok) throw new Error('添加食物失败');
             
@@ -291,27 +314,6 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    // 辅助函数：获取或创建餐次ID
-    async function getOrCreateMeal(dateStr, mealType) {
-        const checkUrl = `${API_MEALS_URL}?record_date=${dateStr}&meal_type=${mealType}`;
-        let response = await fetch(checkUrl, { credentials: 'include' });
-        let existingMeals = await response.json();
-        if (existingMeals.length > 0) {
-            return existingMeals[0].id;
-        } else {
-            const mealData = { record_date: dateStr, meal_type: mealType };
-            response = await fetch(API_MEALS_URL, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json', 'X-CSRFToken': getCsrfToken() },
-                credentials: 'include',
-                body: JSON.stringify(mealData)
-            });
-            if (!response.ok) throw new Error('创建餐次失败');
-            const newMeal = await response.json();
-            return newMeal.id;
-        }
-    }
-
     // --- 3. 初始化和事件绑定 ---
 
     /**
@@ -324,11 +326,9 @@ document.addEventListener('DOMContentLoaded', function() {
         // 1. 设置日期选择器的默认值为今天
         dateSelector.value = todayStr;
 
-        // 2. 并行加载初始数据（食物库和今天的数据）
-        Promise.all([
-            fetchAndPopulateFoodItems(),
-            fetchAndRenderMeals(todayStr)
-        ]);
+        // 2. 加载今天的数据（食物库改为输入时按需检索）
+        fetchAndRenderMeals(todayStr);
+        document.getElementById('food-item').addEventListener('input', handleFoodInput);
 
         // 3. 监听日期选择器的变化
         dateSelector.addEventListener('change', function() {
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',  # 接口耗时与查询数统计，放在第一位
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -130,6 +131,18 @@ STATICFILES_DIRS = [
 ]
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# 食物库快照 (gzip 预压缩) 的存放目录，每个版本一个文件
+FOOD_CATALOG_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'catalog_snapshots')
+
+# 系统日志的输出: 'db' 写入 SystemLog 表, 'file' 写入 SYSTEM_LOG_DIR 下的 gzip 压缩日志文件, 'both' 两者都写
+SYSTEM_LOG_SINK = 'db'
+SYSTEM_LOG_DIR = os.path.join(BASE_DIR, 'audit_logs')
+# 数据库中保留的系统日志天数，更早的日志由 archive_system_logs 命令按月归档到 SYSTEM_LOG_DIR
+SYSTEM_LOG_RETENTION_DAYS = 90
+
+# 是否统计每个接口的耗时与数据库查询数 (管理员通过 /api/metrics/ 查看)，关闭后中间件不加载
+METRICS_ENABLED = True
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 